@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Measures the annotation frame lookups of the interval representation against
+    the previous representation that stored every frame index of a section in a list.
+    Usage: python -m benchmarks.annotation_lookup --frames 1000000 --labels 4
+"""
+import time
+import argparse
+import collections
+import numpy as np
+from tool.core.annotation_sections import LabelSections, find_closest_section
+
+
+def create_synthetic_sections(n_frames, n_labels, mean_length, seed=0):
+    """ returns the start and exclusive end frames of sections that cover the timeline and the label of each section"""
+    rng = np.random.RandomState(seed)
+    lengths = rng.randint(1, 2 * mean_length, n_frames // mean_length * 2)
+    ends = np.cumsum(lengths)
+    ends = ends[ends < n_frames]
+    starts = np.concatenate([[0], ends])
+    ends = np.concatenate([ends, [n_frames]])
+    labels = rng.randint(0, n_labels, len(starts))
+    return starts, ends, labels
+
+
+def create_interval_annotation(starts, ends, labels, n_labels):
+    annotation = collections.OrderedDict()
+    for label_idx in range(n_labels):
+        mask = labels == label_idx
+        annotation["c" + str(label_idx)] = LabelSections(starts[mask], ends[mask])
+    return annotation
+
+
+def create_list_annotation(starts, ends, labels, n_labels):
+    annotation = collections.OrderedDict(("c" + str(label_idx), []) for label_idx in range(n_labels))
+    for start, end, label_idx in zip(starts, ends, labels):
+        annotation["c" + str(label_idx)].append(list(range(start, end)))
+    return annotation
+
+
+def get_annotation_of_frame_from_lists(annotation, frame_idx):
+    """ the frame lookup of the list representation that scans every annotated frame"""
+    current_label = None
+    delta = np.inf
+    current_entry_idx = None
+    for label in annotation:
+        for entry_idx, entry in enumerate(annotation[label]):
+            for idx in entry:
+                if abs(idx - frame_idx) < delta:
+                    delta = abs(idx - frame_idx)
+                    current_label = label
+                    current_entry_idx = entry_idx
+                    if delta == 0:
+                        break
+    return current_label, current_entry_idx
+
+
+def measure(func, queries):
+    start = time.perf_counter()
+    results = [func(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def run_benchmark(n_frames, n_labels, mean_length, n_queries, n_list_queries):
+    starts, ends, labels = create_synthetic_sections(n_frames, n_labels, mean_length)
+    print("frames: %d labels: %d sections: %d" % (n_frames, n_labels, len(starts)))
+    queries = np.random.RandomState(1).randint(0, n_frames, n_queries)
+
+    start = time.perf_counter()
+    interval_annotation = create_interval_annotation(starts, ends, labels, n_labels)
+    print("interval build (s):\t%.4f" % (time.perf_counter() - start))
+    interval_time, interval_results = measure(lambda q: find_closest_section(interval_annotation, q)[:2], queries)
+    print("interval lookup (us):\t%.2f" % (interval_time * 1e6))
+
+    edit_sections = LabelSections(starts[labels == 0], ends[labels == 0])
+    edit_starts = np.random.RandomState(2).randint(0, n_frames, n_queries)
+    start = time.perf_counter()
+    for s in edit_starts:
+        edit_sections.add(s, s + mean_length)
+        edit_sections.remove_frames(edit_sections.find(s), s, s + mean_length // 2)
+    print("interval edit (us):\t%.2f" % ((time.perf_counter() - start) / n_queries * 1e6))
+
+    if n_list_queries > 0:
+        start = time.perf_counter()
+        list_annotation = create_list_annotation(starts, ends, labels, n_labels)
+        print("list build (s):\t\t%.4f" % (time.perf_counter() - start))
+        list_time, list_results = measure(lambda q: get_annotation_of_frame_from_lists(list_annotation, q),
+                                          queries[:n_list_queries])
+        print("list lookup (us):\t%.2f" % (list_time * 1e6))
+        # the section indices can differ because touching sections of a label are merged into one interval
+        n_equal = sum(a[0] == b[0] for a, b in zip(interval_results, list_results))
+        print("equal labels:\t\t%d/%d" % (n_equal, len(list_results)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the annotation frame lookups.")
+    parser.add_argument("--frames", type=int, default=1000000)
+    parser.add_argument("--labels", type=int, default=4)
+    parser.add_argument("--section_length", type=int, default=120, help="mean length of a section in frames")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--list_queries", type=int, default=5, help="lookups using the list representation, 0 skips it")
+    args = parser.parse_args()
+    run_benchmark(args.frames, args.labels, args.section_length, args.queries, args.list_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Compares the latency of motion database calls with a new connection per request against the pooled client
+    using a local HTTP/1.1 server that answers every POST with a JSON payload.
+    The server is plain HTTP, so the savings of skipping the TLS handshake on a real server are not included.
+    Usage: python -m benchmarks.db_client_latency --requests 200 --payload 10000
+"""
+import json
+import time
+import argparse
+import threading
+import requests
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from tool.plugins.database.db_client import DBClient
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def create_handler(payload_size):
+    payload = json.dumps({"data": "x" * payload_size}).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately, with nagle the body waits for the delayed ack of the client
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+def measure(post, url, n_requests):
+    data = json.dumps({"collection": "0", "skeleton": "custom"})
+    start = time.perf_counter()
+    for i in range(n_requests):
+        post(url, data=data).text
+    return time.perf_counter() - start
+
+
+def run_benchmark(n_requests, payload_size):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(payload_size))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:%d/get_motion_list" % server.server_address[1]
+    try:
+        client = DBClient()
+        measure(client.post, url, 1)
+        new_connection_time = measure(requests.post, url, n_requests)
+        pooled_time = measure(client.post, url, n_requests)
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("client\t\ttotal (s)\tper request (ms)")
+    print("requests.post\t%.3f\t\t%.3f" % (new_connection_time, 1000 * new_connection_time / n_requests))
+    print("DBClient\t%.3f\t\t%.3f" % (pooled_time, 1000 * pooled_time / n_requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled against unpooled motion database requests.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--payload", type=int, default=1000, help="size of the response in bytes")
+    args = parser.parse_args()
+    run_benchmark(args.requests, args.payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Measures the motion graph edge construction time against the number of frames
+    using synthetic clips of smoothly varying joint rotations.
+    Usage: python -m benchmarks.motion_graph_build --frames 1000 5000 20000
+"""
+import time
+import argparse
+import numpy as np
+from tool.plugins.morphablegraphs.motion_graph_edges import create_edges, normalize_quaternions
+
+
+def create_synthetic_nodes(n_frames, n_joints, n_clips, seed=0):
+    rng = np.random.RandomState(seed)
+    clip_ids = np.sort(rng.randint(0, n_clips, n_frames))
+    base = rng.normal(size=(n_joints, 4))
+    noise = np.cumsum(rng.normal(scale=0.01, size=(n_frames, n_joints, 4)), axis=0)
+    quats = normalize_quaternions(base[None, :, :] + noise)
+    velocities = np.zeros((n_frames, 3 + n_joints * 4))
+    velocities[1:, 3:] = np.diff(quats, axis=0).reshape(n_frames - 1, -1)
+    velocities[:, :3] = rng.normal(scale=0.01, size=(n_frames, 3))
+    phase = np.linspace(0, n_frames / 30.0 * np.pi, n_frames)
+    contacts = np.stack([np.cos(phase), np.cos(phase + 0.5), np.sin(phase), np.sin(phase + 0.5)], axis=1)
+    return quats, velocities, contacts, clip_ids
+
+
+def run_benchmark(frame_counts, n_joints, n_clips, distance_threshold, block_size, dense_limit, n_workers):
+    print("frames\tindex (s)\tdense (s)\tedges")
+    for n_frames in frame_counts:
+        quats, velocities, contacts, clip_ids = create_synthetic_nodes(n_frames, n_joints, n_clips)
+        start = time.perf_counter()
+        edges = create_edges(quats, velocities, contacts, clip_ids, distance_threshold, block_size, True, n_workers)
+        index_time = time.perf_counter() - start
+        dense_time = "-"
+        if n_frames <= dense_limit:
+            start = time.perf_counter()
+            create_edges(quats, velocities, contacts, clip_ids, distance_threshold, block_size, False, n_workers)
+            dense_time = "%.3f" % (time.perf_counter() - start)
+        n_edges = sum(len(e) for e in edges.values())
+        print("%d\t%.3f\t\t%s\t\t%d" % (n_frames, index_time, dense_time, n_edges))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the motion graph edge construction.")
+    parser.add_argument("--frames", nargs="+", type=int, default=[1000, 2000, 5000, 10000, 20000])
+    parser.add_argument("--joints", type=int, default=20)
+    parser.add_argument("--clips", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--block_size", type=int, default=256)
+    parser.add_argument("--dense_limit", type=int, default=10000, help="skip the dense comparison above this frame count")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, 0 uses all cores")
+    args = parser.parse_args()
+    n_workers = args.workers if args.workers > 0 else None
+    run_benchmark(args.frames, args.joints, args.clips, args.threshold, args.block_size, args.dense_limit, n_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,8 @@
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 import sys, traceback
 import os
+import time
+import argparse
 #workaround for wrong Qt5 DLL path http://www.programmersought.com/article/8605863159/
 import PySide2
 if os.name == 'nt':
@@ -29,30 +31,75 @@ if os.name == 'nt':
     plugin_path = os.path.join(dirname, 'plugins', 'platforms')
     os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = plugin_path
 from PySide2.QtWidgets import QApplication
+from PySide2.QtCore import QTimer
 from tool.constants import CONFIG_FILE
-import pygame
-pygame.init()
+
+
+class StartupProfiler(object):
+    """ measures the duration of the startup steps until the main window is shown """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.steps = []
+
+    def step(self, name):
+        t = time.perf_counter()
+        self.steps.append((name, t - self.last))
+        self.last = t
+
+    def print_summary(self):
+        from tool import plugins
+        print("startup time breakdown:")
+        for name, duration in self.steps:
+            print("  %-28s %8.1f ms" % (name, duration * 1000))
+        for name, duration in plugins.import_times.items():
+            print("    %-26s %8.1f ms" % (name, duration * 1000))
+        print("  %-28s %8.1f ms" % ("total", (self.last - self.start) * 1000))
+        print("use python -X importtime main.py for a breakdown by module")
+
+
+def init_pygame():
+    """ pygame is optional and initialized after the window is shown to not delay the startup """
+    try:
+        import pygame
+        pygame.init()
+    except ImportError:
+        pass
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Motion preprocessing tool")
+    parser.add_argument("--profile-startup", action="store_true", help="print the duration of the startup steps")
+    args, qt_args = parser.parse_known_args()
+    profiler = StartupProfiler()
     if os.path.isfile(CONFIG_FILE):
         from tool.constants import set_constants_from_file
         set_constants_from_file(CONFIG_FILE)
+    profiler.step("config")
     from tool import core
+    profiler.step("import tool.core")
     from tool import plugins
+    profiler.step("import tool.plugins")
 
     from tool.core.editor_window import EditorWindow
 
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     # set style according to http://discourse.techart.online/t/release-qt-dark-orange-stylesheet/
     style_sheet_file = os.sep.join(["tool", "core", "darkorange.stylesheet"])
     app.setStyle('Fusion')
     with open(style_sheet_file, "r") as fh:
         app.setStyleSheet(fh.read())
+    profiler.step("create application")
     
     win = EditorWindow()
+    profiler.step("create window")
     win.show()
     app.setActiveWindow(win)
+    profiler.step("show window")
+    if args.profile_startup:
+        profiler.print_summary()
+    QTimer.singleShot(0, init_pygame)
     app.exec_()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
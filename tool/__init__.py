@@ -2,72 +2,42 @@ import json
 import collections
 from vis_utils.scene.scene_object_builder import SceneObjectBuilder, SceneObject
 from vis_utils.scene.utils import get_random_color
-from anim_utils.animation_data import BVHReader, MotionVector, SkeletonBuilder
+from anim_utils.animation_data import MotionVector, SkeletonBuilder
+
+
+def create_label_sections_from_meta_info(section, n_frames):
+    """ section: dict with start_idx and inclusive end_idx or a list of these dicts"""
+    from tool.core.annotation_sections import LabelSections
+    if type(section) != list:
+        section = [section]
+    label_sections = LabelSections()
+    for sub_section in section:
+        start = sub_section["start_idx"]
+        end = sub_section["end_idx"]
+        if end == -1:
+            end = n_frames-1
+        else:
+            end += 1
+        label_sections.add(start, end)
+    return label_sections
 
 
 def create_annotation_from_sections_list(sections, n_frames):
     annotations = collections.OrderedDict()
     for idx, section in enumerate(sections):
-        #print("section", label, section)
         label = "c"+str(idx)# TODO store labels
-        indices_sections = []
-        if type(section) == list:
-            for sub_section in section:
-                start = sub_section["start_idx"]
-                end = sub_section["end_idx"]
-                if end == -1:
-                    end = n_frames-1
-                else:
-                    end += 1
-                frame_indices = list(range(start, end))
-                indices_sections.append(frame_indices)
-        else:
-            start = section["start_idx"]
-            end = section["end_idx"]
-            if end == -1:
-                end = n_frames-1
-            else:
-                end += 1
-            frame_indices = list(range(start, end))
-            indices_sections.append(frame_indices)
-        annotations[label] = indices_sections
-    #return annotations
+        annotations[label] = create_label_sections_from_meta_info(section, n_frames)
     return collections.OrderedDict(sorted(annotations.items(), key=lambda x: x[1][0][0] if len(x[1]) > 0 else 0))
 
 def create_annotation_from_sections_dict(sections, n_frames):
     annotations = collections.OrderedDict()
     for label, section in sections.items():
-        #print("section", label, section)
-        indices_sections = []
-        if type(section) == list:
-            for sub_section in section:
-                start = sub_section["start_idx"]
-                end = sub_section["end_idx"]
-                if end == -1:
-                    end = n_frames-1
-                else:
-                    end += 1
-                frame_indices = list(range(start, end))
-                indices_sections.append(frame_indices)
-        else:
-            start = section["start_idx"]
-            end = section["end_idx"]
-            if end == -1:
-                end = n_frames-1
-            else:
-                end += 1
-            frame_indices = list(range(start, end))
-            indices_sections.append(frame_indices)
-        annotations[label] = indices_sections
-    #return annotations
+        annotations[label] = create_label_sections_from_meta_info(section, n_frames)
     return collections.OrderedDict(sorted(annotations.items(), key=lambda x: x[1][0][0] if len(x[1]) > 0 else 0))
 
 def get_bvh_from_str(bvh_str):
-    bvh_reader = BVHReader("")
-    lines = bvh_str.split("\n")
-    lines = [l for l in lines if len(l) > 0]
-    bvh_reader.process_lines(lines)
-    return bvh_reader
+    from tool.core.motion_cache import load_bvh_str
+    return load_bvh_str(bvh_str)
 
 
 def load_motion_from_str(builder, bvh_str, name, node_key, motion_id, meta_info_str="", draw_mode=2, visualize=True, color=None):
@@ -104,10 +74,10 @@ def load_motion_from_str(builder, bvh_str, name, node_key, motion_id, meta_info_
 
 
 
-def load_motion_from_json(builder, skeleton_data, motion_data, name, collection_id, motion_id, meta_data_str="", skeleton_model=None, is_processed=False, draw_mode=2, visualize=True, color=None, visible=True):
-    if color is None:
-        color = get_random_color()
-
+def parse_motion_from_json(skeleton_data, motion_data, skeleton_model=None):
+    """ creates the skeleton and motion vector of a motion from the database without touching the scene,
+        so that it can be called from a worker thread
+    """
     skeleton = SkeletonBuilder().load_from_custom_unity_format(skeleton_data)
     skeleton.skeleton_model = skeleton_model
     motion_vector = MotionVector()
@@ -115,6 +85,17 @@ def load_motion_from_json(builder, skeleton_data, motion_data, name, collection_
     motion_vector.skeleton = skeleton
     skeleton.frame_time = motion_vector.frame_time
     #motion_vector.scale_root(scale)
+    return skeleton, motion_vector
+
+
+def load_motion_from_json(builder, skeleton_data, motion_data, name, collection_id, motion_id, meta_data_str="", skeleton_model=None, is_processed=False, draw_mode=2, visualize=True, color=None, visible=True):
+    skeleton, motion_vector = parse_motion_from_json(skeleton_data, motion_data, skeleton_model)
+    return load_parsed_motion(builder, skeleton, motion_vector, name, collection_id, motion_id, meta_data_str, is_processed, draw_mode, visualize, color, visible)
+
+
+def load_parsed_motion(builder, skeleton, motion_vector, name, collection_id, motion_id, meta_data_str="", is_processed=False, draw_mode=2, visualize=True, color=None, visible=True):
+    if color is None:
+        color = get_random_color()
     o = builder.create_object("animation_controller", name, skeleton, motion_vector, motion_vector.frame_time, draw_mode, visualize, color)
     o.visible = visible
     if "data_base_ids" not in builder._scene.internal_vars:
@@ -149,4 +130,5 @@ def load_motion_from_json(builder, skeleton_data, motion_data, name, collection_
 
 SceneObjectBuilder.register_object("motion_from_str", load_motion_from_str)
 SceneObjectBuilder.register_object("motion_from_json", load_motion_from_json)
+SceneObjectBuilder.register_object("parsed_motion", load_parsed_motion)
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Applies a pipeline of edit instructions to all motion files of a directory without the editor window.
+    The pipeline is a JSON file with a list of [function name, parameters] pairs like the command history
+    exported by the animation editor. The functions are methods of AnimationEditorBase except for the steps
+    in BATCH_STEPS that are handled here. The files are processed in a process pool and a failing file does
+    not stop the other files.
+    Usage: python -m tool.batch pipeline.json input_dir output_dir [--workers 8] [--report report.json]
+    Example pipeline:
+        [["retarget", {"src_model": "cmu", "target_skeleton": "mh_cmu", "scale_factor": 1.0}],
+         ["smooth_using_moving_average", {"window_size": 15}],
+         ["cut_by_annotation", {}]]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import cpu_count
+import numpy as np
+from tool.constants import CONFIG_FILE
+
+ANNOTATION_SUFFIXES = ["_section.json", "_sections.json"]
+
+
+def load_pipeline(filename):
+    with open(filename, "rt") as in_file:
+        pipeline = json.load(in_file)
+    if isinstance(pipeline, dict):
+        pipeline = pipeline["instructions"]
+    return [(func_name, params) for func_name, params in pipeline]
+
+
+def load_annotation(filename):
+    """ returns the semantic annotation stored next to the motion file or None"""
+    from tool.core.annotation_sections import create_label_sections
+    base_name = os.path.splitext(filename)[0]
+    for suffix in ANNOTATION_SUFFIXES:
+        if os.path.isfile(base_name + suffix):
+            with open(base_name + suffix, "rt") as in_file:
+                annotation_data = json.load(in_file)
+            return {label: create_label_sections(sections) for label, sections in annotation_data["semantic_annotation"].items()}
+    return None
+
+
+def retarget(clips, src_model, target_skeleton, scale_factor=1.0, place_on_ground=False):
+    """ src_model and target_skeleton are names of local skeleton definitions"""
+    from anim_utils.animation_data import SkeletonBuilder
+    from anim_utils.retargeting.analytical import Retargeting, generate_joint_map
+    from tool.core.skeleton_registry import get_skeleton_registry
+    registry = get_skeleton_registry()
+    target_data = registry.load(target_skeleton)
+    if target_data is None:
+        raise ValueError("unknown target skeleton " + target_skeleton)
+    target = SkeletonBuilder().load_from_custom_unity_format(target_data["skeleton"])
+    target.skeleton_model = target_data["model"]
+    results = []
+    for name, mv, annotation in clips:
+        src_skeleton = copy.deepcopy(mv.skeleton)
+        src_skeleton.skeleton_model = registry.load_model(src_model)
+        joint_map = generate_joint_map(src_skeleton.skeleton_model, target.skeleton_model)
+        retargeting = Retargeting(src_skeleton, target, joint_map, scale_factor, additional_rotation_map=None, place_on_ground=place_on_ground)
+        new_mv = copy.copy(mv)
+        new_mv.frames = np.array([retargeting.retarget_frame(frame, target.reference_frame) for frame in mv.frames])
+        new_mv.n_frames = len(new_mv.frames)
+        new_mv.skeleton = target
+        results.append((name, new_mv, annotation))
+    return results
+
+
+def cut_by_annotation(clips, labels=None):
+    """ replaces each clip by one clip per annotated section, clips without annotation are kept"""
+    results = []
+    for name, mv, annotation in clips:
+        if annotation is None:
+            results.append((name, mv, annotation))
+            continue
+        for label, sections in annotation.items():
+            if labels is not None and label not in labels:
+                continue
+            for section in sections:
+                start, end = section.start, section.stop
+                clip = copy.copy(mv)
+                clip.frames = mv.frames[start:end].copy()
+                clip.n_frames = len(clip.frames)
+                results.append((name + "_" + label + "_" + str(start) + "-" + str(end - 1), clip, None))
+    return results
+
+
+# steps that are not methods of the animation editor, they map a list of (name, motion vector, annotation)
+BATCH_STEPS = {"retarget": retarget, "cut_by_annotation": cut_by_annotation}
+
+
+def apply_edit(clips, func_name, params):
+    from vis_utils.animation.animation_editor import AnimationEditorBase
+    for name, mv, annotation in clips:
+        anim_editor = AnimationEditorBase(mv.skeleton, mv)
+        anim_editor.apply_edit(func_name, params)
+    return clips
+
+
+def process_file(filename, rel_name, pipeline, out_dir):
+    """ runs the pipeline on one file and writes the results, errors are returned instead of raised
+        Returns:
+            result (dict): file name, status, output files, error message and duration in seconds
+    """
+    start = time.perf_counter()
+    result = {"file": rel_name, "status": "ok", "outputs": [], "error": None}
+    try:
+        from tool.core.animation_directory_explorer import load_motion
+        mv = load_motion(filename)
+        name = os.path.splitext(rel_name)[0]
+        clips = [(name, mv, load_annotation(filename))]
+        for func_name, params in pipeline:
+            if func_name in BATCH_STEPS:
+                clips = BATCH_STEPS[func_name](clips, **params)
+            else:
+                clips = apply_edit(clips, func_name, params)
+        for clip_name, clip, _ in clips:
+            out_filename = out_dir + os.sep + clip_name + ".bvh"
+            os.makedirs(os.path.dirname(out_filename), exist_ok=True)
+            clip.export(clip.skeleton, out_filename, False)
+            result["outputs"].append(out_filename)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+        result["traceback"] = traceback.format_exc()
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+def init_worker(config_file):
+    if os.path.isfile(config_file):
+        from tool.constants import set_constants_from_file
+        set_constants_from_file(config_file)
+
+
+def find_files(in_dir, filetypes, recursive):
+    from tool.core.animation_directory_explorer import can_load_motion
+    files = []
+    for filetype in filetypes:
+        pattern = "**/*." + filetype if recursive else "*." + filetype
+        files += [str(p) for p in Path(in_dir).glob(pattern) if can_load_motion(str(p))]
+    return sorted(set(files))
+
+
+def has_outputs(out_dir, rel_name):
+    name = os.path.splitext(rel_name)[0]
+    return os.path.isfile(out_dir + os.sep + name + ".bvh") or len(list(Path(out_dir).glob(name + "_*.bvh"))) > 0
+
+
+def run_batch(pipeline, in_dir, out_dir, n_workers=None, filetypes=("bvh",), recursive=False, skip_existing=False, config_file=CONFIG_FILE):
+    """ processes the files in a process pool and prints the progress per file
+        Returns:
+            report (dict): summary and the result of each file
+    """
+    start = time.perf_counter()
+    files = find_files(in_dir, filetypes, recursive)
+    jobs = [(f, os.path.relpath(f, in_dir)) for f in files]
+    results = []
+    if skip_existing:
+        skipped = [rel_name for f, rel_name in jobs if has_outputs(out_dir, rel_name)]
+        results += [{"file": rel_name, "status": "skipped", "outputs": [], "error": None, "duration": 0.0} for rel_name in skipped]
+        skipped = set(skipped)
+        jobs = [(f, rel_name) for f, rel_name in jobs if rel_name not in skipped]
+    n_jobs = len(jobs)
+    if n_workers is None:
+        n_workers = cpu_count()
+    n_workers = max(1, min(n_workers, n_jobs))
+    print("process", n_jobs, "files with", n_workers, "workers")
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker, initargs=(config_file,)) as pool:
+        futures = {pool.submit(process_file, f, rel_name, pipeline, out_dir): rel_name for f, rel_name in jobs}
+        for count, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                # the worker process died, e.g. because it ran out of memory
+                result = {"file": futures[future], "status": "failed", "outputs": [], "error": str(e), "duration": 0.0}
+            results.append(result)
+            message = "[%d/%d] %s %s (%.1f s)" % (count, n_jobs, result["status"], result["file"], result["duration"])
+            if result["error"] is not None:
+                message += ": " + result["error"]
+            print(message)
+            sys.stdout.flush()
+    summary = dict()
+    for status in ["ok", "failed", "skipped"]:
+        summary[status] = sum(1 for r in results if r["status"] == status)
+    summary["outputs"] = sum(len(r["outputs"]) for r in results)
+    summary["duration"] = time.perf_counter() - start
+    return {"summary": summary, "results": sorted(results, key=lambda r: r["file"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a pipeline of edit instructions to a directory of motions.")
+    parser.add_argument("pipeline", help="JSON file with a list of [function name, parameters] pairs")
+    parser.add_argument("in_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, by default the number of cores")
+    parser.add_argument("--filetypes", nargs="+", default=["bvh"])
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--skip_existing", action="store_true", help="skip files that already have outputs")
+    parser.add_argument("--report", default=None, help="JSON file for the result of each file")
+    args = parser.parse_args()
+    init_worker(CONFIG_FILE)
+    pipeline = load_pipeline(args.pipeline)
+    report = run_batch(pipeline, args.in_dir, args.out_dir, args.workers, args.filetypes, args.recursive, args.skip_existing)
+    summary = report["summary"]
+    print("done in %.1f s: %d ok, %d failed, %d skipped, %d output files" % (summary["duration"], summary["ok"],
+          summary["failed"], summary["skipped"], summary["outputs"]))
+    for result in report["results"]:
+        if result["status"] == "failed":
+            print("failed", result["file"] + ":", result["error"])
+    if args.report is not None:
+        with open(args.report, "wt") as out_file:
+            json.dump(report, out_file, indent=4)
+    if summary["failed"] > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
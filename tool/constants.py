@@ -21,18 +21,28 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 import os
-import glob
-import collections
 import json
 from vis_utils import constants as vis_constants
 
 CONFIG_FILE = "config.json"
 DATA_DIR = "data"
-LOCAL_SKELETON_MODELS = collections.OrderedDict()
+# target rates of the main loop in Hz
+SIMULATION_RATE = 30.0
+ANIMATION_RATE = 60.0
+RENDER_RATE = 60.0
+# binary cache of parsed motion files, the directory defaults to DATA_DIR/motion_cache
+MOTION_CACHE_DIR = None
+MOTION_CACHE_SIZE = 4096 # MB
+USE_MOTION_CACHE = True
+# memory used by the motions loaded by an animation directory explorer
+DIRECTORY_EXPLORER_CACHE_SIZE = 512 # MB
+DIRECTORY_EXPLORER_PREFETCH = 1 # number of files before and after the selected file that are loaded in the background
 
 def set_constants_from_file(filename):
     global DATA_DIR
-    global LOCAL_SKELETON_MODELS
+    global SIMULATION_RATE, ANIMATION_RATE, RENDER_RATE
+    global MOTION_CACHE_DIR, MOTION_CACHE_SIZE, USE_MOTION_CACHE
+    global DIRECTORY_EXPLORER_CACHE_SIZE, DIRECTORY_EXPLORER_PREFETCH
     vis_constants.activate_simulation = True
     vis_constants.use_frame_buffer = True
     vis_constants.activate_shadows = True
@@ -45,9 +55,28 @@ def set_constants_from_file(filename):
     if "activate_shadows" in config:
         vis_constants.activate_shadows = config["activate_shadows"]
 
+    if "simulation_rate" in config:
+        SIMULATION_RATE = config["simulation_rate"]
+    if "animation_rate" in config:
+        ANIMATION_RATE = config["animation_rate"]
+    if "render_rate" in config:
+        RENDER_RATE = config["render_rate"]
+
+    if "motion_cache_dir" in config:
+        MOTION_CACHE_DIR = config["motion_cache_dir"]
+    if "motion_cache_size" in config:
+        MOTION_CACHE_SIZE = config["motion_cache_size"]
+    if "use_motion_cache" in config:
+        USE_MOTION_CACHE = config["use_motion_cache"]
+    if "directory_explorer_cache_size" in config:
+        DIRECTORY_EXPLORER_CACHE_SIZE = config["directory_explorer_cache_size"]
+    if "directory_explorer_prefetch" in config:
+        DIRECTORY_EXPLORER_PREFETCH = config["directory_explorer_prefetch"]
+
     if "data_dir" in config:
         DATA_DIR = config["data_dir"]
     
+    # the local skeleton models are loaded on demand by tool.core.skeleton_registry
     if not os.path.isdir(DATA_DIR):
         try:
             os.makedirs(DATA_DIR)
@@ -55,8 +84,3 @@ def set_constants_from_file(filename):
         except:
             print("Could not create data dir")
             pass
-    else:
-        for filename in glob.glob(DATA_DIR+os.sep+"skeletons"+os.sep+"*.json"):
-            name = filename.split(os.sep)[-1][:-5]
-            with open(filename, "rt") as in_file:
-                LOCAL_SKELETON_MODELS[name] = json.load(in_file)
@@ -23,20 +23,65 @@
 import os
 from pathlib import Path
 from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from PySignal import Signal
 import numpy as np
 from vis_utils.animation.animation_controller import AnimationController
 from vis_utils.scene.components import ComponentBase
 from vis_utils.animation.skeleton_visualization import SkeletonVisualization
-from anim_utils.animation_data import BVHReader, MotionVector, SkeletonBuilder
+from anim_utils.animation_data import MotionVector, SkeletonBuilder
 from anim_utils.animation_data.motion_state import MotionState
+from tool import constants
+from .motion_cache import load_bvh_file
+from .lru_cache import LRUCache
+from .directory_scanner import DirectoryScanner
+
+N_PREFETCH_WORKERS = 2
+_prefetch_executor = None
+
+
+def get_prefetch_executor():
+    """ returns the thread pool shared by all explorers"""
+    global _prefetch_executor
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=N_PREFETCH_WORKERS)
+    return _prefetch_executor
+
+
+def get_motion_size(mv):
+    """ approximate memory of a motion vector in bytes"""
+    return mv.frames.nbytes if mv.frames is not None else 0
+
+
+def load_bvh_motion(filename):
+    bvh_reader = load_bvh_file(filename)
+    mv = MotionVector()
+    mv.from_bvh_reader(bvh_reader, False)
+    animated_joints = list(bvh_reader.get_animated_joints())
+    mv.skeleton = SkeletonBuilder().load_from_bvh(bvh_reader, animated_joints=animated_joints)
+    return mv
+
+
+# file suffix to function that returns a motion vector, files of other types are listed but can not be selected
+MOTION_LOADERS = {".bvh": load_bvh_motion}
+
+
+def can_load_motion(filename):
+    return os.path.splitext(filename)[1].lower() in MOTION_LOADERS
+
+
+def load_motion(filename):
+    return MOTION_LOADERS[os.path.splitext(filename)[1].lower()](filename)
 
 
 class AnimationDirectoryExplorer(ComponentBase, AnimationController):
     updated_animation_frame = Signal()
     reached_end_of_animation = Signal()
 
-    def __init__(self, scene_object, folder_path, filetype, color):
+    def __init__(self, scene_object, folder_path, filetype, color, recursive=True):
+        """ filetype is a file suffix or a list of suffixes of the files that are listed,
+            the files are added by a background scan of the directory that keeps watching it for changes
+        """
         ComponentBase.__init__(self, scene_object)
         self.mainContext = 0
         self.name = folder_path
@@ -47,43 +92,119 @@ class AnimationDirectoryExplorer(ComponentBase, AnimationController):
         scene_object.add_component("skeleton_vis", self.skeleton_vis)
         self.folder_path = Path(folder_path)
         self._animation_files = []
+        self._animation_file_set = set()
+        # emitted from update with the lists of added or removed file names
+        self.added_animation_files = Signal()
+        self.removed_animation_files = Signal()
         self.current_controller = None
-        self.motion_cache = dict()
+        # motions are only added and removed in the main thread, the prefetched motions are added in update
+        self.motion_cache = LRUCache(constants.DIRECTORY_EXPLORER_CACHE_SIZE * 1024 * 1024, get_motion_size)
+        self.n_prefetch = constants.DIRECTORY_EXPLORER_PREFETCH
+        self._prefetch_futures = dict()
         self.state = None
-        for filename in self.folder_path.iterdir():
-            print(filename, filetype, filename.suffix)
-            if filename.is_file() and filename.suffix == "."+filetype:
-                self._animation_files.append(filename.name)
-        self.select_file(self._animation_files[0])
+        if isinstance(filetype, str):
+            filetype = [filetype]
+        self.scanner = DirectoryScanner(self.folder_path, ["*." + t for t in filetype], recursive)
+        self.scanner.start()
+
+    def cleanup(self):
+        """ stops the directory scanner and the pending prefetch requests, called when the scene object is deleted"""
+        self.scanner.stop()
+        for future in self._prefetch_futures.values():
+            future.cancel()
+        self._prefetch_futures = dict()
+
+    def update_animation_files(self):
+        """ applies the changes found by the scanner, needs to be called in the main thread"""
+        added, removed = self.scanner.poll()
+        if len(removed) > 0:
+            removed_set = set(removed)
+            self._animation_files = [f for f in self._animation_files if f not in removed_set]
+            self._animation_file_set -= removed_set
+            for filename in removed:
+                self.motion_cache.pop(filename)
+            self.removed_animation_files.emit(removed)
+        if len(added) > 0:
+            added = [f for f in added if f not in self._animation_file_set]
+            self._animation_files += added
+            self._animation_file_set.update(added)
+            if self.current_controller is None:
+                for filename in added:
+                    if can_load_motion(filename):
+                        self.select_file(filename)
+                        break
+            self.added_animation_files.emit(added)
 
     def select_file(self, filename):
-        if filename not in self._animation_files:
+        if filename not in self._animation_file_set or not can_load_motion(filename):
             return
-        if filename not in self.motion_cache:
-            self.load_file(filename)
+        self.collect_prefetched_files()
+        mv = self.motion_cache.get(filename)
+        if mv is None:
+            mv = self.load_file(filename)
         self.current_controller = filename
-        self.skeleton_vis.set_skeleton(self.motion_cache[filename].skeleton, True)
+        self.skeleton_vis.set_skeleton(mv.skeleton, True)
         self.skeleton_vis.visible = True
-        self.state = MotionState(self.motion_cache[filename])
+        self.state = MotionState(mv)
         self.state.play = self.playAnimation
         self.updateTransformation()
-        return self.motion_cache[filename].n_frames
+        self.prefetch_neighbors(filename)
+        return mv.n_frames
 
     def load_file(self, filename):
-        bvh_reader = BVHReader(str(self.folder_path) +os.sep+filename)
-        mv = MotionVector()
-        mv.from_bvh_reader(bvh_reader, False)
-        animated_joints = list(bvh_reader.get_animated_joints())
-        mv.skeleton = SkeletonBuilder().load_from_bvh(bvh_reader, animated_joints=animated_joints)
-        self.motion_cache[filename] = mv
+        """ loads the file in the calling thread unless it is already being prefetched"""
+        future = self._prefetch_futures.pop(filename, None)
+        mv = None
+        if future is not None and not future.cancelled():
+            try:
+                mv = future.result()
+            except Exception as e:
+                print("Warning: could not prefetch", filename, e)
+        if mv is None:
+            mv = load_motion(str(self.folder_path) + os.sep + filename)
+        self.motion_cache.put(filename, mv)
         return mv
 
+    def prefetch_neighbors(self, filename):
+        """ loads the previous and next files in the background, pending requests for other files are cancelled"""
+        idx = self._animation_files.index(filename)
+        neighbors = []
+        for offset in range(1, self.n_prefetch + 1):
+            for neighbor_idx in [idx + offset, idx - offset]:
+                if 0 <= neighbor_idx < len(self._animation_files) and can_load_motion(self._animation_files[neighbor_idx]):
+                    neighbors.append(self._animation_files[neighbor_idx])
+        for name in list(self._prefetch_futures.keys()):
+            if name not in neighbors and self._prefetch_futures[name].cancel():
+                del self._prefetch_futures[name]
+        executor = get_prefetch_executor()
+        for name in neighbors:
+            if name in self.motion_cache or name in self._prefetch_futures:
+                continue
+            self._prefetch_futures[name] = executor.submit(load_motion, str(self.folder_path) + os.sep + name)
+
+    def collect_prefetched_files(self):
+        """ moves the motions loaded by the worker threads into the cache, needs to be called in the main thread"""
+        for name in list(self._prefetch_futures.keys()):
+            future = self._prefetch_futures[name]
+            if not future.done():
+                continue
+            del self._prefetch_futures[name]
+            if future.cancelled():
+                continue
+            try:
+                self.motion_cache.put(name, future.result())
+            except Exception as e:
+                print("Warning: could not prefetch", name, e)
+
     def get_animation_files(self):
         return self._animation_files
 
     def update(self, dt):
         """ update current frame and global joint transformation matrices
         """
+        self.update_animation_files()
+        if len(self._prefetch_futures) > 0:
+            self.collect_prefetched_files()
         dt *= self.animationSpeed
         if self.isLoadedCorrectly():
             if self.playAnimation:
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Compact storage of semantic annotations.
+    The sections of a label are stored as sorted arrays of start and exclusive end frame indices.
+    A section is returned as a range object, so it can be used like the lists of frame indices
+    of the previous representation without storing every frame index.
+"""
+import collections
+from collections.abc import Sequence
+import numpy as np
+
+
+def get_index_runs(indices):
+    """ returns the start and exclusive end of the runs of consecutive values in a list of frame indices"""
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if len(indices) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(indices) > 1) + 1
+    starts = indices[np.concatenate([[0], breaks])]
+    ends = indices[np.concatenate([breaks - 1, [len(indices) - 1]])] + 1
+    return starts, ends
+
+
+class LabelSections(Sequence):
+    """ non-overlapping sections of one label ordered by their start frame
+        overlapping or touching sections are merged when they are added
+    """
+    def __init__(self, starts=None, ends=None):
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._ends = np.zeros(0, dtype=np.int64)
+        if starts is not None:
+            for start, end in zip(starts, ends):
+                self.add(start, end)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """ creates the sections from a boolean array with one entry per frame"""
+        return cls.from_frame_indices(np.flatnonzero(mask))
+
+    @classmethod
+    def from_frame_indices(cls, indices):
+        sections = cls()
+        sections._starts, sections._ends = get_index_runs(indices)
+        return sections
+
+    @property
+    def starts(self):
+        return self._starts
+
+    @property
+    def ends(self):
+        return self._ends
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        return range(int(self._starts[index]), int(self._ends[index]))
+
+    def __eq__(self, other):
+        other = create_label_sections(other)
+        return np.array_equal(self._starts, other.starts) and np.array_equal(self._ends, other.ends)
+
+    def __repr__(self):
+        return "LabelSections(" + str(list(zip(self._starts.tolist(), self._ends.tolist()))) + ")"
+
+    def to_list(self):
+        """ returns the sections as lists of frame indices, which is the format of the annotation files"""
+        return [list(range(start, end)) for start, end in zip(self._starts.tolist(), self._ends.tolist())]
+
+    def copy(self):
+        sections = LabelSections()
+        sections._starts = np.copy(self._starts)
+        sections._ends = np.copy(self._ends)
+        return sections
+
+    def get_n_frames(self):
+        return int(np.sum(self._ends - self._starts))
+
+    def add(self, start, end):
+        """ adds the frames from start to the exclusive end and merges overlapping or touching sections"""
+        start, end = int(start), int(end)
+        if end <= start:
+            return
+        first = int(np.searchsorted(self._ends, start, side="left"))
+        last = int(np.searchsorted(self._starts, end, side="right"))
+        if first < last:
+            start = min(start, int(self._starts[first]))
+            end = max(end, int(self._ends[last - 1]))
+        self._starts = np.concatenate([self._starts[:first], [start], self._starts[last:]]).astype(np.int64)
+        self._ends = np.concatenate([self._ends[:first], [end], self._ends[last:]]).astype(np.int64)
+
+    def pop(self, index):
+        section = self[index]
+        self._starts = np.delete(self._starts, index)
+        self._ends = np.delete(self._ends, index)
+        return section
+
+    def remove_frames(self, index, start, end):
+        """ removes the frames from start to the exclusive end from one section which can split it into two"""
+        section = self.pop(index)
+        self.add(section.start, min(start, section.stop))
+        self.add(max(end, section.start), section.stop)
+
+    def find(self, frame_idx):
+        """ returns the index of the section that contains the frame or None"""
+        index = int(np.searchsorted(self._starts, frame_idx, side="right")) - 1
+        if index >= 0 and frame_idx < self._ends[index]:
+            return index
+
+    def find_closest(self, frame_idx):
+        """ returns the index of the section with the smallest distance to the frame and the distance
+            ties are resolved in favor of the earlier section
+        """
+        if len(self._starts) == 0:
+            return None, np.inf
+        index = int(np.searchsorted(self._starts, frame_idx, side="right")) - 1
+        best_index, best_distance = None, np.inf
+        for i in [index, index + 1]:
+            if 0 <= i < len(self._starts):
+                distance = max(self._starts[i] - frame_idx, frame_idx - (self._ends[i] - 1), 0)
+                if distance < best_distance:
+                    best_index, best_distance = i, int(distance)
+        return best_index, best_distance
+
+
+def create_label_sections(sections):
+    """ converts a list of sections given as lists of frame indices or range objects into LabelSections
+        sections with gaps are split into runs of consecutive frames and a flat list of frame indices is also accepted
+    """
+    if isinstance(sections, LabelSections):
+        return sections
+    result = LabelSections()
+    for section in sections:
+        if isinstance(section, range):
+            result.add(section.start, section.stop)
+        elif np.ndim(section) == 0:
+            return LabelSections.from_frame_indices(sections)
+        else:
+            for start, end in zip(*get_index_runs(section)):
+                result.add(start, end)
+    return result
+
+
+def create_annotation_sections(annotation):
+    """ returns an ordered dict that maps the labels to LabelSections"""
+    return collections.OrderedDict((label, create_label_sections(sections)) for label, sections in annotation.items())
+
+
+def copy_annotation_sections(annotation):
+    """ returns an ordered dict with copies of the sections, so that editing them does not change the original"""
+    return collections.OrderedDict((label, create_label_sections(sections).copy()) for label, sections in annotation.items())
+
+
+def create_annotation_lists(annotation):
+    """ returns an ordered dict that maps the labels to lists of sections that can be written to JSON"""
+    return collections.OrderedDict((label, create_label_sections(sections).to_list()) for label, sections in annotation.items())
+
+
+def find_closest_section(annotation, frame_idx, ignore_label=None):
+    """ returns the label, section index and distance of the section that contains or is closest to the frame
+        each label is searched with a binary search and ties are resolved in favor of the earlier label
+    """
+    closest_label, closest_idx, closest_distance = None, None, np.inf
+    for label, sections in annotation.items():
+        if label == ignore_label:
+            continue
+        section_idx, distance = sections.find_closest(frame_idx)
+        if distance < closest_distance:
+            closest_label, closest_idx, closest_distance = label, section_idx, distance
+            if distance == 0:
+                break
+    return closest_label, closest_idx, closest_distance
+
+
+def find_sections_of_frame(annotation, frame_idx):
+    """ returns the labels and section indices of all sections that contain the frame"""
+    result = []
+    for label, sections in annotation.items():
+        section_idx = sections.find(frame_idx)
+        if section_idx is not None:
+            result.append((label, section_idx))
+    return result
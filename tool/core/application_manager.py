@@ -28,15 +28,35 @@
 import sys
 import time
 import math
+from functools import partial
 from PySide2.QtCore import QObject, QTimer, Qt
 from PySignal import Signal
 from vis_utils.scene.editor_scene import EditorScene
 from OpenGL.GL import *
 from vis_utils.scene.scene_interaction import SceneInteraction, INTERACTION_DEFINE_SPLINE, INTERACTION_NONE, INTERACTION_DEFINE_MARKER
 from vis_utils import constants
+from tool import constants as tool_constants
+from .frame_scheduler import FrameScheduler
 if constants.activate_simulation:
     from physics_utils.sim import SimWorld
 
+MAX_REDRAW_INTERVAL = 1.0 # seconds, views are redrawn at least this often in case a change was not signaled
+# methods of the components that change the displayed pose, they are called by widgets and dialogs without a scene signal
+REDRAW_METHODS = ["updateTransformation", "setCurrentFrameNumber", "replace_frames", "replace_motion_from_file",
+                  "retarget_from_src", "set_reference_frame", "set_draw_mode"]
+
+
+def is_playing(scene):
+    """ returns True if a component of the scene plays an animation, so that the scene changes on every update"""
+    for scene_object in scene.objectList():
+        for component in scene_object._components.values():
+            if getattr(component, "playAnimation", False) is True:
+                return True
+            is_component_playing = getattr(component, "isPlaying", None)
+            if callable(is_component_playing) and is_component_playing():
+                return True
+    return False
+
 class ApplicationManager(QObject):
     """ main application logic
     controls the updates to the scene done by the main thread via a Qt.QTimer event
@@ -58,16 +78,25 @@ class ApplicationManager(QObject):
             self.visualize = visualize
             self.frames = 0
             self.fps = 60.0
-            self.sim_dt = 1/30
-            self.interval = 1.0 / self.fps
+            self.scheduler = FrameScheduler(tool_constants.SIMULATION_RATE, tool_constants.ANIMATION_RATE,
+                                            tool_constants.RENDER_RATE)
+            self.profiler = self.scheduler.profiler
+            self.sim_dt = self.scheduler.sim_dt
+            self.interval = self.scheduler.get_timer_interval()
             self.last_time = time.perf_counter()
             self.last_fps_update_time = self.last_time
+            self.last_redraw_time = self.last_time
             self.views = list()
+            self.dirty_views = set()
+            # scene objects by node id, their components are cleaned up when the object is deleted
+            self.watched_objects = dict()
             self.statusBar = None
             self.scene = None
+            self.sim = None
             self.graphics_widget = graphics_widget
             self.interaction = SceneInteraction()
             self.timer = QTimer()
+            self.timer.setTimerType(Qt.PreciseTimer)
             self.timer.timeout.connect(self.update)
             self.timer.start(0)
             self.timer.setInterval(self.interval*1000)
@@ -80,6 +109,35 @@ class ApplicationManager(QObject):
         """adds view to list of views whose paint function is called by the function self.update()
         """
         self.views.append(view)
+        self.dirty_views.add(view)
+
+    def request_redraw(self, view=None):
+        """ marks a view or all views to be rendered in the next render tick"""
+        if view is None:
+            self.dirty_views.update(self.views)
+        else:
+            self.dirty_views.add(view)
+
+    def set_update_rates(self, sim_rate=None, anim_rate=None, render_rate=None):
+        self.scheduler.set_rates(sim_rate, anim_rate, render_rate)
+        self.sim_dt = self.scheduler.sim_dt
+        self.interval = self.scheduler.get_timer_interval()
+        self.timer.setInterval(self.interval*1000)
+
+    def get_phase_timings(self):
+        """ returns the statistics of the durations in seconds of the phases of the main loop"""
+        return self.scheduler.get_phase_timings()
+
+    def set_component_profiling(self, enabled):
+        """ measures the update of each scene object component in addition to the phases of the main loop"""
+        if enabled and self.scene is not None:
+            self.profiler.instrument_scene(self.scene)
+        else:
+            self.profiler.remove_instrumentation()
+
+    def dump_profile(self, filename):
+        """ writes the statistics of the phase timings as JSON"""
+        self.profiler.dump(filename)
        
     def init_scenes(self):
         sim = None
@@ -90,6 +148,7 @@ class ApplicationManager(QObject):
             sim_settings["add_ground"] = True
             sim = SimWorld(**sim_settings)
         
+        self.sim = sim
         self.scene = EditorScene(self.visualize, sim)
         self.scene.added_scene_object.connect(self.relayAddedSceneObject)
         self.scene.reached_end_of_animation.connect(self.relayEndOfAnimation)
@@ -98,11 +157,46 @@ class ApplicationManager(QObject):
         self.scene.updated_animation_frame.connect(self.relayUpdateAnimationFrame)
         self.interaction.set_scene(self.scene)
         for view in self.views:
+            view.mouse_click.connect(partial(self.on_view_input, view))
+            view.mouse_move.connect(partial(self.on_view_input, view))
+            view.mouse_release.connect(partial(self.on_view_input, view))
+            view.view_changed.connect(partial(self.on_view_input, view))
             view.mouse_click.connect(self.on_mouse_click)
             view.mouse_move.connect(self.on_mouse_move)
             view.mouse_release.connect(self.on_mouse_release)
         print("init scene")
 
+    def on_view_input(self, view, *args):
+        self.dirty_views.add(view)
+
+    def watch_object(self, scene_object):
+        """ wraps the methods of the components that change the displayed pose so that they request a redraw,
+            e.g. the frame slider and the blend parameter sliders call them directly
+        """
+        for component in scene_object._components.values():
+            for name in REDRAW_METHODS:
+                if name in getattr(component, "__dict__", dict()) or not callable(getattr(component, name, None)):
+                    continue
+                setattr(component, name, self._wrap_redraw(getattr(component, name)))
+        self.watched_objects[scene_object.node_id] = scene_object
+
+    def cleanup_object(self, node_id):
+        """ calls the cleanup method of the components of a deleted scene object, e.g. to stop background threads"""
+        scene_object = self.watched_objects.pop(node_id, None)
+        if scene_object is None:
+            return
+        for component in scene_object._components.values():
+            cleanup = getattr(component, "cleanup", None)
+            if callable(cleanup):
+                cleanup()
+
+    def _wrap_redraw(self, method):
+        def redraw_after(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.request_redraw()
+            return result
+        return redraw_after
+
     def on_mouse_click(self, event, ray_start, ray_dir, pos, node_id):
         self.interaction.handleMouseClick(event, ray_start, ray_dir, pos)
         if event.button() == Qt.LeftButton:
@@ -118,20 +212,39 @@ class ApplicationManager(QObject):
         
     def update(self):
         """ main loop of the application
+        runs the simulation steps, the animation update and the rendering when they are due according to the scheduler
         """
-        dt = self.update_delta_time()
-        if self.scene is not None:
-            # from locotest
-            n_steps = int(math.ceil(self.interval / self.sim_dt))
-            self.scene.before_update(dt)
-            for i in range(0, n_steps):
-                self.scene.sim_update(self.sim_dt)
-            self.scene.update(dt)
-            self.scene.after_update(dt)
-
-        for view in self.views:
-            view.graphics_context.update(dt)
-            self.drawOnView(view)
+        n_sim_steps, anim_dt, render_dt = self.scheduler.advance()
+        if self.scene is not None and (n_sim_steps > 0 or anim_dt is not None):
+            if anim_dt is not None:
+                with self.profiler.measure("before_update"):
+                    self.scene.before_update(anim_dt)
+            with self.profiler.measure("sim_update"):
+                for i in range(0, n_sim_steps):
+                    self.scene.sim_update(self.sim_dt)
+            if anim_dt is not None:
+                with self.profiler.measure("update"):
+                    self.scene.update(anim_dt)
+                with self.profiler.measure("after_update"):
+                    self.scene.after_update(anim_dt)
+            # the scene only changes on its own while the simulation runs or an animation is played
+            if (n_sim_steps > 0 and self.sim is not None) or (anim_dt is not None and is_playing(self.scene)):
+                self.request_redraw()
+
+        if render_dt is not None:
+            self.update_delta_time()
+            if self.last_time - self.last_redraw_time > MAX_REDRAW_INTERVAL:
+                self.request_redraw()
+            if len(self.dirty_views) > 0:
+                self.last_redraw_time = self.last_time
+            with self.profiler.measure("render"):
+                for idx, view in enumerate(self.views):
+                    if view not in self.dirty_views:
+                        continue
+                    with self.profiler.measure("render/view" + str(idx)):
+                        view.graphics_context.update(render_dt)
+                        self.drawOnView(view)
+            self.dirty_views.clear()
 
     def update_scene(self, scene, dt):
         n_steps = int(math.ceil(self.interval / self.sim_dt))
@@ -160,7 +273,7 @@ class ApplicationManager(QObject):
             self.fps = self.frames
             self.frames = 0
             self.last_fps_update_time = t
-        self.update_status_bar("FPS " + str(round(self.fps)))
+            self.update_status_bar("FPS " + str(round(self.fps)))
         self.frames += 1
         return dt
 
@@ -219,26 +332,37 @@ class ApplicationManager(QObject):
     #======================================================================================================
 
     def relayAddedSceneObject(self, sceneId):
+        self.request_redraw()
         sceneObject = self.scene.getObject(sceneId)
+        if sceneObject is not None:
+            self.watch_object(sceneObject)
+        if sceneObject is not None and self.profiler.instrument_components:
+            self.profiler.instrument_object(sceneObject)
         if sceneObject is not None:
             self.added_scene_object.emit(sceneId, sceneObject.name)
         else:
             self.added_scene_object.emit(None, None)
 
     def relayUpdateSceneObject(self, sceneId):
+        self.request_redraw()
         self.update_scene_object.emit(sceneId)
    
     def relayEndOfAnimation(self,animationIndex,loop):
         self.reached_end_of_animation.emit(animationIndex,loop)
         
     def relayUpdateAnimationFrame(self,frameNumber):
+        self.request_redraw()
         self.updated_animation_frame.emit(frameNumber)
 
     def relayDeletedSceneObject(self, node_id):
+        self.cleanup_object(node_id)
+        self.request_redraw()
         self.deleted_scene_object.emit(node_id)
 
     def deinitialize(self):
         self.timer.stop()
+        for node_id in list(self.watched_objects.keys()):
+            self.cleanup_object(node_id)
 
     def loadFile(self, path):
         if self.scene.object_builder.load_file(path):
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Retargeting of the frames of many clips in a process pool.
+    The Retargeting instances are sent once to each worker process when it starts and the clips are split
+    into chunks of frames that are retargeted independently. The results are collected with poll, which
+    is meant to be called from a timer in the GUI thread.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
+import numpy as np
+
+CHUNK_SIZE = 500 # frames
+
+_worker_retargetings = None
+
+
+def init_worker(retargetings):
+    global _worker_retargetings
+    _worker_retargetings = retargetings
+
+
+def retarget_frames(key, frames):
+    retargeting, reference_frame = _worker_retargetings[key]
+    return np.array([retargeting.retarget_frame(frame, reference_frame) for frame in frames])
+
+
+class BatchRetargeting(object):
+    """ retargetings: dict of key to a tuple of a Retargeting instance and the reference frame of the target skeleton """
+    def __init__(self, retargetings, n_workers=None, chunk_size=CHUNK_SIZE):
+        if n_workers is None:
+            n_workers = cpu_count()
+        self.chunk_size = chunk_size
+        self._pool = ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker, initargs=(retargetings,))
+        self._jobs = dict()
+        self.n_jobs = 0
+        self.n_finished = 0
+        self.cancelled = False
+
+    def submit(self, name, key, frames):
+        frames = np.asarray(frames)
+        futures = []
+        for start in range(0, max(len(frames), 1), self.chunk_size):
+            futures.append(self._pool.submit(retarget_frames, key, frames[start:start + self.chunk_size]))
+        self._jobs[name] = futures
+        self.n_jobs += 1
+
+    def poll(self):
+        """ returns the clips whose chunks are all done
+            Returns:
+                finished (list): tuples of name, retargeted frames or None and the error or None
+        """
+        finished = []
+        for name in list(self._jobs.keys()):
+            futures = self._jobs[name]
+            if not all(f.done() for f in futures):
+                continue
+            del self._jobs[name]
+            self.n_finished += 1
+            try:
+                frames = np.concatenate([f.result() for f in futures], axis=0)
+                finished.append((name, frames, None))
+            except Exception as e:
+                finished.append((name, None, e))
+        return finished
+
+    def is_finished(self):
+        return len(self._jobs) == 0
+
+    def cancel(self):
+        """ cancels the chunks that have not started yet and stops the pool without waiting"""
+        self.cancelled = True
+        for futures in self._jobs.values():
+            for f in futures:
+                f.cancel()
+        self._jobs = dict()
+        self._pool.shutdown(wait=False)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
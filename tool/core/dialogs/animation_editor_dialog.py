@@ -35,6 +35,20 @@ from vis_utils.animation.animation_editor import AnimationEditor
 from vis_utils.io import save_json_file
 from vis_utils.scene.utils import get_random_color
 from tool.core.annotation_editor import AnnotationEditor
+from tool.core.annotation_sections import LabelSections
+from tool.core.motion_features import MotionFeatures
+
+
+def get_contact_thresholds(foot_constraint_generator, frame_time):
+    """ returns the contact tolerances of the foot constraint generator or None for the relative defaults of MotionFeatures
+        the velocity threshold of the generator is a distance per frame and is converted to a distance per second
+    """
+    height_tolerance = getattr(foot_constraint_generator, "contact_tolerance", None)
+    velocity_threshold = getattr(foot_constraint_generator, "foot_velocity_threshold",
+                                 getattr(foot_constraint_generator, "velocity_threshold", None))
+    if velocity_threshold is not None:
+        velocity_threshold = velocity_threshold / frame_time
+    return height_tolerance, velocity_threshold
 
 
 class AnimationEditorDialog(QDialog, Ui_Dialog):
@@ -441,16 +455,20 @@ class AnimationEditorDialog(QDialog, Ui_Dialog):
 
     def detect_foot_contacts(self):
         source_ground_height = float(self.sourceGroundHeightLineEdit.text())
-        ground_contacts = self._animation_editor.detect_ground_contacts(source_ground_height)
+        foot_constraint_generator = self._animation_editor.foot_constraint_generator
+        contact_joints = foot_constraint_generator.contact_joints
+        frames = self.controller.get_frames()
+        frame_time = self.controller._motion.mv.frame_time
+        features = MotionFeatures(self.skeleton, frames, contact_joints, frame_time)
+        height_tolerance, velocity_threshold = get_contact_thresholds(foot_constraint_generator, frame_time)
+        ground_contacts = features.get_ground_contacts(source_ground_height, height_tolerance, velocity_threshold)
         ground_annotation = collections.OrderedDict()
         color_map = collections.OrderedDict()
-        n_frames = self.controller.getNumberOfFrames()
-        for idx in range(n_frames):
-            for label in ground_contacts[idx]:
-                if label not in ground_annotation:
-                    color_map[label] = get_random_color()
-                    ground_annotation[label] = [[]]
-                ground_annotation[label][0].append(idx)
+        for joint_idx, label in enumerate(contact_joints):
+            sections = LabelSections.from_mask(ground_contacts[:, joint_idx])
+            if len(sections) > 0:
+                color_map[label] = get_random_color()
+                ground_annotation[label] = sections
         self.annotation_editor.set_annotation(ground_annotation, color_map)
         self.init_label_time_line()
 
@@ -482,15 +500,7 @@ class AnimationEditorDialog(QDialog, Ui_Dialog):
                 color = [0,0,1]
                 if label in color_map:
                     color = color_map[label]
-                joint_indices = []
-                n_entries = len(indices) 
-                if n_entries > 0 and type(indices[0]) == list:
-                    for i in range(n_entries):
-                        joint_indices += indices[i]
-                else:
-                    joint_indices = indices
-       
-                self.contactLabelView.addLabel(label, joint_indices, color)
+                self.contactLabelView.addLabel(label, indices, color)
         else:
             self.contactLabelView.addLabel("empty", [], [0,0,0])
 
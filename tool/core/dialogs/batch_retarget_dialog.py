@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+import copy
+import numpy as np
+from PySide2.QtCore import Qt, QTimer
+from PySide2.QtWidgets import QDialog, QFormLayout, QHBoxLayout, QComboBox, QLineEdit, QCheckBox, QPushButton, \
+    QProgressDialog, QMessageBox
+from anim_utils.animation_data import MotionVector, SkeletonBuilder
+from anim_utils.retargeting.analytical import Retargeting, generate_joint_map
+from tool.core.skeleton_registry import get_skeleton_registry
+from tool.core.batch_retargeting import BatchRetargeting
+
+POLL_INTERVAL = 100 # ms
+
+
+def get_skeleton_key(skeleton):
+    """ skeletons with the same joints, offsets and reference pose can share a Retargeting instance"""
+    offsets = [tuple(np.round(np.asarray(skeleton.nodes[joint].offset, dtype=float), 6).tolist())
+               for joint in skeleton.animated_joints]
+    reference_frame = getattr(skeleton, "reference_frame", None)
+    if reference_frame is not None:
+        reference_frame = tuple(np.round(np.asarray(reference_frame, dtype=float), 6).tolist())
+    return tuple(skeleton.animated_joints), tuple(offsets), reference_frame
+
+
+class BatchRetargetDialog(QDialog):
+    """ selects the source skeleton model and the target skeleton from the local skeleton definitions"""
+    def __init__(self, n_objects, parent=None):
+        QDialog.__init__(self, parent)
+        self.setWindowTitle("Retarget " + str(n_objects) + " objects")
+        self.success = False
+        self.src_model = None
+        self.target_name = None
+        self.scale_factor = 1.0
+        self.place_on_ground = False
+        skeleton_list = get_skeleton_registry().names()
+        layout = QFormLayout(self)
+        self.sourceModelComboBox = QComboBox(self)
+        self.sourceModelComboBox.addItems(skeleton_list)
+        layout.addRow("Source model", self.sourceModelComboBox)
+        self.targetSkeletonComboBox = QComboBox(self)
+        self.targetSkeletonComboBox.addItems(skeleton_list)
+        layout.addRow("Target skeleton", self.targetSkeletonComboBox)
+        self.scaleLineEdit = QLineEdit("1.0", self)
+        layout.addRow("Scale factor", self.scaleLineEdit)
+        self.placeOnGroundCheckBox = QCheckBox(self)
+        layout.addRow("Place on ground", self.placeOnGroundCheckBox)
+        button_layout = QHBoxLayout()
+        self.acceptButton = QPushButton("Accept", self)
+        self.acceptButton.clicked.connect(self.slot_accept)
+        button_layout.addWidget(self.acceptButton)
+        self.rejectButton = QPushButton("Cancel", self)
+        self.rejectButton.clicked.connect(self.slot_reject)
+        button_layout.addWidget(self.rejectButton)
+        layout.addRow(button_layout)
+
+    def slot_accept(self):
+        self.src_model = get_skeleton_registry().load_model(str(self.sourceModelComboBox.currentText()))
+        self.target_name = str(self.targetSkeletonComboBox.currentText())
+        self.scale_factor = float(self.scaleLineEdit.text())
+        self.place_on_ground = self.placeOnGroundCheckBox.isChecked()
+        self.success = self.src_model is not None and self.target_name != ""
+        self.close()
+
+    def slot_reject(self):
+        self.close()
+
+
+class BatchRetargetProgressDialog(QProgressDialog):
+    """ retargets the animation controllers in a worker pool and adds a new animation controller
+        to the scene for each finished clip, the pool is polled by a timer in the GUI thread
+    """
+    def __init__(self, scene, controllers, src_model, target_name, scale_factor=1.0, place_on_ground=False, parent=None):
+        QProgressDialog.__init__(self, "Retargeting to " + target_name, "Cancel", 0, len(controllers), parent)
+        self.setWindowModality(Qt.WindowModal)
+        self.setMinimumDuration(0)
+        self.scene = scene
+        self.target_name = target_name
+        self.errors = []
+        self.is_done = False
+        target_data = get_skeleton_registry().load(target_name)
+        self.target_skeleton = SkeletonBuilder().load_from_custom_unity_format(target_data["skeleton"])
+        self.target_skeleton.skeleton_model = target_data["model"]
+        self._src_controllers = dict()
+        retargetings = dict()
+        jobs = []
+        for controller in controllers:
+            # one retargeting per distinct source skeleton, usually all clips of a session share it
+            src_skeleton = controller.get_skeleton()
+            key = get_skeleton_key(src_skeleton)
+            if key not in retargetings:
+                src_skeleton = copy.deepcopy(src_skeleton)
+                src_skeleton.skeleton_model = src_model
+                joint_map = generate_joint_map(src_model, self.target_skeleton.skeleton_model)
+                retargeting = Retargeting(src_skeleton, self.target_skeleton, joint_map, scale_factor,
+                                          additional_rotation_map=None, place_on_ground=place_on_ground)
+                retargetings[key] = retargeting, self.target_skeleton.reference_frame
+            name = controller.scene_object.name + "_" + target_name
+            while name in self._src_controllers:
+                name += "_"
+            self._src_controllers[name] = controller
+            jobs.append((name, key, controller._motion.mv.frames))
+        self.batch = BatchRetargeting(retargetings)
+        for name, key, frames in jobs:
+            self.batch.submit(name, key, frames)
+        self.canceled.connect(self.slot_cancel)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(POLL_INTERVAL)
+
+    def poll(self):
+        for name, frames, error in self.batch.poll():
+            if error is not None:
+                print("Error: could not retarget", name, error)
+                self.errors.append((name, error))
+                continue
+            self.add_controller(name, frames)
+        self.setValue(self.batch.n_finished)
+        if self.batch.is_finished():
+            self.finish()
+
+    def add_controller(self, name, frames):
+        src_controller = self._src_controllers[name]
+        skeleton = copy.deepcopy(self.target_skeleton)
+        mv = MotionVector()
+        mv.frames = frames
+        mv.n_frames = len(frames)
+        mv.frame_time = src_controller._motion.mv.frame_time
+        mv.skeleton = skeleton
+        self.scene.object_builder.create_object("animation_controller", name, skeleton, mv, mv.frame_time)
+
+    def finish(self):
+        # close emits canceled, which would call finish a second time
+        if self.is_done:
+            return
+        self.is_done = True
+        self.timer.stop()
+        self.batch.shutdown()
+        self.close()
+        if len(self.errors) > 0:
+            message = "\n".join(name + ": " + str(error) for name, error in self.errors)
+            QMessageBox.about(self.parentWidget(), "Error", "Could not retarget " + str(len(self.errors)) + " clips\n" + message)
+
+    def slot_cancel(self):
+        if self.is_done:
+            return
+        self.batch.cancel()
+        self.finish()
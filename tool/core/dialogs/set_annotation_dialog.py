@@ -29,6 +29,7 @@ from .select_joints_dialog import SelectJointsDialog
 from tool.core.widgets.scene_viewer import SceneViewerWidget
 from vis_utils.scene.editor_scene import EditorScene
 from tool.core.annotation_editor import AnnotationEditor
+from tool.core.annotation_sections import copy_annotation_sections
 from tool.core.layout.set_annotation_dialog_ui import Ui_Dialog
 
 def get_random_color():
@@ -175,27 +176,27 @@ class SetAnnotationDialog(QDialog, Ui_Dialog):
         if self.editor.add_label(label, color):
             joint_indices = []
             self.labelView.addLabel(label, joint_indices, color_map[label])
-        self.edit_controller._motion._semantic_annotation = self.editor._semantic_annotation
-        self.edit_controller._motion.label_color_map = self.editor._label_color_map
+        self.edit_controller._motion._semantic_annotation = self.editor.get_annotation()
+        self.edit_controller._motion.label_color_map = collections.OrderedDict(self.editor._label_color_map)
         self.fill_label_combobox()
         self.init_label_time_line()
 
     def remove_label(self):
         label = str(self.labelComboBox.currentText())
         if self.editor.remove_label(label):
-            self.edit_controller._motion._semantic_annotation = self.editor._semantic_annotation
+            self.edit_controller._motion._semantic_annotation = self.editor.get_annotation()
             self.fill_label_combobox()
             self.init_label_time_line()
 
     def slot_accept(self):
         self.success = True
-        self.annotations = self.editor._semantic_annotation
-        self.color_map = self.editor._label_color_map
+        self.annotations = self.editor.get_annotation()
+        self.color_map = collections.OrderedDict(self.editor._label_color_map)
         self.close()
 
     def slot_reject(self):
-        self.annotations = self.editor._semantic_annotation
-        self.color_map = self.editor._label_color_map
+        self.annotations = self.editor.get_annotation()
+        self.color_map = collections.OrderedDict(self.editor._label_color_map)
         self.close()
 
     def copy_controller(self, controller, target_scene):
@@ -206,8 +207,8 @@ class SetAnnotationDialog(QDialog, Ui_Dialog):
                                             skeleton, mv, mv.frame_time, 
                                             semantic_annotation=None) 
         c = o._components["animation_controller"]
-        c._motion._semantic_annotation = controller._motion._semantic_annotation
-        c._motion.label_color_map = controller._motion.label_color_map
+        c._motion._semantic_annotation = copy_annotation_sections(controller._motion._semantic_annotation)
+        c._motion.label_color_map = collections.OrderedDict(controller._motion.label_color_map)
         return c
     
     def init_label_time_line(self):
@@ -221,14 +222,7 @@ class SetAnnotationDialog(QDialog, Ui_Dialog):
                 color = [0,0,1]
                 if label in self.editor._label_color_map:
                     color = self.editor._label_color_map[label]
-                joint_indices = []
-                n_entries = len(indices) 
-                if n_entries > 0 and type(indices[0]) == list:
-                    for i in range(n_entries):
-                        joint_indices += indices[i]
-                else:
-                    joint_indices = indices
-                self.labelView.addLabel(label, joint_indices, color)
+                self.labelView.addLabel(label, indices, color)
         else:
             self.labelView.addLabel("empty", [], [0,0,0])
   
@@ -24,8 +24,9 @@ import os
 import json
 import glob
 import collections
-from vis_utils.io import load_json_file, save_json_file
 from vis_utils.scene.legacy import ConstraintObject
+from tool.core.annotation_sections import create_label_sections, create_annotation_lists
+from tool.core.skeleton_registry import get_skeleton_registry
 
 def get_all_objects(scene):
     return scene.objectList()
@@ -49,25 +50,33 @@ def get_constraints(scene):
 def create_sections_from_annotation(annotations):
     motion_sections = dict()
     for label in annotations:
-        annotations[label].sort()
         section = dict()
-        section["start_idx"] = annotations[label][0]
-        section["end_idx"] = annotations[label][-1]
+        section["start_idx"] = min(annotations[label])
+        section["end_idx"] = max(annotations[label])
         motion_sections[section["start_idx"]] = section
     return list(collections.OrderedDict(sorted(motion_sections.items())).values())
 
 def create_section_dict_from_annotation(annotations):
+    """ converts the sections of each label into dicts with start_idx and inclusive end_idx"""
     motion_sections = dict()
     for label, sections in annotations.items():
+        sections = create_label_sections(sections)
         motion_sections[label] = []
-        for sub_section in sections:
-            sub_section.sort()
+        for start, end in zip(sections.starts.tolist(), sections.ends.tolist()):
             section_dict = dict()
-            section_dict["start_idx"] = sub_section[0]
-            section_dict["end_idx"] = sub_section[-1]
+            section_dict["start_idx"] = start
+            section_dict["end_idx"] = end - 1
             motion_sections[label].append(section_dict)
     return motion_sections
 
+def save_annotation_file(filename, annotation, color_map):
+    """ writes the sections as lists of frame indices in the format read by read_annotation_file"""
+    data = dict()
+    data["semantic_annotation"] = create_annotation_lists(annotation)
+    data["color_map"] = color_map
+    with open(filename, "wt") as out_file:
+        json.dump(data, out_file)
+
 def read_annotation_file(annotation_filepath):
     meta_info_str = ""
     with open(annotation_filepath, "rt") as annotation_file:
@@ -160,22 +169,15 @@ def load_motion_data_from_dir(directory, skeleton_model="custom"):
 
 
 def get_local_skeletons(local_skeleton_dir):
-    skeleton_list = []
-    for filename in glob.glob(local_skeleton_dir + os.sep + "*.json"):
-        name = filename.split(os.sep)[-1][:-5]
-        skeleton_list.append(name)
-    return skeleton_list
+    registry = get_skeleton_registry(local_skeleton_dir)
+    registry.update_index()
+    return registry.names()
 
 def load_local_skeleton(local_skeleton_dir, name):
-     filename = local_skeleton_dir + os.sep + name+".json"
-     data = load_json_file(filename)
-     return data
+    return get_skeleton_registry(local_skeleton_dir).load(name)
 
 def save_local_skeleton(local_skeleton_dir, name, data):
-     filename = local_skeleton_dir + os.sep + name+".json"
-     data = save_json_file(data, filename)
+    get_skeleton_registry(local_skeleton_dir).save(name, data)
 
 def load_local_skeleton_model(local_skeleton_dir, name):
-     filename = local_skeleton_dir + os.sep + name+".json"
-     data = load_json_file(filename)
-     return data["model"]
+    return get_skeleton_registry(local_skeleton_dir).load_model(name)
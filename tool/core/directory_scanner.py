@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Walks a directory tree in a background thread and reports matching files as they are found.
+    After the first walk the tree is watched by polling the modification times of the known directories,
+    only directories whose modification time changed are listed again.
+"""
+import os
+import queue
+import fnmatch
+import threading
+
+DEFAULT_PATTERNS = ["*.bvh", "*.amc", "*.c3d", "*.fbx"]
+WATCH_INTERVAL = 2.0 # seconds
+
+
+class DirectoryScanner(object):
+    """ file names are reported relative to the root directory
+        the changes are collected in a queue by the scan thread and retrieved with poll
+    """
+    def __init__(self, root, patterns=None, recursive=True, watch_interval=WATCH_INTERVAL):
+        self.root = str(root)
+        if patterns is None:
+            patterns = DEFAULT_PATTERNS
+        self.patterns = [p.lower() for p in patterns]
+        self.recursive = recursive
+        self.watch_interval = watch_interval
+        self.scan_finished = False
+        self._changes = queue.Queue()
+        self._dirs = dict() # relative directory path to (modification time, set of files, set of sub directories)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="DirectoryScanner " + self.root)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self, max_changes=None):
+        """ returns the lists of added and removed files since the last call"""
+        added = []
+        removed = []
+        n_changes = 0
+        while max_changes is None or n_changes < max_changes:
+            try:
+                change, filename = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            if change == "add":
+                added.append(filename)
+            else:
+                removed.append(filename)
+            n_changes += 1
+        return added, removed
+
+    def matches(self, name):
+        name = name.lower()
+        return any(fnmatch.fnmatchcase(name, p) for p in self.patterns)
+
+    def _get_path(self, rel_dir, name=None):
+        path = self.root if rel_dir == "" else self.root + os.sep + rel_dir
+        return path if name is None else path + os.sep + name
+
+    def _join(self, rel_dir, name):
+        return name if rel_dir == "" else rel_dir + os.sep + name
+
+    def _list_dir(self, rel_dir):
+        path = self._get_path(rel_dir)
+        mtime = os.stat(path).st_mtime_ns
+        files = set()
+        sub_dirs = set()
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                if self.recursive:
+                    sub_dirs.add(entry.name)
+            elif self.matches(entry.name):
+                files.add(entry.name)
+        return mtime, files, sub_dirs
+
+    def _scan_tree(self, rel_dir):
+        stack = [rel_dir]
+        while len(stack) > 0 and not self._stop_event.is_set():
+            rel_dir = stack.pop()
+            try:
+                mtime, files, sub_dirs = self._list_dir(rel_dir)
+            except OSError:
+                continue
+            self._dirs[rel_dir] = mtime, files, sub_dirs
+            for name in sorted(files):
+                self._changes.put(("add", self._join(rel_dir, name)))
+            stack += [self._join(rel_dir, name) for name in sorted(sub_dirs, reverse=True)]
+
+    def _remove_tree(self, rel_dir):
+        if rel_dir not in self._dirs:
+            return
+        _, files, sub_dirs = self._dirs.pop(rel_dir)
+        for name in sorted(files):
+            self._changes.put(("remove", self._join(rel_dir, name)))
+        for name in sub_dirs:
+            self._remove_tree(self._join(rel_dir, name))
+
+    def _check_dir(self, rel_dir):
+        old_mtime, old_files, old_sub_dirs = self._dirs[rel_dir]
+        try:
+            if os.stat(self._get_path(rel_dir)).st_mtime_ns == old_mtime:
+                return
+            mtime, files, sub_dirs = self._list_dir(rel_dir)
+        except OSError:
+            self._remove_tree(rel_dir)
+            return
+        self._dirs[rel_dir] = mtime, files, sub_dirs
+        for name in sorted(files - old_files):
+            self._changes.put(("add", self._join(rel_dir, name)))
+        for name in sorted(old_files - files):
+            self._changes.put(("remove", self._join(rel_dir, name)))
+        for name in sorted(old_sub_dirs - sub_dirs):
+            self._remove_tree(self._join(rel_dir, name))
+        for name in sorted(sub_dirs - old_sub_dirs):
+            self._scan_tree(self._join(rel_dir, name))
+
+    def check(self):
+        """ lists the directories that were modified since the last check"""
+        for rel_dir in list(self._dirs.keys()):
+            if self._stop_event.is_set():
+                return
+            if rel_dir in self._dirs:
+                self._check_dir(rel_dir)
+
+    def _run(self):
+        self._scan_tree("")
+        self.scan_finished = True
+        while self.watch_interval is not None and not self._stop_event.wait(self.watch_interval):
+            self.check()
@@ -31,6 +31,8 @@ from tool import constants
 from tool.core.layout.mainwindow_ui import Ui_MainWindow
 from tool.core.widget_manager import WidgetManager
 from tool.core.application_manager import ApplicationManager
+from tool.core.widgets.profiler_widget import ProfilerDockWidget
+from tool.core.dialogs.batch_retarget_dialog import BatchRetargetDialog, BatchRetargetProgressDialog
 
 
 class EditorWindow(QMainWindow, Ui_MainWindow):
@@ -55,12 +57,9 @@ class EditorWindow(QMainWindow, Ui_MainWindow):
             self.init_slots()
             self.selectedJointName = ""
             self.object_widgets = dict()
+            self.profiler_widget = None
             self.init_widgets()
-            for name, constructor in self.plugin_object_constructors.items():
-                if constructor is not None:
-                    setattr(self, name, constructor())
-                else:
-                    setattr(self, name, None)
+            self.init_plugin_objects()
 
     def closeEvent(self, event):
         print("Close window")
@@ -90,6 +89,18 @@ class EditorWindow(QMainWindow, Ui_MainWindow):
                         layout = getattr(self.object_widgets[key], layout_name)
                         layout.addWidget(new_button)
 
+    def init_plugin_objects(self):
+        """ creates the objects of plugins that were registered since the last call, the objects of lazy
+            plugins are registered without constructor at startup and created when the plugin is imported
+        """
+        for name, constructor in self.plugin_object_constructors.items():
+            if getattr(self, name, None) is not None:
+                continue
+            if constructor is not None:
+                setattr(self, name, constructor())
+            else:
+                setattr(self, name, None)
+
     def init_menus(self):
         count = 0
         self.menus = dict()
@@ -246,6 +257,7 @@ class EditorWindow(QMainWindow, Ui_MainWindow):
                 o = self.app_manager.scene.getObject(object_id)
                 o.handle_keyboard_input(str(event.text()))
             self.app_manager.scene.scene_edit_widget.handle_keyboard_input(event.key())
+        self.app_manager.request_redraw()
 
     @classmethod
     def add_menu(cls, name, actions):
@@ -265,6 +277,13 @@ class EditorWindow(QMainWindow, Ui_MainWindow):
             cls.widget_buttons[widget_name] = []
         cls.widget_buttons[widget_name] += [(name, function, layout_name)]
 
+    def toggle_profiler(self):
+        if self.profiler_widget is None:
+            self.profiler_widget = ProfilerDockWidget(self.app_manager, self)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.profiler_widget)
+        else:
+            self.profiler_widget.setVisible(not self.profiler_widget.isVisible())
+
     def toggle_full_screen(self):
         print("toggle full screen", self._full_screen)
         if self._full_screen:
@@ -341,6 +360,24 @@ def delete_selected_objects():
     EditorWindow.instance.deleteSceneTableEntries(node_ids)
 
 
+def retarget_selected_objects():
+    scene = ApplicationManager.instance.scene
+    controllers = []
+    for node_id in EditorWindow.instance.getSelectedSceneObjects():
+        o = scene.getObject(node_id)
+        if o is not None and "animation_controller" in o._components:
+            controllers.append(o._components["animation_controller"])
+    if len(controllers) == 0:
+        print("Error: no animation controllers selected")
+        return
+    dialog = BatchRetargetDialog(len(controllers), EditorWindow.instance)
+    dialog.exec_()
+    if dialog.success:
+        # keep a reference because the progress dialog is shown without exec_
+        EditorWindow.instance.batch_retarget_dialog = BatchRetargetProgressDialog(scene, controllers, dialog.src_model, dialog.target_name,
+                                                                                  dialog.scale_factor, dialog.place_on_ground, EditorWindow.instance)
+
+
 def run_python_script():
     filename = QFileDialog.getOpenFileName(EditorWindow.instance, 'Open File', '.')[0]
     ApplicationManager.instance.runPythonScript(str(filename))
@@ -367,6 +404,9 @@ def save_screen_shot():
 def toggle_full_screen():
     EditorWindow.instance.toggle_full_screen()
 
+def toggle_profiler():
+    EditorWindow.instance.toggle_profiler()
+
 def set_camera_target():
     camera = ApplicationManager.instance.views[0].graphics_context.camera
     if camera._target is None and ApplicationManager.instance.scene.selected_scene_object is not None:
@@ -422,11 +462,13 @@ EditorWindow.add_menu("View", [
         {"text": "Set selected to camera target", "short_cut": "Ctrl+T", "function": set_camera_target},
         {"text": "Toggle full screen","short_cut": "F11", "function": toggle_full_screen},
         {"text": "Hide/Show Selected", "short_cut": "Ctrl+H", "function": toggle_visibility},
-        {"text": "Save Screenshot", "short_cut": "Ctrl+E", "function": save_screen_shot}
+        {"text": "Save Screenshot", "short_cut": "Ctrl+E", "function": save_screen_shot},
+        {"text": "Toggle Profiler", "short_cut": "Ctrl+P", "function": toggle_profiler}
 ])
 
 scene_menu_actions =  [{"text": "Toggle scene widget", "function": toggle_edit_scene_widget},
-                        {"text": "Delete selected objects", "short_cut": "Del", "function": delete_selected_objects}]
+                        {"text": "Delete selected objects", "short_cut": "Del", "function": delete_selected_objects},
+                        {"text": "Retarget selected objects", "function": retarget_selected_objects}]
 if constants.vis_constants.activate_simulation:
     scene_menu_actions += [{"text": "Toggle simulation", "short_cut": "P", "function": toggle_simulation},
                                 {"text": "Save simulation state","function": save_simulation_state},
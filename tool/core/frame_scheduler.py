@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Frame pacing of the main loop.
+    The simulation is advanced with a fixed time step using an accumulator, while the animation update
+    and the rendering run at their own target rates. Missed steps are only caught up to a limit so that
+    a heavy scene lowers the update rates instead of blocking the event loop.
+"""
+import time
+from .profiler import Profiler
+
+class RateLimiter(object):
+    """ returns the time since the last tick when the target interval has passed"""
+    def __init__(self, rate, start_time):
+        self.set_rate(rate)
+        self.last_time = start_time
+        self.next_time = start_time
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self.interval = 1.0 / rate
+
+    def tick(self, t, tolerance=0.0):
+        if t < self.next_time - tolerance:
+            return None
+        dt = t - self.last_time
+        self.last_time = t
+        self.next_time += self.interval
+        if self.next_time < t:
+            # skip the missed ticks instead of running them back to back
+            self.next_time = t + self.interval
+        return dt
+
+
+class FrameScheduler(object):
+    """ decides in each timer event how many simulation steps to run and whether the animation and the views are updated
+        sim_rate, anim_rate and render_rate are given in Hz
+    """
+    def __init__(self, sim_rate=30.0, anim_rate=60.0, render_rate=60.0, max_sim_steps=4, max_elapsed_time=0.25):
+        t = time.perf_counter()
+        self.sim_dt = 1.0 / sim_rate
+        self.max_sim_steps = max_sim_steps
+        self.max_elapsed_time = max_elapsed_time
+        self.sim_accumulator = 0.0
+        self.last_time = t
+        self.animation = RateLimiter(anim_rate, t)
+        self.rendering = RateLimiter(render_rate, t)
+        self.profiler = Profiler()
+        self.dropped_sim_time = 0.0
+
+    def set_rates(self, sim_rate=None, anim_rate=None, render_rate=None):
+        if sim_rate is not None:
+            self.sim_dt = 1.0 / sim_rate
+        if anim_rate is not None:
+            self.animation.set_rate(anim_rate)
+        if render_rate is not None:
+            self.rendering.set_rate(render_rate)
+
+    def get_timer_interval(self):
+        """ returns the interval in seconds at which the scheduler should be polled"""
+        return min(self.sim_dt, self.animation.interval, self.rendering.interval)
+
+    def advance(self, t=None):
+        """ returns the number of simulation steps, the animation time step and the render time step
+            the time steps are None if the phase is not due
+        """
+        if t is None:
+            t = time.perf_counter()
+        elapsed = min(t - self.last_time, self.max_elapsed_time)
+        self.last_time = t
+        self.sim_accumulator += elapsed
+        n_sim_steps = min(int(self.sim_accumulator / self.sim_dt), self.max_sim_steps)
+        self.sim_accumulator -= n_sim_steps * self.sim_dt
+        if self.sim_accumulator > self.sim_dt:
+            # the simulation cannot keep up so the remaining time is dropped
+            self.dropped_sim_time += self.sim_accumulator - self.sim_dt
+            self.sim_accumulator = self.sim_dt
+        # timer events arrive with a jitter of about a millisecond
+        tolerance = 0.1 * self.get_timer_interval()
+        anim_dt = self.animation.tick(t, tolerance)
+        render_dt = self.rendering.tick(t, tolerance)
+        return n_sim_steps, anim_dt, render_dt
+
+    def measure(self, phase):
+        return self.profiler.measure(phase)
+
+    def get_phase_timings(self):
+        return self.profiler.to_dict()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+import collections
+
+
+class LRUCache(object):
+    """ Dictionary that evicts the least recently used entries when the total size exceeds max_size.
+        By default each entry has a size of one, a size function can be given to bound e.g. the memory.
+    """
+    def __init__(self, max_size, size_func=None):
+        self.max_size = max_size
+        self.size_func = size_func
+        self.total_size = 0
+        self._entries = collections.OrderedDict()
+        self._sizes = dict()
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        if key in self._entries:
+            self.pop(key)
+        size = self.size_func(value) if self.size_func is not None else 1
+        self._entries[key] = value
+        self._sizes[key] = size
+        self.total_size += size
+        self.evict()
+
+    def pop(self, key, default=None):
+        if key not in self._entries:
+            return default
+        self.total_size -= self._sizes.pop(key)
+        return self._entries.pop(key)
+
+    def evict(self):
+        """ removes the least recently used entries but keeps at least the most recent one"""
+        while self.total_size > self.max_size and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self.pop(key)
+
+    def set_max_size(self, max_size):
+        self.max_size = max_size
+        self.evict()
+
+    def clear(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self.total_size = 0
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        if key not in self._entries:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Content addressed cache of parsed BVH files.
+    The first parse of a file stores the header of the BVH reader as JSON and the frames as .npy file
+    named after the SHA-1 hash of the file content. Later loads memory-map the frames instead of parsing the text.
+    To avoid hashing known files, a small link file per path, modification time and size stores the content hash.
+    When the cache exceeds its maximum size the least recently used entries are removed.
+    Usage: python -m tool.core.motion_cache prewarm <directory> [--recursive]
+"""
+import os
+import json
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+import numpy as np
+from anim_utils.animation_data import BVHReader
+
+DEFAULT_MAX_SIZE = 4096 # MB
+HEADER_SUFFIX = ".json"
+FRAMES_SUFFIX = ".npy"
+LINKS_DIR = "links"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_file_hash(filename):
+    h = hashlib.sha1()
+    with open(filename, "rb") as in_file:
+        for block in iter(lambda: in_file.read(HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_str_hash(data):
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def to_json_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("can not store " + str(type(value)))
+
+
+def get_bvh_header(bvh_reader):
+    """ returns the attributes of the reader except for the frames"""
+    return {key: value for key, value in bvh_reader.__dict__.items() if key != "frames"}
+
+
+def create_bvh_reader(header, frames):
+    bvh_reader = BVHReader("")
+    bvh_reader.__dict__.update(header)
+    if "node_channels" in header:
+        bvh_reader.node_channels = [tuple(c) for c in header["node_channels"]]
+    bvh_reader.frames = frames
+    return bvh_reader
+
+
+def write_atomic(filename, write_func):
+    tmp_filename = filename + ".%d.%d.tmp" % (os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_filename, "wb") as out_file:
+            write_func(out_file)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.isfile(tmp_filename):
+            os.remove(tmp_filename)
+
+
+class MotionCache(object):
+    """ max_size is the maximum size of all entries in MB """
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.links_dir = directory + os.sep + LINKS_DIR
+        self.n_hits = 0
+        self.n_misses = 0
+        self._size = None # estimate of the total size in bytes to avoid scanning the directory on each put
+        self._lock = threading.Lock()
+        os.makedirs(self.links_dir, exist_ok=True)
+
+    def get_entry_filenames(self, key):
+        prefix = self.directory + os.sep + key
+        return prefix + HEADER_SUFFIX, prefix + FRAMES_SUFFIX
+
+    def _get_link_filename(self, filename, stat):
+        link_key = "%s|%d|%d" % (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        return self.links_dir + os.sep + get_str_hash(link_key)
+
+    def get_key(self, filename):
+        """ returns the content hash of the file, which is only computed if the file was changed"""
+        stat = os.stat(filename)
+        link_filename = self._get_link_filename(filename, stat)
+        try:
+            with open(link_filename, "rt") as in_file:
+                return in_file.read().strip()
+        except OSError:
+            pass
+        key = get_file_hash(filename)
+        try:
+            write_atomic(link_filename, lambda out_file: out_file.write(key.encode("ascii")))
+        except OSError:
+            pass
+        return key
+
+    def get(self, key):
+        """ returns a BVHReader with memory-mapped frames or None if the key is not in the cache"""
+        header_filename, frames_filename = self.get_entry_filenames(key)
+        try:
+            with open(header_filename, "rt") as in_file:
+                header = json.load(in_file)
+            # copy on write so that the frames can be modified without changing the cache
+            frames = np.load(frames_filename, mmap_mode="c")
+            os.utime(frames_filename)
+        except (OSError, ValueError):
+            self.n_misses += 1
+            return None
+        self.n_hits += 1
+        return create_bvh_reader(header, frames)
+
+    def put(self, key, bvh_reader):
+        """ stores the reader and removes the least recently used entries if the cache is too large"""
+        header_filename, frames_filename = self.get_entry_filenames(key)
+        try:
+            header = json.dumps(get_bvh_header(bvh_reader), default=to_json_value)
+        except TypeError as e:
+            print("Warning: could not cache motion", key, e)
+            return False
+        frames = np.ascontiguousarray(bvh_reader.frames)
+        try:
+            write_atomic(frames_filename, lambda out_file: np.save(out_file, frames))
+            write_atomic(header_filename, lambda out_file: out_file.write(header.encode("utf-8")))
+        except OSError as e:
+            print("Warning: could not cache motion", key, e)
+            return False
+        # put is called from the prefetch threads of the directory explorer
+        with self._lock:
+            if self._size is None:
+                self._size = self.get_size()
+            else:
+                self._size += frames.nbytes + len(header)
+            needs_eviction = self._size > self.max_size * 1024 * 1024
+        if needs_eviction:
+            self.evict()
+        return True
+
+    def contains(self, key):
+        header_filename, frames_filename = self.get_entry_filenames(key)
+        return os.path.isfile(header_filename) and os.path.isfile(frames_filename)
+
+    def load_bvh_file(self, filename):
+        key = self.get_key(filename)
+        bvh_reader = self.get(key)
+        if bvh_reader is None:
+            bvh_reader = BVHReader(filename)
+            self.put(key, bvh_reader)
+        bvh_reader.filename = os.path.split(filename)[-1]
+        return bvh_reader
+
+    def load_bvh_str(self, bvh_str):
+        key = get_str_hash(bvh_str)
+        bvh_reader = self.get(key)
+        if bvh_reader is None:
+            bvh_reader = BVHReader("")
+            lines = [l for l in bvh_str.split("\n") if len(l) > 0]
+            bvh_reader.process_lines(lines)
+            self.put(key, bvh_reader)
+        return bvh_reader
+
+    def get_entries(self):
+        """ returns a list of (last access time, size in bytes, key) for all entries"""
+        entries = []
+        for dir_entry in os.scandir(self.directory):
+            if not dir_entry.name.endswith(FRAMES_SUFFIX):
+                continue
+            key = dir_entry.name[:-len(FRAMES_SUFFIX)]
+            header_filename, _ = self.get_entry_filenames(key)
+            try:
+                stat = dir_entry.stat()
+                size = stat.st_size + os.path.getsize(header_filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, size, key))
+        return entries
+
+    def get_size(self):
+        """ returns the size of all entries in bytes"""
+        return sum(size for _, size, _ in self.get_entries())
+
+    def remove(self, key):
+        for filename in self.get_entry_filenames(key):
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def evict(self, max_size=None):
+        """ removes the least recently used entries until the cache is smaller than max_size MB"""
+        if max_size is None:
+            max_size = self.max_size
+        max_bytes = max_size * 1024 * 1024
+        with self._lock:
+            entries = sorted(self.get_entries())
+            total_size = sum(size for _, size, _ in entries)
+            n_removed = 0
+            for _, size, key in entries:
+                if total_size <= max_bytes:
+                    break
+                self.remove(key)
+                total_size -= size
+                n_removed += 1
+            self._size = total_size
+            if n_removed > 0:
+                self.remove_dangling_links()
+            return n_removed
+
+    def remove_dangling_links(self):
+        for dir_entry in os.scandir(self.links_dir):
+            try:
+                with open(dir_entry.path, "rt") as in_file:
+                    key = in_file.read().strip()
+                if not self.contains(key):
+                    os.remove(dir_entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        self.evict(0)
+        for dir_entry in os.scandir(self.links_dir):
+            os.remove(dir_entry.path)
+
+    def prewarm(self, directory, recursive=False, filetype="bvh", verbose=True):
+        """ parses all files in the directory that are not in the cache yet
+            Returns:
+                n_added (int): number of parsed files
+        """
+        pattern = "**/*." + filetype if recursive else "*." + filetype
+        n_added = 0
+        for path in sorted(Path(directory).glob(pattern)):
+            filename = str(path)
+            key = self.get_key(filename)
+            if self.contains(key):
+                continue
+            try:
+                self.put(key, BVHReader(filename))
+                n_added += 1
+                if verbose:
+                    print("cached", filename)
+            except Exception as e:
+                print("Warning: could not parse", filename, e)
+        return n_added
+
+
+_motion_cache = None
+_motion_cache_lock = threading.Lock()
+
+
+def get_motion_cache():
+    """ returns the cache shared by the application or None if it is deactivated in the config"""
+    global _motion_cache
+    from tool import constants
+    if not constants.USE_MOTION_CACHE:
+        return None
+    directory = constants.MOTION_CACHE_DIR
+    if directory is None:
+        directory = constants.DATA_DIR + os.sep + "motion_cache"
+    with _motion_cache_lock:
+        if _motion_cache is None or _motion_cache.directory != directory:
+            _motion_cache = MotionCache(directory, constants.MOTION_CACHE_SIZE)
+        _motion_cache.max_size = constants.MOTION_CACHE_SIZE
+        return _motion_cache
+
+
+def load_bvh_file(filename):
+    """ returns a BVHReader for the file that is loaded from the cache if possible"""
+    motion_cache = get_motion_cache()
+    if motion_cache is None:
+        return BVHReader(filename)
+    return motion_cache.load_bvh_file(filename)
+
+
+def load_bvh_str(bvh_str):
+    motion_cache = get_motion_cache()
+    if motion_cache is None:
+        bvh_reader = BVHReader("")
+        bvh_reader.process_lines([l for l in bvh_str.split("\n") if len(l) > 0])
+        return bvh_reader
+    return motion_cache.load_bvh_str(bvh_str)
+
+
+def main():
+    from tool.constants import CONFIG_FILE, set_constants_from_file
+    parser = argparse.ArgumentParser(description="Manage the binary cache of parsed motion files.")
+    parser.add_argument("command", choices=["prewarm", "evict", "clear", "info"])
+    parser.add_argument("directory", nargs="?", help="directory of motion files for prewarm")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--filetype", default="bvh")
+    parser.add_argument("--max_size", type=float, default=None, help="maximum cache size in MB")
+    args = parser.parse_args()
+    if os.path.isfile(CONFIG_FILE):
+        set_constants_from_file(CONFIG_FILE)
+    motion_cache = get_motion_cache()
+    if motion_cache is None:
+        print("The motion cache is deactivated in", CONFIG_FILE)
+        return
+    if args.max_size is not None:
+        motion_cache.max_size = args.max_size
+    if args.command == "prewarm":
+        if args.directory is None:
+            parser.error("prewarm requires a directory")
+        n_added = motion_cache.prewarm(args.directory, args.recursive, args.filetype)
+        print("added", n_added, "files")
+    elif args.command == "evict":
+        print("removed", motion_cache.evict(), "entries")
+    elif args.command == "clear":
+        motion_cache.clear()
+    entries = motion_cache.get_entries()
+    print("%s: %d entries, %.1f of %.1f MB" % (motion_cache.directory, len(entries),
+          sum(e[1] for e in entries) / (1024 * 1024), motion_cache.max_size))
+
+
+if __name__ == "__main__":
+    main()
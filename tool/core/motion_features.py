@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Per frame features of a motion clip that are computed for all frames at once.
+    The global joint positions are computed with one forward kinematics pass over the whole clip.
+"""
+import numpy as np
+
+DEFAULT_FOOT_JOINTS = ["Bip01_L_Toe0", "Bip01_R_Toe0"]
+# contact thresholds relative to the average distance of the feet to the root to be independent of the unit
+DEFAULT_RELATIVE_HEIGHT_TOLERANCE = 0.05
+DEFAULT_RELATIVE_VELOCITY_THRESHOLD = 0.5
+
+
+def quaternion_multiply_batch(a, b):
+    """ multiplies arrays of quaternions in w, x, y, z convention with broadcasting"""
+    aw, ax, ay, az = np.moveaxis(np.asarray(a, dtype=float), -1, 0)
+    bw, bx, by, bz = np.moveaxis(np.asarray(b, dtype=float), -1, 0)
+    return np.stack([aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw], axis=-1)
+
+
+def quaternion_inverse_batch(q):
+    q = np.asarray(q, dtype=float)
+    inv = q * np.array([1.0, -1.0, -1.0, -1.0])
+    return inv / np.sum(q * q, axis=-1, keepdims=True)
+
+
+def quaternion_slerp_batch(q0, q1, t, eps=1e-8):
+    """ spherical linear interpolation along the shortest path between arrays of quaternions
+        t is broadcast against the leading dimensions of the quaternion arrays
+    """
+    q0 = np.asarray(q0, dtype=float)
+    q1 = np.asarray(q1, dtype=float)
+    t = np.asarray(t, dtype=float)[..., None]
+    d = np.sum(q0 * q1, axis=-1, keepdims=True)
+    q1 = np.where(d < 0, -q1, q1)
+    d = np.clip(np.abs(d), 0.0, 1.0)
+    angle = np.arccos(d)
+    sin_angle = np.sin(angle)
+    is_close = sin_angle < eps
+    sin_angle = np.where(is_close, 1.0, sin_angle)
+    w0 = np.where(is_close, 1.0 - t, np.sin((1.0 - t) * angle) / sin_angle)
+    w1 = np.where(is_close, t, np.sin(t * angle) / sin_angle)
+    q = w0 * q0 + w1 * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def quaternion_matrix_batch(q):
+    """ converts an array of quaternions in w, x, y, z convention into 3x3 rotation matrices"""
+    q = np.asarray(q, dtype=float)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    m = np.empty(q.shape[:-1] + (3, 3))
+    m[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    m[..., 0, 1] = 2 * (x * y - z * w)
+    m[..., 0, 2] = 2 * (x * z + y * w)
+    m[..., 1, 0] = 2 * (x * y + z * w)
+    m[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    m[..., 1, 2] = 2 * (y * z - x * w)
+    m[..., 2, 0] = 2 * (x * z - y * w)
+    m[..., 2, 1] = 2 * (y * z + x * w)
+    m[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return m
+
+
+def get_foot_joints(skeleton):
+    """ returns the left and right toe joints defined by the skeleton model"""
+    skeleton_model = getattr(skeleton, "skeleton_model", None)
+    if skeleton_model is not None and "joints" in skeleton_model:
+        joint_map = skeleton_model["joints"]
+        for left, right in [("left_toe", "right_toe"), ("left_ankle", "right_ankle")]:
+            if joint_map.get(left) in skeleton.nodes and joint_map.get(right) in skeleton.nodes:
+                return [joint_map[left], joint_map[right]]
+    return DEFAULT_FOOT_JOINTS
+
+
+def get_local_transforms(node, frames):
+    """ returns the local rotation matrices and translations of a skeleton node for all frames"""
+    n_frames = len(frames)
+    if node.parent is None:
+        rotations = quaternion_matrix_batch(frames[:, 3:7])
+        translations = frames[:, :3] + np.asarray(node.offset, dtype=float)
+    elif node.fixed:
+        rotations = np.tile(quaternion_matrix_batch(node.rotation), (n_frames, 1, 1))
+        translations = np.tile(np.asarray(node.offset, dtype=float), (n_frames, 1))
+    else:
+        idx = node.quaternion_frame_index * 4 + 3
+        rotations = quaternion_matrix_batch(frames[:, idx:idx + 4])
+        translations = np.tile(np.asarray(node.offset, dtype=float), (n_frames, 1))
+    return rotations, translations
+
+
+def get_global_transforms(skeleton, frames, joint_names):
+    """ forward kinematics for all frames that visits each ancestor of the joints once
+        Returns:
+            transforms (dict): joint name to a tuple of n_frames x 3 x 3 rotations and n_frames x 3 positions
+    """
+    frames = np.asarray(frames, dtype=float)
+    transforms = dict()
+
+    def get_transform(node):
+        if node.node_name in transforms:
+            return transforms[node.node_name]
+        rotations, translations = get_local_transforms(node, frames)
+        if node.parent is not None:
+            parent_rotations, parent_positions = get_transform(node.parent)
+            translations = parent_positions + np.einsum("nij,nj->ni", parent_rotations, translations)
+            rotations = np.matmul(parent_rotations, rotations)
+        transforms[node.node_name] = rotations, translations
+        return transforms[node.node_name]
+
+    for joint_name in joint_names:
+        get_transform(skeleton.nodes[joint_name])
+    return transforms
+
+
+def get_global_positions(skeleton, frames, joint_names):
+    """ returns a n_frames x n_joints x 3 array with the global positions of the joints"""
+    transforms = get_global_transforms(skeleton, frames, joint_names)
+    return np.stack([transforms[joint_name][1] for joint_name in joint_names], axis=1)
+
+
+def compute_frame_differences(skeleton, frames, prev_frames):
+    """ difference of the root translation and the joint-local quaternions of the animated joints
+        between each frame and the frame with the same index in prev_frames
+        Returns:
+            velocities (np.array): n_frames x (3 + n_animated_joints * 4)
+    """
+    frames = np.asarray(frames, dtype=float)
+    prev_frames = np.asarray(prev_frames, dtype=float)
+    joints = skeleton.animated_joints
+    velocities = np.zeros((len(frames), 3 + len(joints) * 4))
+    velocities[:, :3] = frames[:, :3] - prev_frames[:, :3]
+    offsets = np.array([skeleton.nodes[joint].index * 4 + 3 for joint in joints], dtype=int)
+    columns = offsets[:, None] + np.arange(4)[None, :]
+    delta = quaternion_multiply_batch(quaternion_inverse_batch(frames[:, columns]), prev_frames[:, columns])
+    velocities[:, 3:] = delta.reshape(len(frames), -1)
+    return velocities
+
+
+def compute_joint_velocities(skeleton, frames):
+    """ finite difference of the root translation and the joint-local quaternions of the animated joints
+        for each frame and its predecessor, the first frame has no predecessor and is set to zero
+        Returns:
+            velocities (np.array): n_frames x (3 + n_animated_joints * 4)
+    """
+    frames = np.asarray(frames, dtype=float)
+    n_frames = len(frames)
+    velocities = np.zeros((n_frames, 3 + len(skeleton.animated_joints) * 4))
+    if n_frames < 2:
+        return velocities
+    velocities[1:] = compute_frame_differences(skeleton, frames[1:], frames[:-1])
+    return velocities
+
+
+class MotionFeatures(object):
+    """ foot heights, foot velocities, joint velocities and ground contacts of all frames of a clip"""
+    def __init__(self, skeleton, frames, foot_joints=None, frame_time=None, up_axis=1):
+        frames = np.asarray(frames, dtype=float)
+        if foot_joints is None:
+            foot_joints = get_foot_joints(skeleton)
+        if frame_time is None:
+            frame_time = skeleton.frame_time
+        self.foot_joints = list(foot_joints)
+        self.frame_time = frame_time
+        self.up_axis = up_axis
+        self.foot_positions = get_global_positions(skeleton, frames, self.foot_joints)
+        self.foot_heights = self.foot_positions[:, :, up_axis]
+        self.foot_velocities = np.zeros(self.foot_positions.shape)
+        self.foot_velocities[1:] = np.diff(self.foot_positions, axis=0) / frame_time
+        self.joint_velocities = compute_joint_velocities(skeleton, frames)
+        root_positions = frames[:, None, :3]
+        self.reference_length = float(np.mean(np.linalg.norm(self.foot_positions - root_positions, axis=2)))
+
+    def get_vertical_foot_velocities(self):
+        return self.foot_velocities[:, :, self.up_axis]
+
+    def get_ground_contacts(self, ground_height=0.0, height_tolerance=None, velocity_threshold=None):
+        """ returns a n_frames x n_feet boolean array that is true when a foot is close to the ground and slow
+            the default thresholds are relative to the average distance of the feet to the root
+        """
+        if height_tolerance is None:
+            height_tolerance = DEFAULT_RELATIVE_HEIGHT_TOLERANCE * self.reference_length
+        if velocity_threshold is None:
+            velocity_threshold = DEFAULT_RELATIVE_VELOCITY_THRESHOLD * self.reference_length
+        speeds = np.linalg.norm(self.foot_velocities, axis=2)
+        return (self.foot_heights - ground_height < height_tolerance) & (speeds < velocity_threshold)
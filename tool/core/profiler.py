@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Wall time measurements of the phases of the main loop.
+    Each phase keeps the durations of the last window_size calls in a ring buffer from which
+    percentiles and histograms are computed. The update of each scene object component can be
+    measured by wrapping the update methods of the component instances.
+"""
+import time
+import json
+import collections
+from contextlib import contextmanager
+import numpy as np
+
+DEFAULT_WINDOW_SIZE = 600
+PERCENTILES = [50, 95, 99]
+
+
+class RollingWindow(object):
+    def __init__(self, size):
+        self.values = np.zeros(size)
+        self.count = 0
+        self.last = 0.0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.last = value
+
+    def get_values(self):
+        return self.values[:min(self.count, len(self.values))]
+
+
+class Profiler(object):
+    """ records durations in seconds per phase name
+        the component updates are only measured after instrument_scene was called because the wrapping has an overhead
+    """
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self.windows = collections.OrderedDict()
+        self.instrumented_components = dict()
+        self.instrument_components = False
+
+    def record(self, phase, duration):
+        if phase not in self.windows:
+            self.windows[phase] = RollingWindow(self.window_size)
+        self.windows[phase].add(duration)
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def reset(self):
+        self.windows = collections.OrderedDict()
+
+    def get_statistics(self, phase):
+        window = self.windows[phase]
+        values = window.get_values()
+        stats = collections.OrderedDict()
+        stats["count"] = window.count
+        stats["last"] = window.last
+        stats["mean"] = float(np.mean(values))
+        stats["max"] = float(np.max(values))
+        for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats["p" + str(p)] = float(v)
+        return stats
+
+    def get_histogram(self, phase, n_bins=20):
+        """ returns the counts and bin edges of the durations in the window"""
+        return np.histogram(self.windows[phase].get_values(), bins=n_bins)
+
+    def to_dict(self):
+        return collections.OrderedDict((phase, self.get_statistics(phase)) for phase in self.windows)
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def dump(self, filename):
+        with open(filename, "wt") as out_file:
+            out_file.write(self.to_json(indent=4))
+
+    def instrument_scene(self, scene):
+        """ measures the update of every component of the objects in the scene"""
+        self.instrument_components = True
+        for scene_object in scene.objectList():
+            self.instrument_object(scene_object)
+
+    def instrument_object(self, scene_object):
+        for name, component in scene_object._components.items():
+            if id(component) in self.instrumented_components or not hasattr(component, "update"):
+                continue
+            phase = "component/" + str(scene_object.name) + "/" + name
+            self.instrumented_components[id(component)] = (component, component.__dict__.get("update"))
+            component.update = self._wrap_update(component.update, phase)
+
+    def _wrap_update(self, update, phase):
+        def measured_update(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return update(*args, **kwargs)
+            finally:
+                self.record(phase, time.perf_counter() - start)
+        return measured_update
+
+    def remove_instrumentation(self):
+        """ restores the update methods of the components"""
+        self.instrument_components = False
+        for component, instance_update in self.instrumented_components.values():
+            if instance_update is not None:
+                component.update = instance_update
+            elif "update" in component.__dict__:
+                del component.update
+        self.instrumented_components = dict()
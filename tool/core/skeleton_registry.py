@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Registry of the skeleton definitions stored as JSON files in the local skeleton directory.
+    A small index file with the name, hash, modification time and joint count of each definition
+    is kept in the directory so that listing the skeletons only needs to check the modification times.
+    The definitions are parsed on demand and cached in memory until the file changes.
+"""
+import os
+import json
+import pickle
+import hashlib
+import threading
+import collections
+
+INDEX_FILENAME = ".index.json"
+INDEX_VERSION = 1
+
+
+def get_joint_count(data):
+    if isinstance(data.get("skeleton"), dict) and "jointDescs" in data["skeleton"]:
+        return len(data["skeleton"]["jointDescs"])
+    if isinstance(data.get("model"), dict) and "joints" in data["model"]:
+        return len(data["model"]["joints"])
+    return 0
+
+
+class SkeletonRegistry(object):
+    """ loaded definitions are returned as copies so that changes by the caller only take effect with save """
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = None
+        self._cache = dict()
+        self._lock = threading.RLock()
+
+    def get_filename(self, name):
+        return self.directory + os.sep + name + ".json"
+
+    def _read_index(self):
+        filename = self.directory + os.sep + INDEX_FILENAME
+        if not os.path.isfile(filename):
+            return collections.OrderedDict()
+        try:
+            with open(filename, "rt") as in_file:
+                index = json.load(in_file, object_pairs_hook=collections.OrderedDict)
+        except (OSError, ValueError):
+            return collections.OrderedDict()
+        if index.get("version") != INDEX_VERSION:
+            return collections.OrderedDict()
+        return index["skeletons"]
+
+    def _write_index(self):
+        filename = self.directory + os.sep + INDEX_FILENAME
+        index = {"version": INDEX_VERSION, "skeletons": self._index}
+        try:
+            with open(filename + ".tmp", "wt") as out_file:
+                json.dump(index, out_file, indent=4)
+            os.replace(filename + ".tmp", filename)
+        except OSError as e:
+            print("Warning: could not write skeleton index", e)
+
+    def _parse(self, name, stat):
+        """ reads and parses the file and updates the cache and the index entry"""
+        with open(self.get_filename(name), "rb") as in_file:
+            raw = in_file.read()
+        data = json.loads(raw.decode("utf-8"))
+        self._cache[name] = (stat.st_mtime, stat.st_size, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        entry = collections.OrderedDict()
+        entry["hash"] = hashlib.sha1(raw).hexdigest()
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+        entry["n_joints"] = get_joint_count(data)
+        if self._index is not None:
+            self._index[name] = entry
+        return data, entry
+
+    def update_index(self):
+        """ checks the modification times of the files and parses only new and changed files"""
+        with self._lock:
+            old_index = self._index if self._index is not None else self._read_index()
+            self._index = collections.OrderedDict()
+            changed = False
+            if os.path.isdir(self.directory):
+                entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith(".json")
+                                  and not e.name.startswith(".") and e.is_file()), key=lambda e: e.name)
+                for dir_entry in entries:
+                    name = dir_entry.name[:-5]
+                    stat = dir_entry.stat()
+                    entry = old_index.get(name)
+                    if entry is not None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                        self._index[name] = entry
+                        continue
+                    try:
+                        self._parse(name, stat)
+                    except (OSError, ValueError) as e:
+                        print("Warning: could not read skeleton", name, e)
+                        continue
+                    changed = True
+            for name in list(self._cache.keys()):
+                if name not in self._index:
+                    del self._cache[name]
+            if changed or len(self._index) != len(old_index):
+                self._write_index()
+            return self._index
+
+    def get_index(self):
+        with self._lock:
+            if self._index is None:
+                self.update_index()
+            return self._index
+
+    def names(self):
+        return list(self.get_index().keys())
+
+    def get_info(self, name):
+        return self.get_index().get(name)
+
+    def load(self, name):
+        """ returns the parsed definition or None if the file does not exist"""
+        with self._lock:
+            try:
+                stat = os.stat(self.get_filename(name))
+            except OSError:
+                self._cache.pop(name, None)
+                return None
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                return pickle.loads(cached[2])
+            data, entry = self._parse(name, stat)
+            if self._index is not None:
+                self._write_index()
+            return data
+
+    def load_model(self, name):
+        data = self.load(name)
+        if data is None:
+            return None
+        return data["model"]
+
+    def save(self, name, data):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with open(self.get_filename(name), "wt") as out_file:
+                json.dump(data, out_file, indent=4)
+            self._parse(name, os.stat(self.get_filename(name)))
+            if self._index is not None:
+                self._index = collections.OrderedDict(sorted(self._index.items()))
+                self._write_index()
+
+    def __contains__(self, name):
+        return name in self.get_index()
+
+    def __getitem__(self, name):
+        data = self.load(name)
+        if data is None:
+            raise KeyError(name)
+        return data
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self):
+        return len(self.get_index())
+
+    def keys(self):
+        return self.names()
+
+
+_registries = dict()
+_registries_lock = threading.Lock()
+
+
+def get_skeleton_registry(directory=None):
+    """ returns the registry shared by all dialogs, by default for the skeleton directory in the data directory"""
+    if directory is None:
+        from tool import constants
+        directory = constants.DATA_DIR + os.sep + "skeletons"
+    directory = os.path.normpath(directory)
+    with _registries_lock:
+        if directory not in _registries:
+            _registries[directory] = SkeletonRegistry(directory)
+        return _registries[directory]
@@ -21,6 +21,7 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 from PySide2.QtWidgets import QWidget, QListWidgetItem, QAction
+from PySide2.QtCore import Qt
 from tool.core.layout.animation_directory_widget_ui import Ui_Form
 from tool.core.widget_manager import WidgetManager
 from tool.core.dialogs.select_scene_objects_dialog import SelectSceneObjectsDialog
@@ -41,12 +42,18 @@ class AnimationDirectoryWidget(QWidget, Ui_Form):
         self._controller = None
         self.init_combo_box()
         self.loadButton.clicked.connect(self.load_selected)
+        self.animationFileListWidget.itemClicked.connect(self.on_select_file)
 
     def set_object(self, scene_object):
         if scene_object is None or self.COMPONENT_NAME not in scene_object._components:
             return
+        if self._controller is not None:
+            self._controller.added_animation_files.disconnect(self.add_animation_files)
+            self._controller.removed_animation_files.disconnect(self.remove_animation_files)
         self._controller = scene_object._components[self.COMPONENT_NAME]
         if self._controller is not None:
+            self._controller.added_animation_files.connect(self.add_animation_files)
+            self._controller.removed_animation_files.connect(self.remove_animation_files)
             self.activatePlayerControls()
             n_frames = self._controller.getNumberOfFrames()
             self.setFrameRange(0, n_frames - 1)
@@ -57,11 +64,22 @@ class AnimationDirectoryWidget(QWidget, Ui_Form):
         self.animationFileListWidget.clear()
         if self._controller is None:
             return
-        for anim_file in self._controller.get_animation_files():
+        self.add_animation_files(self._controller.get_animation_files())
+
+    def add_animation_files(self, filenames):
+        for anim_file in filenames:
             item = QListWidgetItem()
             item.setText(anim_file)
             self.animationFileListWidget.addItem(item)
-        self.animationFileListWidget.itemClicked.connect(self.on_select_file)
+        # the first file is selected by the controller once the scan found it
+        n_frames = self._controller.getNumberOfFrames()
+        if n_frames > 0 and self.animationFrameSlider.maximum() != n_frames - 1:
+            self.setFrameRange(0, n_frames - 1)
+
+    def remove_animation_files(self, filenames):
+        for anim_file in filenames:
+            for item in self.animationFileListWidget.findItems(anim_file, Qt.MatchExactly):
+                self.animationFileListWidget.takeItem(self.animationFileListWidget.row(item))
 
     def init_animation_player_actions(self):
         self.toggle_animation_action = QAction("Play", self)
@@ -40,7 +40,9 @@ try:
 except:
     pass
 from tool.core.dialogs.set_annotation_dialog import SetAnnotationDialog
-from tool.core.dialogs.utils import load_local_skeleton, load_local_skeleton_model, save_local_skeleton
+from tool.core.dialogs.utils import load_local_skeleton, load_local_skeleton_model, save_local_skeleton, save_annotation_file
+from tool.core.annotation_sections import create_annotation_sections
+from tool.core.skeleton_registry import get_skeleton_registry
 from tool import constants
 from tool.core.application_manager import ApplicationManager
 from vis_utils.animation.skeleton_animation_controller import SkeletonAnimationController
@@ -89,7 +91,7 @@ class AnimationPlayerBaseWidget(QWidget):
             return
         if hasattr(self, "skeletonModelComboBox"):
             self.skeletonModelComboBox.clear()
-            model_list = [""] + list(constants.LOCAL_SKELETON_MODELS.keys())
+            model_list = [""] + get_skeleton_registry().names()
             for idx, m in enumerate(model_list):
                 self.skeletonModelComboBox.addItem(m, idx)
             skeleton =  self._controller.get_skeleton()
@@ -124,15 +126,7 @@ class AnimationPlayerBaseWidget(QWidget):
                 color = [0,0,1]
                 if label in color_map:
                     color = color_map[label]
-                joint_indices = []
-                n_entries = len(indices) 
-                if n_entries > 0 and type(indices[0]) == list:
-                    for i in range(n_entries):
-                        joint_indices += indices[i]
-                else:
-                    joint_indices = indices
-       
-                self.labelView.addLabel(label, joint_indices, color)
+                self.labelView.addLabel(label, indices, color)
         else:
             self.labelView.addLabel("empty", [], [0,0,0])
 
@@ -383,11 +377,15 @@ class AnimationPlayerBaseWidget(QWidget):
     def load_annotation(self):
         filename = QFileDialog.getOpenFileName(self, 'Load From File', '.')[0]
         self._controller.load_annotation(str(filename))
+        motion = self._controller._motion
+        motion._semantic_annotation = create_annotation_sections(motion._semantic_annotation)
         self.init_label_time_line()
 
     def save_annotation(self):
         filename = QFileDialog.getSaveFileName(self, 'Save To File', '.')[0]
-        self._controller.save_annotation(str(filename))
+        if filename != "":
+            motion = self._controller._motion
+            save_annotation_file(str(filename), motion._semantic_annotation, motion.label_color_map)
         
     def export_annotation_to_phase(self):
         filename = QFileDialog.getSaveFileName(self, 'Save To File', '.')[0]
@@ -423,7 +421,7 @@ class AnimationPlayerBaseWidget(QWidget):
 
     def split_motion(self):
         for idx, (key, segments) in enumerate(self._controller._motion._semantic_annotation.items()):
-            if type(segments[0]) ==list:
+            if type(segments[0]) in (list, range):
                 for segment in segments:
                     start = segment[0]
                     end = segment[-1]
@@ -489,8 +487,8 @@ class AnimationPlayerBaseWidget(QWidget):
         name = str(self.skeletonModelComboBox.currentText())
         if name == "Load from file":
             self.load_skeleton_model()
-        elif name in constants.LOCAL_SKELETON_MODELS:
-            self._controller.set_skeleton_model(constants.LOCAL_SKELETON_MODELS[name]["model"])
+        elif name in get_skeleton_registry():
+            self._controller.set_skeleton_model(get_skeleton_registry().load_model(name))
 
     def slot_fps_text_changed(self, value):
         fps = float(value)
@@ -528,7 +526,6 @@ class AnimationPlayerBaseWidget(QWidget):
             data["skeleton"] = skeleton.to_unity_format()
             data["model"] = skeleton_editor.skeleton_model
             save_local_skeleton(self.local_skeleton_dir, name, data)
-            constants.LOCAL_SKELETON_MODELS[name] = data
             self.fill_combo_box_with_models()
 
 class AnimationPlayerWidget(AnimationPlayerBaseWidget, Ui_Form):
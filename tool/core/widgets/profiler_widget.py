@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+from PySide2.QtCore import Qt, QTimer
+from PySide2.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, \
+    QPushButton, QCheckBox, QFileDialog, QHeaderView
+
+COLUMNS = ["phase", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)"]
+REFRESH_INTERVAL = 500
+
+
+class ProfilerDockWidget(QDockWidget):
+    """ shows the percentiles of the phase timings of the main loop and refreshes them periodically"""
+    def __init__(self, app_manager, parent=None):
+        QDockWidget.__init__(self, "Profiler", parent)
+        self.app_manager = app_manager
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+        self.table = QTableWidget(0, len(COLUMNS), widget)
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        layout.addWidget(self.table)
+        button_layout = QHBoxLayout()
+        self.componentsCheckBox = QCheckBox("Measure components", widget)
+        self.componentsCheckBox.stateChanged.connect(self.set_component_profiling)
+        button_layout.addWidget(self.componentsCheckBox)
+        self.resetButton = QPushButton("Reset", widget)
+        self.resetButton.clicked.connect(self.reset)
+        button_layout.addWidget(self.resetButton)
+        self.dumpButton = QPushButton("Save JSON", widget)
+        self.dumpButton.clicked.connect(self.dump)
+        button_layout.addWidget(self.dumpButton)
+        layout.addLayout(button_layout)
+        self.setWidget(widget)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.setInterval(REFRESH_INTERVAL)
+
+    def showEvent(self, event):
+        self.timer.start()
+        QDockWidget.showEvent(self, event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        QDockWidget.hideEvent(self, event)
+
+    def refresh(self):
+        timings = self.app_manager.get_phase_timings()
+        self.table.setRowCount(len(timings))
+        for row, (phase, stats) in enumerate(timings.items()):
+            values = [phase] + ["%.2f" % (stats[key] * 1000) for key in ["p50", "p95", "p99", "max"]]
+            for col, value in enumerate(values):
+                item = self.table.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    item.setFlags(Qt.ItemIsEnabled)
+                    self.table.setItem(row, col, item)
+                item.setText(value)
+
+    def set_component_profiling(self, state):
+        self.app_manager.set_component_profiling(state == Qt.Checked)
+
+    def reset(self):
+        self.app_manager.profiler.reset()
+        self.table.setRowCount(0)
+
+    def dump(self):
+        filename = QFileDialog.getSaveFileName(self, 'Save Profile', '.', "JSON (*.json)")[0]
+        if filename:
+            self.app_manager.dump_profile(filename)
@@ -57,6 +57,7 @@ class SceneViewerWidget(QtOpenGL.QGLWidget):
     mouse_click = Signal(object, object, object, object, int, name='mouseClick')
     mouse_release = Signal(object, name='mouseClick')
     dropped_files = Signal(object, name='droppeFiles')
+    view_changed = Signal(name='viewChanged')
 
     def __init__(self, parent=None, shareWidget=None, size=None, use_frame_buffer=constants.use_frame_buffer):
         super(SceneViewerWidget, self).__init__( shareWidget=shareWidget)
@@ -99,6 +100,7 @@ class SceneViewerWidget(QtOpenGL.QGLWidget):
     def keyReleaseEvent(self, event):
         if event.key() == Qt.Key_F:
             self._toggleFullScreen()
+        self.view_changed.emit()
 
     def mousePressEvent(self,event):
         x, y = event.x(), event.y()
@@ -159,6 +161,7 @@ class SceneViewerWidget(QtOpenGL.QGLWidget):
     def wheelEvent(self, event):
         delta = event.angleDelta().y()*self.zoom_factor
         self.graphics_context.camera.zoom += delta
+        self.view_changed.emit()
         
     def resizeGL(self, width, height):
         if height == 0:
@@ -169,6 +172,7 @@ class SceneViewerWidget(QtOpenGL.QGLWidget):
         print("resize", width, height)
         if self.graphics_context is not None:
             self.graphics_context.resize(width, height)
+        self.view_changed.emit()
         
     def showMessageOnStatusBar(self, message):
         if self.statusBar != None:
@@ -20,9 +20,11 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
+import numpy as np
 from PySide2.QtCore import QRectF, QPointF, Qt, QSizeF
 from PySide2.QtWidgets import  QGraphicsItem, QGraphicsView, QGraphicsScene
-from PySide2.QtGui import  QColor, QBrush, QFont, QTransform
+from PySide2.QtGui import  QColor, QBrush, QFont, QTransform, QPixmap, QPainter
+from tool.core.annotation_sections import create_label_sections, get_index_runs
 drag_mode = QGraphicsView.DragMode.RubberBandDrag # 1
 transform_anchor = QGraphicsView.ViewportAnchor.NoAnchor # 0
 blue = QColor()
@@ -41,6 +43,9 @@ grey.setRed(100)
 grey.setBlue(100)
 grey.setGreen(100)
 grey.setAlpha(255)
+# below this number of pixels per frame the time lines are drawn from a cached summary
+MIN_PIXELS_PER_FRAME = 1.0
+SUMMARY_WIDTH = 4096
 
 
 class FrameIndicator(QGraphicsItem):
@@ -51,6 +56,7 @@ class FrameIndicator(QGraphicsItem):
         self.y = y
         self.offset = offset
         self.view_rect = QRectF()
+        self._frame = None
         self.setFrame(0)
         self.color = color
 
@@ -64,6 +70,9 @@ class FrameIndicator(QGraphicsItem):
         return self._bounding_rect
 
     def setFrame(self, idx):
+        if idx == self._frame:
+            return
+        self._frame = idx
         self.prepareGeometryChange()
         x = idx*self._frame_width + self.offset
         self._bounding_rect = QRectF()
@@ -80,7 +89,7 @@ class TimeLine(QGraphicsItem):
         self._height = height
         self.label = label
         self._label_width = label_width
-        self._indices = indices
+        self._sections = create_label_sections(indices)
         self.frame_width = frame_width
 
         size = QSizeF()
@@ -97,15 +106,18 @@ class TimeLine(QGraphicsItem):
         self.color.setGreen(color[1]* 255)
         self.color.setBlue(color[2] * 255)
         self.color.setAlpha(255)
-
+        self._summary = None
+        # provides the exposed rect in the style options for culling
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
 
     def paint(self, painter, styleoptions, parent=None):
         #brush = QtGui.QBrush()
         #brush.setColor(blue)
         painter.setBrush(self.color)
-        for idx in self._indices:
-            x = self._pos.x() + self._label_width + self.frame_width * idx
-            painter.drawRect(x, self._pos.y(), self.frame_width, self._height)
+        if self.frame_width * painter.worldTransform().m11() < MIN_PIXELS_PER_FRAME:
+            self.paint_summary(painter)
+        else:
+            self.paint_sections(painter, styleoptions.exposedRect)
 
         #brush = QtGui.QBrush()
         #brush.setColor(red)
@@ -115,6 +127,45 @@ class TimeLine(QGraphicsItem):
         painter.setFont(QFont("Arial", 10))
         painter.drawText(self._tpos,self.label)# QtCore.Qt.AlignCenter,
 
+    def paint_sections(self, painter, exposed_rect):
+        """ draws one rectangle per section that overlaps the exposed rect"""
+        x_offset = self._pos.x() + self._label_width
+        first_frame = (exposed_rect.left() - x_offset) / self.frame_width
+        last_frame = (exposed_rect.right() - x_offset) / self.frame_width
+        first = np.searchsorted(self._sections.ends, first_frame, side="right")
+        last = np.searchsorted(self._sections.starts, last_frame, side="right")
+        for start, end in zip(self._sections.starts[first:last], self._sections.ends[first:last]):
+            x = x_offset + self.frame_width * start
+            painter.drawRect(QRectF(x, self._pos.y(), self.frame_width * (end - start), self._height))
+
+    def paint_summary(self, painter):
+        if self._summary is None:
+            self._summary = self.create_summary()
+        target = QRectF(self._pos.x() + self._label_width, self._pos.y(), self._length, self._height)
+        painter.drawPixmap(target, self._summary, QRectF(self._summary.rect()))
+
+    def create_summary(self):
+        """ renders the pixel columns that are covered by a section into a pixmap"""
+        n_frames = max(int(self._length / self.frame_width), 1)
+        width = min(n_frames, SUMMARY_WIDTH)
+        height = max(int(self._height), 1)
+        scale = width / n_frames
+        coverage = np.zeros(width + 1, dtype=np.int64)
+        starts = np.clip(np.floor(self._sections.starts * scale).astype(np.int64), 0, width)
+        ends = np.clip(np.ceil(self._sections.ends * scale).astype(np.int64), 0, width)
+        np.add.at(coverage, starts, 1)
+        np.add.at(coverage, ends, -1)
+        columns = np.flatnonzero(np.cumsum(coverage[:width]) > 0)
+        pixmap = QPixmap(width, height)
+        pixmap.fill(Qt.transparent)
+        pixmap_painter = QPainter(pixmap)
+        pixmap_painter.setPen(Qt.NoPen)
+        pixmap_painter.setBrush(self.color)
+        for start, end in zip(*get_index_runs(columns)):
+            pixmap_painter.drawRect(int(start), 0, int(end - start), height)
+        pixmap_painter.end()
+        return pixmap
+
     def boundingRect(self):
         return self._bounding_rect
 
@@ -211,12 +262,11 @@ class TimeLineLabelView(QGraphicsView):
         self.updateTransform()
 
     def setFrame(self, idx):
-        self.x = self.scale_factor*-idx*self.frame_width + self.label_width
-
-        #transform = Qt.QTransform()
-        #transform.translate(-deltaX, 0)
-        #self.setTransform(transform)
-        self.updateTransform()
+        """ scrolls the frame to the start of the view, the transform is only replaced when the scroll position changes by a pixel"""
+        x = min(round(self.scale_factor*-idx*self.frame_width + self.label_width), 0)
+        if x != self.x:
+            self.x = x
+            self.updateTransform()
         if self.frame_indicator is not None:
             self.frame_indicator.setFrame(idx)
     
@@ -227,11 +277,10 @@ class TimeLineLabelView(QGraphicsView):
     def updateTransform(self):
         if self.x > 0:
             self.x = 0
-
-        self.resetTransform()
         m = QTransform()
         m.translate(self.x, self.y)
         m.scale(self.scale_factor, 1.0)
-        self.setTransform(m)
+        if m != self.transform():
+            self.setTransform(m)
 
 
@@ -1,10 +1,82 @@
+""" Plugins are sub packages of this package. A plugin with a manifest.json that is marked as lazy
+    registers its menu entries, widget buttons and plugin objects from the manifest and its package
+    is only imported when one of its actions is triggered for the first time.
+    All other plugins are imported at startup.
+"""
+import json
+import time
 import importlib
+import collections
 from pathlib import Path
-for plugin_dir in Path(__file__).parent.iterdir():
+from tool.core.editor_window import EditorWindow
+
+MANIFEST_FILE = "manifest.json"
+import_times = collections.OrderedDict()
+
+
+def load_manifest(plugin_dir):
+    manifest_file = plugin_dir.joinpath(MANIFEST_FILE)
+    if not manifest_file.is_file():
+        return None
+    with open(str(manifest_file), "r") as in_file:
+        return json.load(in_file)
+
+
+def load_plugin(name):
+    """ imports the plugin package and creates the plugin objects that it registered """
+    module_name = "tool.plugins." + name
+    if module_name not in import_times:
+        start = time.perf_counter()
+        print("Importing " + name + " plugin...")
+        importlib.import_module(module_name)
+        import_times[module_name] = time.perf_counter() - start
+        if EditorWindow.instance is not None:
+            EditorWindow.instance.init_plugin_objects()
+    return importlib.import_module(module_name)
+
+
+def get_plugin_function(plugin_name, function_name):
+    return getattr(load_plugin(plugin_name), function_name)
+
+
+def create_lazy_action(plugin_name, function_name):
+    def action():
+        return get_plugin_function(plugin_name, function_name)()
+    return action
+
+
+def create_lazy_widget_action(plugin_name, function_name):
+    def action(widget):
+        return get_plugin_function(plugin_name, function_name)(widget)
+    return action
+
+
+def register_manifest(name, manifest):
+    for object_name in manifest.get("plugin_objects", []):
+        EditorWindow.add_plugin_object(object_name, None)
+    for menu_name, actions in manifest.get("menus", dict()).items():
+        menu_actions = []
+        for action_desc in actions:
+            action_desc = dict(action_desc)
+            action_desc["function"] = create_lazy_action(name, action_desc["function"])
+            menu_actions.append(action_desc)
+        if menu_name in EditorWindow.menu_actions:
+            EditorWindow.add_actions_to_menu(menu_name, menu_actions)
+        else:
+            EditorWindow.add_menu(menu_name, menu_actions)
+    for button in manifest.get("widget_buttons", []):
+        function = create_lazy_widget_action(name, button["function"])
+        EditorWindow.add_widget_button(button["widget"], button["name"], function, button.get("layout"))
+
+
+for plugin_dir in sorted(Path(__file__).parent.iterdir()):
     if plugin_dir.joinpath("__init__.py").is_file():
         try:
-            print("Importing "+ plugin_dir.stem + " plugin...")
-            importlib.import_module("tool.plugins."+str(plugin_dir.stem))
+            manifest = load_manifest(plugin_dir)
+            if manifest is not None:
+                register_manifest(plugin_dir.stem, manifest)
+            if manifest is None or not manifest.get("lazy", False):
+                load_plugin(plugin_dir.stem)
         except Exception as e:
             print("Error: Could not import plugin "+plugin_dir.stem + ": "+str(e))
             pass
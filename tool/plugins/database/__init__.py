@@ -9,8 +9,11 @@ if os.path.isfile(CONFIG_FILE):
 
 from tool.plugins.database.gui import MotionDBBrowserDialog, GraphTableViewDialog, UploadMotionDialog, LoginDialog, SynchronizeSkeletonsWithDBDialog
 from tool.plugins.database.session_manager import SessionManager
+from tool.plugins.database.db_cache import invalidate_motion
 from motion_db_interface import replace_motion_in_db
+from tool.core.dialogs.utils import create_section_dict_from_annotation
 
+# the menu entries and widget buttons are registered from manifest.json before this module is imported
 EditorWindow.add_plugin_object("session_manager", SessionManager)
 EditorWindow.add_plugin_object("motion_db_browser_dialog", None)
 
@@ -55,26 +58,6 @@ def login_to_server():
         EditorWindow.instance.session_manager.login(user, password)
 
 
-actions = [ {"text": "Login",  "function": login_to_server},
-            {"text": "Open Motion DB Browser", "function": open_motion_db_browser},
-            {"text": "Open Graph Browser", "function" : load_graph_from_db},
-            {"text": "Upload Selected Motions", "function": upload_motions_to_db},
-            {"text": "Synchronize Skeleton Definitions", "function": synchronize_skeletons_from_db}
-        ]
-EditorWindow.add_menu("Database", actions)
- 
-def create_section_dict_from_annotation(annotations):
-    motion_sections = dict()
-    for label, sections in annotations.items():
-        motion_sections[label] = []
-        for sub_section in sections:
-            sub_section.sort()
-            section_dict = dict()
-            section_dict["start_idx"] = sub_section[0]
-            section_dict["end_idx"] = sub_section[-1]
-            motion_sections[label].append(section_dict)
-    return motion_sections
-
 def upload_motion_to_db(widget):
     from tool.plugins.database.constants import DB_URL
     node_id = widget._controller.scene_object.node_id
@@ -97,6 +80,7 @@ def upload_motion_to_db(widget):
             meta_info_str = ""
         session = EditorWindow.instance.session_manager.session
         replace_motion_in_db(DB_URL, motion_id, bvh_name, motion_data, collection, skeleton_model_name, meta_info_str, is_processed, session=session)
+        invalidate_motion(DB_URL, motion_id)
 
     else:
         dialog = UploadMotionDialog([widget._controller.scene_object])
@@ -104,4 +88,3 @@ def upload_motion_to_db(widget):
         if dialog.success:
             print("success")
 
-EditorWindow.add_widget_button("animation_player", "UploadMotionToDB", upload_motion_to_db, "horizontalLayout_3")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Collection hierarchy of the motion database that is shared by all database dialogs.
+    The tree below a root collection is loaded with a single request and cached per database url and root,
+    so that opening another dialog on the same project does not send any request.
+    Cached trees are reloaded after COLLECTION_TREE_MAX_AGE seconds and when the browser selects a project.
+    If the server can not return the whole tree, the children of a collection are requested when they are needed.
+"""
+import threading
+import time
+from tool.plugins.database import constants as db_constants
+from motion_db_interface import get_collections_by_parent_id_from_remote_db
+
+
+class CollectionTree(object):
+    """ stores the children of each collection as list of tuples of id, name and type"""
+    def __init__(self, db_url, root_id, mdb_session=None):
+        self.db_url = db_url
+        self.root_id = root_id
+        self.mdb_session = mdb_session
+        self.children = dict()
+        self.parents = dict()
+        self.is_complete = False
+        self.load_time = time.time()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """ requests the whole tree at once and falls back to loading the children on demand"""
+        collection_tree = None
+        if self.mdb_session is not None:
+            try:
+                collection_tree = self.mdb_session.get_collections_tree(self.root_id)
+            except Exception as e:
+                print("Warning: could not load collection tree", self.root_id, e)
+        if collection_tree is None:
+            return False
+        with self._lock:
+            self.children = dict()
+            self.parents = dict()
+            self._add_sub_tree(self.root_id, collection_tree)
+            self.is_complete = True
+            self.load_time = time.time()
+        return True
+
+    def _add_sub_tree(self, parent_id, sub_tree):
+        self.children[parent_id] = []
+        for key, col in sub_tree.items():
+            c_id = int(key)
+            self.children[parent_id].append((c_id, col["name"], col["type"]))
+            self.parents[c_id] = parent_id
+            self._add_sub_tree(c_id, col.get("sub_tree", dict()))
+
+    def get_children(self, parent_id):
+        with self._lock:
+            if parent_id in self.children:
+                return self.children[parent_id]
+        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
+        if collection_list is None:
+            collection_list = []
+        children = [(int(col[0]), col[1], col[2]) for col in collection_list]
+        with self._lock:
+            self.children[parent_id] = children
+            for col in children:
+                self.parents[col[0]] = parent_id
+        return children
+
+    def has_children(self, parent_id):
+        """ returns True if the collection has children or if they are not loaded yet"""
+        with self._lock:
+            if parent_id in self.children:
+                return len(self.children[parent_id]) > 0
+            return not self.is_complete
+
+    def get_path(self, collection_id):
+        """ returns the ids from the child of the root to the collection or None if the collection is not loaded"""
+        path = []
+        with self._lock:
+            while collection_id != self.root_id:
+                if collection_id not in self.parents:
+                    return None
+                path.insert(0, collection_id)
+                collection_id = self.parents[collection_id]
+        return path
+
+
+_collection_trees = dict()
+_lock = threading.Lock()
+
+
+def get_collection_tree(db_url, root_id, mdb_session=None):
+    """ returns the cached tree of the root collection and loads it on the first call or when it is too old"""
+    key = db_url, root_id
+    with _lock:
+        collection_tree = _collection_trees.get(key)
+    if collection_tree is not None and time.time() - collection_tree.load_time < db_constants.COLLECTION_TREE_MAX_AGE:
+        return collection_tree
+    if mdb_session is None:
+        from motion_db_interface import MGModelDBSession
+        from tool.plugins.database.session_manager import SessionManager
+        mdb_session = MGModelDBSession(db_url, SessionManager.session)
+    collection_tree = CollectionTree(db_url, root_id, mdb_session)
+    collection_tree.load()
+    with _lock:
+        _collection_trees[key] = collection_tree
+    return collection_tree
+
+
+def invalidate_collection_trees(db_url=None, root_id=None):
+    """ removes the cached trees of the url or all trees, needs to be called when a collection is changed"""
+    with _lock:
+        for key in list(_collection_trees.keys()):
+            if (db_url is None or key[0] == db_url) and (root_id is None or key[1] == root_id):
+                del _collection_trees[key]
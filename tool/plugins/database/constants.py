@@ -32,12 +32,27 @@ K8S_RESOURCES["memory"] = {"request":"2Gi", "limit":"4Gi"}
 K8S_IMAGE_NAME = "python:3.5.3"
 MG_REPO_URL = "https://iceland.sb.dfki.de/bitbucket/scm/motsy/mosi_dev_mg.git"
 MG_EXEC_DIR= "mosi_dev_mg/python_src"
+# settings of the http client shared by all database calls
+DB_POOL_SIZE = 10
+DB_CONNECT_TIMEOUT = 5.0
+DB_READ_TIMEOUT = 300.0
+DB_RETRIES = 3
+DB_BACKOFF_FACTOR = 0.5
+DB_GZIP_REQUESTS = False
+# cache of downloaded motions, skeletons and models, the directory defaults to DATA_DIR/db_cache
+DB_CACHE_DIR = None
+DB_CACHE_SIZE = 1024 # MB
+DB_CACHE_MAX_AGE = 24 * 60 * 60 # seconds, only used for entries that can not be revalidated with the server
+USE_DB_CACHE = True
+COLLECTION_TREE_MAX_AGE = 5 * 60 # seconds, cached collection trees are reloaded after this time
 
 def set_constants_from_file(filename):
     global DB_URL
     global MG_REPO_URL
     global MG_EXEC_DIR
     global K8S_IMAGE_NAME
+    global DB_POOL_SIZE, DB_CONNECT_TIMEOUT, DB_READ_TIMEOUT, DB_RETRIES, DB_BACKOFF_FACTOR, DB_GZIP_REQUESTS
+    global DB_CACHE_DIR, DB_CACHE_SIZE, DB_CACHE_MAX_AGE, USE_DB_CACHE, COLLECTION_TREE_MAX_AGE
     with open(filename, "rt") as in_file:
         config = json.load(in_file)
     if "db_url" in config:
@@ -48,4 +63,26 @@ def set_constants_from_file(filename):
         MG_EXEC_DIR = config["mg_exec_dir"]
     if "k8s_image_name" in config:
         K8S_IMAGE_NAME = config["k8s_image_name"]
+    if "db_pool_size" in config:
+        DB_POOL_SIZE = config["db_pool_size"]
+    if "db_connect_timeout" in config:
+        DB_CONNECT_TIMEOUT = config["db_connect_timeout"]
+    if "db_read_timeout" in config:
+        DB_READ_TIMEOUT = config["db_read_timeout"]
+    if "db_retries" in config:
+        DB_RETRIES = config["db_retries"]
+    if "db_backoff_factor" in config:
+        DB_BACKOFF_FACTOR = config["db_backoff_factor"]
+    if "db_gzip_requests" in config:
+        DB_GZIP_REQUESTS = config["db_gzip_requests"]
+    if "db_cache_dir" in config:
+        DB_CACHE_DIR = config["db_cache_dir"]
+    if "db_cache_size" in config:
+        DB_CACHE_SIZE = config["db_cache_size"]
+    if "db_cache_max_age" in config:
+        DB_CACHE_MAX_AGE = config["db_cache_max_age"]
+    if "use_db_cache" in config:
+        USE_DB_CACHE = config["use_db_cache"]
+    if "collection_tree_max_age" in config:
+        COLLECTION_TREE_MAX_AGE = config["collection_tree_max_age"]
     
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" On-disk read-through cache of data downloaded from the motion database.
+    Entries are keyed by the database url, the resource type, the id of the item and an optional revision.
+    If the server sent an ETag or Last-Modified header with the download, a cache hit is revalidated with
+    a conditional request, otherwise the entry is trusted for a maximum age.
+    Writes through CachedDBSession remove the entries of the changed item.
+    When the cache exceeds its maximum size the least recently used entries are removed.
+"""
+import os
+import time
+import pickle
+import hashlib
+import threading
+from tool.core.motion_cache import write_atomic
+from tool.plugins.database import constants as db_constants
+from tool.plugins.database.collection_tree import invalidate_collection_trees
+
+DEFAULT_MAX_SIZE = 1024 # MB
+DEFAULT_MAX_AGE = 24 * 60 * 60 # seconds
+ENTRY_SUFFIX = ".pickle"
+
+
+def get_hash(value):
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+
+class DBCache(object):
+    """ max_size is the maximum size of all entries in MB
+        max_age is the time in seconds after which entries without validators are downloaded again
+    """
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.n_hits = 0
+        self.n_misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get_filename(self, url, resource, item_id, revision=None):
+        """ the item part of the name allows to remove all revisions of an item """
+        item_hash = get_hash((url, resource, item_id))
+        return self.directory + os.sep + item_hash + "." + get_hash(revision)[:16] + ENTRY_SUFFIX
+
+    def get(self, url, resource, item_id, revision=None):
+        """ returns the entry dict with value, validators, request and time or None"""
+        filename = self.get_filename(url, resource, item_id, revision)
+        try:
+            with open(filename, "rb") as in_file:
+                entry = pickle.load(in_file)
+            os.utime(filename)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return entry
+
+    def put(self, url, resource, item_id, value, revision=None, request=None, validators=None):
+        entry = {"key": (url, resource, item_id, revision), "value": value, "time": time.time(),
+                 "request": request, "validators": validators}
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            print("Warning: could not cache", resource, item_id, e)
+            return False
+        filename = self.get_filename(url, resource, item_id, revision)
+        try:
+            write_atomic(filename, lambda out_file: out_file.write(data))
+        except OSError as e:
+            print("Warning: could not cache", resource, item_id, e)
+            return False
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+        if self._size is None:
+            self._size = self.get_size()
+        if self._size > self.max_size * 1024 * 1024:
+            self.evict()
+        return True
+
+    def invalidate(self, url, resource, item_id):
+        """ removes all revisions of the item"""
+        prefix = get_hash((url, resource, item_id)) + "."
+        for dir_entry in os.scandir(self.directory):
+            if dir_entry.name.startswith(prefix) and dir_entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    os.remove(dir_entry.path)
+                except OSError:
+                    pass
+
+    def get_entries(self):
+        """ returns a list of (last access time, size in bytes, filename) for all entries"""
+        entries = []
+        for dir_entry in os.scandir(self.directory):
+            if not dir_entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+        return entries
+
+    def get_size(self):
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self, max_size=None):
+        """ removes the least recently used entries until the cache is smaller than max_size MB"""
+        if max_size is None:
+            max_size = self.max_size
+        max_bytes = max_size * 1024 * 1024
+        with self._lock:
+            entries = sorted(self.get_entries())
+            total_size = sum(size for _, size, _ in entries)
+            n_removed = 0
+            for _, size, filename in entries:
+                if total_size <= max_bytes:
+                    break
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+                total_size -= size
+                n_removed += 1
+            self._size = total_size
+            return n_removed
+
+    def clear(self):
+        self.evict(0)
+
+
+class CachedDBSession(object):
+    """ wraps a MGModelDBSession and serves the downloads of motions, skeletons and models from the cache
+        all other methods are forwarded to the session
+    """
+    def __init__(self, session, cache, url, client=None):
+        self.session = session
+        self.cache = cache
+        self.url = url
+        self.client = client
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def is_valid(self, entry):
+        validators = entry.get("validators")
+        request = entry.get("request")
+        if validators and request is not None and self.client is not None:
+            try:
+                return self.client.is_not_modified(*request, validators)
+            except Exception as e:
+                print("Warning: could not validate cache entry", e)
+                return False
+        return time.time() - entry["time"] < self.cache.max_age
+
+    def get_cached(self, resource, item_id, load_func, revision=None):
+        """ returns the value from the cache or calls load_func and stores its result if it is not None"""
+        if self.cache is None:
+            return load_func()
+        entry = self.cache.get(self.url, resource, item_id, revision)
+        if entry is not None and self.is_valid(entry):
+            self.cache.n_hits += 1
+            return entry["value"]
+        self.cache.n_misses += 1
+        if self.client is not None:
+            self.client.record_exchanges()
+        try:
+            value = load_func()
+        finally:
+            exchanges = self.client.stop_recording() if self.client is not None else []
+        if value is None:
+            return None
+        request, validators = None, None
+        # a single request can be repeated for validation, otherwise the maximum age applies
+        if len(exchanges) == 1 and len(exchanges[0][3]) > 0:
+            request, validators = exchanges[0][:3], exchanges[0][3]
+        self.cache.put(self.url, resource, item_id, value, revision, request, validators)
+        return value
+
+    def invalidate(self, resource, item_id):
+        if self.cache is not None:
+            self.cache.invalidate(self.url, resource, item_id)
+
+    def get_motion_data(self, motion_id, is_processed=False):
+        return self.get_cached("motion_data", (motion_id, is_processed),
+                               lambda: self.session.get_motion_data(motion_id, is_processed))
+
+    def get_motion_meta_data(self, motion_id, is_processed=False):
+        return self.get_cached("motion_meta_data", (motion_id, is_processed),
+                               lambda: self.session.get_motion_meta_data(motion_id, is_processed))
+
+    def get_skeleton_data(self, skeleton_name):
+        return self.get_cached("skeleton_data", skeleton_name, lambda: self.session.get_skeleton_data(skeleton_name))
+
+    def get_skeleton_meta_data(self, skeleton_name):
+        return self.get_cached("skeleton_meta_data", skeleton_name,
+                               lambda: self.session.get_skeleton_meta_data(skeleton_name))
+
+    def load_skeleton(self, skeleton_name):
+        return self.get_cached("skeleton", skeleton_name, lambda: self.session.load_skeleton(skeleton_name))
+
+    def download_file(self, file_id):
+        return self.get_cached("file", file_id, lambda: self.session.download_file(file_id))
+
+    def download_model(self, model_id):
+        return self.get_cached("model", model_id, lambda: self.session.download_model(model_id))
+
+    def download_motion_model(self, model_id):
+        return self.get_cached("motion_model", model_id, lambda: self.session.download_motion_model(model_id))
+
+    def download_cluster_tree(self, model_id):
+        return self.get_cached("cluster_tree", model_id, lambda: self.session.download_cluster_tree(model_id))
+
+    def invalidate_motion(self, motion_id):
+        for resource in ["motion_data", "motion_meta_data"]:
+            for is_processed in [False, True]:
+                self.invalidate(resource, (motion_id, is_processed))
+
+    def invalidate_skeleton(self, skeleton_name):
+        for resource in ["skeleton_data", "skeleton_meta_data", "skeleton"]:
+            self.invalidate(resource, skeleton_name)
+
+    def replace_motion(self, motion_id, *args, **kwargs):
+        result = self.session.replace_motion(motion_id, *args, **kwargs)
+        self.invalidate_motion(motion_id)
+        return result
+
+    def delete_motion(self, motion_id, *args, **kwargs):
+        result = self.session.delete_motion(motion_id, *args, **kwargs)
+        self.invalidate_motion(motion_id)
+        return result
+
+    def replace_skeleton(self, skeleton_name, *args, **kwargs):
+        result = self.session.replace_skeleton(skeleton_name, *args, **kwargs)
+        self.invalidate_skeleton(skeleton_name)
+        return result
+
+    def delete_skeleton(self, skeleton_name, *args, **kwargs):
+        result = self.session.delete_skeleton(skeleton_name, *args, **kwargs)
+        self.invalidate_skeleton(skeleton_name)
+        return result
+
+    def delete_file(self, file_id, *args, **kwargs):
+        result = self.session.delete_file(file_id, *args, **kwargs)
+        self.invalidate("file", file_id)
+        return result
+
+    def create_new_collection(self, *args, **kwargs):
+        result = self.session.create_new_collection(*args, **kwargs)
+        invalidate_collection_trees(self.url)
+        return result
+
+    def replace_collection(self, *args, **kwargs):
+        result = self.session.replace_collection(*args, **kwargs)
+        invalidate_collection_trees(self.url)
+        return result
+
+    def delete_collection(self, *args, **kwargs):
+        result = self.session.delete_collection(*args, **kwargs)
+        invalidate_collection_trees(self.url)
+        return result
+
+    def upload_cluster_tree(self, model_id, *args, **kwargs):
+        result = self.session.upload_cluster_tree(model_id, *args, **kwargs)
+        self.invalidate("cluster_tree", model_id)
+        return result
+
+
+_db_cache = None
+
+
+def get_db_cache():
+    """ returns the cache shared by all database dialogs or None if it is deactivated in the config"""
+    global _db_cache
+    from tool import constants
+    if not db_constants.USE_DB_CACHE:
+        return None
+    directory = db_constants.DB_CACHE_DIR
+    if directory is None:
+        directory = constants.DATA_DIR + os.sep + "db_cache"
+    if _db_cache is None or _db_cache.directory != directory:
+        _db_cache = DBCache(directory, db_constants.DB_CACHE_SIZE, db_constants.DB_CACHE_MAX_AGE)
+    _db_cache.max_size = db_constants.DB_CACHE_SIZE
+    _db_cache.max_age = db_constants.DB_CACHE_MAX_AGE
+    return _db_cache
+
+
+def invalidate_motion(url, motion_id):
+    """ removes a motion that was replaced without a CachedDBSession from the cache"""
+    db_cache = get_db_cache()
+    if db_cache is not None:
+        CachedDBSession(None, db_cache, url).invalidate_motion(motion_id)
+
+
+def invalidate_skeleton(url, skeleton_name):
+    """ removes a skeleton that was replaced without a CachedDBSession from the cache"""
+    db_cache = get_db_cache()
+    if db_cache is not None:
+        CachedDBSession(None, db_cache, url).invalidate_skeleton(skeleton_name)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" HTTP client shared by all calls to the motion database.
+    The client keeps the connections alive in a pool, applies timeouts to every request and retries requests
+    that failed to connect or were rejected by an overloaded server with exponential backoff.
+    The helpers of motion_db_interface call the module level functions of requests. DBClient.install replaces
+    the requests module of these helpers by a proxy, so that their calls reuse the pooled connections of the client.
+    Modules that are imported after install are patched by an import hook.
+"""
+import sys
+import json
+import importlib.abc
+import gzip
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0 # seconds
+DEFAULT_READ_TIMEOUT = 300.0 # seconds, downloads of large motions and models can take long
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# the server did not process these requests, so repeating a POST does not create duplicates
+RETRY_STATUS_CODES = (502, 503)
+GZIP_MIN_SIZE = 1024 # bytes
+VALIDATOR_HEADERS = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+INSTALL_MODULE_PREFIXES = ["motion_db_interface", "morphablegraphs.utilities.db_interface"]
+
+
+def has_prefix(name, module_prefixes):
+    return any(name == p or name.startswith(p + ".") for p in module_prefixes)
+
+
+def patch_module(module, proxy):
+    if getattr(module, "requests", None) is requests or isinstance(getattr(module, "requests", None), RequestsProxy):
+        module.requests = proxy
+
+
+def create_retry(retries, backoff_factor):
+    kwargs = dict(total=retries, connect=retries, read=0, status=retries, backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUS_CODES, raise_on_status=False)
+    methods = frozenset(["GET", "POST", "PUT", "DELETE", "HEAD"])
+    try:
+        return Retry(allowed_methods=methods, **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=methods, **kwargs)
+
+
+class DBClient(object):
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 gzip_requests=False):
+        self.timeout = (connect_timeout, read_timeout)
+        self.gzip_requests = gzip_requests
+        self.session = requests.Session()
+        # the session asks for gzip encoded responses and decodes them by default
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=create_retry(retries, backoff_factor))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.n_requests = 0
+        self._local = threading.local()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if "json" in kwargs and kwargs["json"] is not None:
+            kwargs["data"] = json.dumps(kwargs.pop("json"))
+            kwargs.setdefault("headers", dict())["Content-Type"] = "application/json"
+        data = kwargs.get("data")
+        if self.gzip_requests and data is not None and len(data) >= GZIP_MIN_SIZE:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            if isinstance(data, bytes):
+                kwargs["data"] = gzip.compress(data)
+                headers = dict(kwargs.get("headers") or dict())
+                headers["Content-Encoding"] = "gzip"
+                kwargs["headers"] = headers
+        self.n_requests += 1
+        response = self.session.request(method, url, **kwargs)
+        exchanges = getattr(self._local, "exchanges", None)
+        if exchanges is not None:
+            validators = {k: response.headers[k] for k in VALIDATOR_HEADERS if k in response.headers}
+            exchanges.append((method, url, kwargs, validators))
+        return response
+
+    def record_exchanges(self):
+        """ starts recording the requests of this thread and the validators that the server sent with the responses"""
+        self._local.exchanges = []
+
+    def stop_recording(self):
+        """ returns the list of (method, url, kwargs, validators) that were recorded since record_exchanges"""
+        exchanges = getattr(self._local, "exchanges", None)
+        self._local.exchanges = None
+        return exchanges if exchanges is not None else []
+
+    def is_not_modified(self, method, url, kwargs, validators):
+        """ repeats a recorded request as conditional request and returns True if the server answered 304"""
+        kwargs = dict(kwargs)
+        headers = dict(kwargs.get("headers") or dict())
+        for key, value in validators.items():
+            headers[VALIDATOR_HEADERS[key]] = value
+        kwargs["headers"] = headers
+        # the body is not downloaded if the resource was modified, the caller loads it again
+        kwargs["stream"] = True
+        self.n_requests += 1
+        response = self.session.request(method, url, **kwargs)
+        response.close()
+        return response.status_code == 304
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def call_rest_interface(self, url, method, data):
+        """ posts the data as JSON to the method of the REST interface and returns the response text"""
+        return self.post(url + method, data=json.dumps(data)).text
+
+    def install(self, module_prefixes=INSTALL_MODULE_PREFIXES):
+        """ replaces the requests module in the modules with the prefixes by a proxy of this client
+            modules that are imported later are patched when they are loaded
+        """
+        global _install_finder
+        proxy = RequestsProxy(self)
+        for name, module in list(sys.modules.items()):
+            if module is not None and has_prefix(name, module_prefixes):
+                patch_module(module, proxy)
+        if _install_finder is None:
+            _install_finder = InstallFinder()
+            sys.meta_path.insert(0, _install_finder)
+        _install_finder.set_proxy(proxy, module_prefixes)
+
+    def close(self):
+        self.session.close()
+
+
+class RequestsProxy(object):
+    """ module-like object that sends the request functions through the client and forwards everything else to requests"""
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, url, **kwargs):
+        return self._client.request(method.upper(), url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self._client.request("GET", url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self._client.post(url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self._client.put(url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._client.delete(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+class InstallLoader(importlib.abc.Loader):
+    """ executes a module with the original loader and replaces its requests module afterwards"""
+    def __init__(self, loader, proxy):
+        self._loader = loader
+        self._proxy = proxy
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        patch_module(module, self._proxy)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class InstallFinder(importlib.abc.MetaPathFinder):
+    """ import hook that patches the modules with the prefixes which are imported after DBClient.install"""
+    def __init__(self):
+        self.proxy = None
+        self.module_prefixes = []
+
+    def set_proxy(self, proxy, module_prefixes):
+        self.proxy = proxy
+        self.module_prefixes = list(module_prefixes)
+
+    def find_spec(self, fullname, path, target=None):
+        if self.proxy is None or not has_prefix(fullname, self.module_prefixes):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = InstallLoader(spec.loader, self.proxy)
+            return spec
+        return None
+
+
+_install_finder = None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Concurrent download of files and motions from the motion database.
+    The items are downloaded and parsed in a thread pool that shares the pooled connections of the db client.
+    The results are collected with poll, which is meant to be called from a timer in the GUI thread
+    that creates the scene objects.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from tool import parse_motion_from_json
+from tool.plugins.database import constants as db_constants
+
+LOADER_TARGET = "vis_utils"
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class DownloadItem(object):
+    def __init__(self, item_id, name, data_type, collection):
+        self.item_id = item_id
+        self.name = name
+        self.data_type = data_type
+        self.collection = collection
+        # set by the worker
+        self.loader_script = None
+        self.data = None
+        self.skeleton = None
+        self.motion_vector = None
+        self.meta_data_str = ""
+
+
+class DownloadManager(object):
+    """ downloads items with a loader script of their data type as file and all other items as motion
+        n_workers defaults to the connection pool size of the db client
+    """
+    def __init__(self, mdb_session, skeleton_data, n_workers=None):
+        if n_workers is None:
+            n_workers = db_constants.DB_POOL_SIZE
+        self.mdb_session = mdb_session
+        self.skeleton_data = skeleton_data
+        self._pool = ThreadPoolExecutor(max_workers=n_workers)
+        self._futures = []
+        self._loader_scripts = dict()
+        self._loader_locks = dict()
+        self._lock = threading.Lock()
+        self.n_jobs = 0
+        self.n_finished = 0
+        self.cancelled = False
+
+    def submit(self, item_id, name, data_type, collection):
+        item = DownloadItem(item_id, name, data_type, collection)
+        self._futures.append((item, self._pool.submit(self.download, item)))
+        self.n_jobs += 1
+
+    def get_loader_script(self, data_type):
+        """ the loader info is requested once per data type instead of once per item"""
+        with self._lock:
+            if data_type not in self._loader_locks:
+                self._loader_locks[data_type] = threading.Lock()
+            type_lock = self._loader_locks[data_type]
+        with type_lock:
+            if data_type not in self._loader_scripts:
+                info = self.mdb_session.get_data_loader_info(data_type, LOADER_TARGET)
+                script = None
+                if info is not None and "script" in info:
+                    script = info["script"].replace("\r\n", "\n")
+                self._loader_scripts[data_type] = script
+            return self._loader_scripts[data_type]
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise DownloadCancelled()
+
+    def download(self, item):
+        self.check_cancelled()
+        item.loader_script = self.get_loader_script(item.data_type)
+        self.check_cancelled()
+        if item.loader_script is not None:
+            item.data = self.mdb_session.download_file(item.item_id)
+            if item.data is None:
+                raise Exception("file data is empty")
+            return item
+        motion_data = self.mdb_session.get_motion_data(item.item_id, False)
+        if motion_data is None:
+            raise Exception("motion data is empty")
+        self.check_cancelled()
+        meta_data_str = self.mdb_session.get_motion_meta_data(item.item_id, False)
+        if meta_data_str is not None:
+            item.meta_data_str = meta_data_str
+        self.check_cancelled()
+        item.skeleton, item.motion_vector = parse_motion_from_json(self.skeleton_data, motion_data)
+        return item
+
+    def poll(self, max_items=None):
+        """ returns the finished items in the order of submission
+            Returns:
+                finished (list): tuples of the DownloadItem and the error or None
+        """
+        finished = []
+        remaining = []
+        for item, future in self._futures:
+            if not future.done() or (max_items is not None and len(finished) >= max_items):
+                remaining.append((item, future))
+                continue
+            self.n_finished += 1
+            try:
+                future.result()
+                finished.append((item, None))
+            except (CancelledError, DownloadCancelled):
+                pass
+            except Exception as e:
+                finished.append((item, e))
+        self._futures = remaining
+        return finished
+
+    def is_finished(self):
+        return len(self._futures) == 0
+
+    def cancel(self):
+        """ removes the pending items, the running items stop at the next step"""
+        self.cancelled = True
+        for item, future in self._futures:
+            future.cancel()
+        self._futures = [(item, future) for item, future in self._futures if not future.cancelled()]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+from PySide2.QtWidgets import QTreeWidgetItem
+from PySide2.QtCore import Qt
+
+IS_POPULATED_ROLE = Qt.UserRole + 1
+
+
+class CollectionTreeView(object):
+    """ shows a CollectionTree in a QTreeWidget and creates the items of a collection when it is expanded """
+    def __init__(self, tree_widget):
+        self.tree_widget = tree_widget
+        self.collection_tree = None
+        self.exclude_id = None
+        self.root_item = None
+        self.tree_widget.itemExpanded.connect(self.populate_item)
+
+    def set_tree(self, collection_tree, exclude_id=None):
+        """ exclude_id hides a collection and its sub tree"""
+        self.collection_tree = collection_tree
+        self.exclude_id = exclude_id
+        self.tree_widget.clear()
+        self.root_item = QTreeWidgetItem(self.tree_widget, ["root", "root"])
+        self.root_item.setData(0, Qt.UserRole, collection_tree.root_id)
+        self.populate_item(self.root_item)
+        self.root_item.setExpanded(True)
+        return self.root_item
+
+    def populate_item(self, item):
+        if item.data(0, IS_POPULATED_ROLE) or self.collection_tree is None:
+            return
+        item.setData(0, IS_POPULATED_ROLE, True)
+        parent_id = int(item.data(0, Qt.UserRole))
+        for c_id, name, col_type in self.collection_tree.get_children(parent_id):
+            if c_id == self.exclude_id:
+                continue
+            col_item = QTreeWidgetItem(item, [name, col_type])
+            col_item.setData(0, Qt.UserRole, c_id)
+            if self.collection_tree.has_children(c_id):
+                col_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            else:
+                col_item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def find_item(self, collection_id):
+        """ expands the path to the collection and returns its item or None"""
+        if self.root_item is None:
+            return None
+        if collection_id == self.collection_tree.root_id:
+            return self.root_item
+        path = self.collection_tree.get_path(collection_id)
+        if path is None:
+            return None
+        item = self.root_item
+        for c_id in path:
+            self.populate_item(item)
+            item.setExpanded(True)
+            children = [item.child(i) for i in range(item.childCount())]
+            item = next((c for c in children if int(c.data(0, Qt.UserRole)) == c_id), None)
+            if item is None:
+                return None
+        return item
@@ -20,11 +20,11 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
-import threading
-from PySide2.QtWidgets import QDialog, QTreeWidgetItem, QFileDialog
+from PySide2.QtWidgets import QDialog, QFileDialog
 from PySide2.QtCore import Qt
 from .layout.copy_db_dialog_ui import Ui_Dialog
-from motion_db_interface import get_collections_by_parent_id_from_remote_db
+from tool.plugins.database.collection_tree import get_collection_tree
+from .collection_tree_view import CollectionTreeView
 
 class CopyDBDialog(QDialog, Ui_Dialog):
     def __init__(self, db_url, parent=None):
@@ -35,8 +35,8 @@ class CopyDBDialog(QDialog, Ui_Dialog):
         self.cancelButton.clicked.connect(self.slot_reject)
         self.success = False
         self.collection = None
-        t = threading.Thread(target=self.fill_tree_widget)
-        t.start()
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
+        self.fill_tree_widget()
 
     def slot_accept(self):
         col = self.get_collection()
@@ -48,25 +48,10 @@ class CopyDBDialog(QDialog, Ui_Dialog):
     def slot_reject(self):
         self.close()
 
-    def fill_tree_widget(self, parent=None):
-        if parent is None:
-            self.collectionTreeWidget.clear()
-            self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-            self.rootItem.setExpanded(True)
-            # root collection has id 0
-            parent_id = 0
-            parent_item = self.rootItem
-            self.rootItem.setData(0, Qt.UserRole, parent_id)
-        else:
-            parent_id = parent[1]
-            parent_item = parent[0]
+    def fill_tree_widget(self):
+        collection_tree = get_collection_tree(self.db_url, 0)
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree)
 
-        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
-        for col in collection_list:
-            colItem = QTreeWidgetItem(parent_item, [col[1], col[2]])
-            colItem.setData(0, Qt.UserRole, col[0])
-            self.fill_tree_widget((colItem, col[0]))
-    
     def get_collection(self):
         colItem = self.collectionTreeWidget.currentItem()
         if colItem is None:
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+from PySide2.QtCore import Qt, QTimer
+from PySide2.QtWidgets import QProgressDialog, QMessageBox
+from tool.plugins.database.download_manager import DownloadManager
+
+POLL_INTERVAL = 100 # ms
+OBJECTS_PER_POLL = 10 # limits the time spent creating scene objects between two frames
+
+
+class DownloadProgressDialog(QProgressDialog):
+    """ downloads the items in a DownloadManager and creates the scene objects in batches from a timer in the GUI thread
+        items: list of tuples of item id, name, data type and collection
+    """
+    def __init__(self, scene, mdb_session, skeleton_data, items, parent=None):
+        QProgressDialog.__init__(self, "Downloading " + str(len(items)) + " files", "Cancel", 0, len(items), parent)
+        self.setWindowModality(Qt.WindowModal)
+        self.setMinimumDuration(0)
+        self.scene = scene
+        self.skeleton_data = skeleton_data
+        self.errors = []
+        self.is_done = False
+        self._loaded_types = set()
+        self.manager = DownloadManager(mdb_session, skeleton_data)
+        for item_id, name, data_type, collection in items:
+            self.manager.submit(item_id, name, data_type, collection)
+        self.canceled.connect(self.slot_cancel)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(POLL_INTERVAL)
+
+    def poll(self):
+        for item, error in self.manager.poll(OBJECTS_PER_POLL):
+            if error is None:
+                try:
+                    self.create_object(item)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                print("Error: could not load", item.name, error)
+                self.errors.append((item.name, error))
+        self.setValue(self.manager.n_finished)
+        if self.manager.is_finished():
+            self.finish()
+
+    def create_object(self, item):
+        builder = self.scene.object_builder
+        if item.loader_script is not None:
+            if item.data_type not in self._loaded_types:
+                builder.load_dynamic_module(item.data_type, item.loader_script)
+                self._loaded_types.add(item.data_type)
+            builder.create_object(item.data_type, item.name, self.skeleton_data, item.data)
+        else:
+            builder.create_object("parsed_motion", item.skeleton, item.motion_vector, item.name, item.collection,
+                                  item.item_id, item.meta_data_str, False, visible=True)
+
+    def finish(self):
+        # close emits canceled, which would call finish a second time
+        if self.is_done:
+            return
+        self.is_done = True
+        self.timer.stop()
+        self.manager.shutdown()
+        self.close()
+        if len(self.errors) > 0:
+            message = "\n".join(name + ": " + str(error) for name, error in self.errors)
+            QMessageBox.about(self.parentWidget(), "Error", "Could not load " + str(len(self.errors)) + " files\n" + message)
+
+    def slot_cancel(self):
+        if self.is_done:
+            return
+        self.manager.cancel()
+        self.finish()
@@ -21,12 +21,13 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 import os
-import threading
-from PySide2.QtWidgets import  QDialog, QListWidgetItem, QFileDialog, QAbstractItemView, QTreeWidgetItem
+from PySide2.QtWidgets import  QDialog, QListWidgetItem, QFileDialog, QAbstractItemView
 from PySide2.QtCore import Qt
 from .layout.edit_collection_dialog_ui import Ui_Dialog
 from tool.plugins.database.constants import DB_URL
-from motion_db_interface import get_collections_from_remote_db, get_collections_by_parent_id_from_remote_db
+from tool.plugins.database.collection_tree import get_collection_tree
+from .collection_tree_view import CollectionTreeView
+from motion_db_interface import get_collections_from_remote_db
 
 
 
@@ -47,30 +48,15 @@ class EditCollectionDialog(QDialog, Ui_Dialog):
         self.col_type = col_type
         self.typeLineEdit.setText(col_type)
         self.ownerLineEdit.setText(str(owner))
-        t = threading.Thread(target=self.fill_tree_widget)
-        t.start()
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
+        self.fill_tree_widget()
 
-    def fill_tree_widget(self, parent=None):
-        if parent is None:
-            self.collectionTreeWidget.clear()
-            self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-            self.rootItem.setExpanded(True)
-            # root collection has id 0
-            parent_id = 0
-            parent_item = self.rootItem
-            self.rootItem.setData(0, Qt.UserRole, parent_id)
-        else:
-            parent_id = parent[1]
-            parent_item = parent[0]
-
-        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
-        for col in collection_list:
-            if col[0] == self.collection_id:
-                self.select_tree_node(parent_item)
-                continue
-            colItem = QTreeWidgetItem(parent_item, [col[1], col[2]])
-            colItem.setData(0, Qt.UserRole, col[0])
-            self.fill_tree_widget((colItem, col[0]))
+    def fill_tree_widget(self):
+        collection_tree = get_collection_tree(self.db_url, 0)
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree, exclude_id=self.collection_id)
+        parent_item = self.collection_tree_view.find_item(self.parent_id)
+        if parent_item is not None:
+            self.select_tree_node(parent_item)
 
     def select_tree_node(self, node):
         node.setSelected(True)
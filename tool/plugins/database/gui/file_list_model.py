@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+""" Model of the file list of a collection that fetches the rows in pages while the view is scrolled.
+    The pages are requested in a worker thread and inserted into the model in the GUI thread,
+    so the dialog stays responsive and no widget is changed from another thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from PySide2.QtCore import Qt, QObject, Signal, QAbstractListModel, QModelIndex
+
+PAGE_SIZE = 500 # rows
+
+
+class BackgroundLoader(QObject):
+    """ calls functions in a worker thread and passes the result and the error to the callback in the GUI thread
+        the results of calls that were started before the last reset are dropped
+    """
+    _finished = Signal(int, object, object)
+
+    def __init__(self, callback, parent=None):
+        QObject.__init__(self, parent)
+        self.callback = callback
+        self.generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._finished.connect(self._on_finished, Qt.QueuedConnection)
+
+    def reset(self):
+        self.generation += 1
+
+    def start(self, func, *args):
+        generation = self.generation
+        def run():
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            self._finished.emit(generation, result, error)
+        self._executor.submit(run)
+
+    def _on_finished(self, generation, result, error):
+        if generation == self.generation:
+            self.callback(result, error)
+
+    def shutdown(self):
+        self.reset()
+        self._executor.shutdown(wait=False)
+
+
+class ListPageSource(object):
+    """ serves pages of a list of (id, name, data type) rows that is requested once with load_func
+        the name filter is applied before paging, a server with paginated queries can replace this class
+    """
+    def __init__(self, load_func):
+        self.load_func = load_func
+        self._rows = None
+        self._filtered = ("", None)
+
+    def get_page(self, offset, limit, name_filter=""):
+        """ is called from the worker thread of the model"""
+        if self._rows is None:
+            rows = self.load_func()
+            if rows is None:
+                rows = []
+            self._rows = [(r[0], r[1], r[2]) for r in rows]
+        name_filter = name_filter.lower()
+        if name_filter == "":
+            return self._rows[offset:offset + limit]
+        if self._filtered[0] != name_filter or self._filtered[1] is None:
+            self._filtered = name_filter, [r for r in self._rows if name_filter in r[1].lower()]
+        return self._filtered[1][offset:offset + limit]
+
+
+class FileListModel(QAbstractListModel):
+    """ rows of file id, name and data type, the view requests the next page with fetchMore when it reaches the end"""
+    def __init__(self, page_size=PAGE_SIZE, parent=None):
+        QAbstractListModel.__init__(self, parent)
+        self.page_size = page_size
+        self.source = None
+        self.name_filter = ""
+        self.rows = []
+        self.is_complete = True
+        self.is_loading = False
+        self.loader = BackgroundLoader(self.on_page_loaded, self)
+
+    def set_source(self, source):
+        """ source provides get_page(offset, limit, name_filter) or is None to clear the list"""
+        self.beginResetModel()
+        self.loader.reset()
+        self.source = source
+        self.rows = []
+        self.is_complete = source is None
+        self.is_loading = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def set_filter(self, name_filter):
+        """ reloads the rows whose name contains the filter string"""
+        self.name_filter = name_filter
+        self.set_source(self.source)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        file_id, name, data_type = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return name + "." + data_type
+        if role == Qt.UserRole:
+            return file_id
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.is_complete and not self.is_loading
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        self.is_loading = True
+        self.loader.start(self.source.get_page, len(self.rows), self.page_size, self.name_filter)
+
+    def on_page_loaded(self, rows, error):
+        self.is_loading = False
+        if error is not None:
+            print("Error: could not load file list", error)
+            self.is_complete = True
+            return
+        if len(rows) > 0:
+            start = len(self.rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self.rows += rows
+            self.endInsertRows()
+        if len(rows) < self.page_size:
+            self.is_complete = True
+
+    def get_file(self, row):
+        """ returns the file id and the displayed name of the row"""
+        file_id, name, data_type = self.rows[row]
+        return file_id, name + "." + data_type
+
+    def shutdown(self):
+        self.loader.shutdown()
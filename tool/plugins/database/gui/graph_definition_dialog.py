@@ -20,14 +20,14 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
-import threading
 from copy import copy
 from PySide2.QtWidgets import QDialog, QTreeWidgetItem, QFileDialog, QListWidgetItem
 from PySide2.QtCore import Qt
 from .layout.graph_definition_dialog_ui import Ui_Dialog
 from tool.core.dialogs.enter_name_dialog import EnterNameDialog
 from .select_transition_dialog import SelectTransitionDialog
-from motion_db_interface import get_collections_by_parent_id_from_remote_db
+from tool.plugins.database.collection_tree import get_collection_tree
+from .collection_tree_view import CollectionTreeView
 try:
     from morphablegraphs.utilities.db_interface import get_model_list_from_remote_db
     from morphablegraphs.motion_model import NODE_TYPE_STANDARD, NODE_TYPE_END, NODE_TYPE_START, NODE_TYPE_IDLE, NODE_TYPE_SINGLE
@@ -43,8 +43,8 @@ class GraphDefinitionDialog(QDialog, Ui_Dialog):
         self.selectButton.clicked.connect(self.slot_accept)
         self.cancelButton.clicked.connect(self.slot_reject)
         self.success = False
-        t = threading.Thread(target=self.fill_tree_widget)
-        t.start()
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
+        self.fill_tree_widget()
 
         self.graphRootItem = QTreeWidgetItem(self.graphTreeWidget, ["root", "root"])
         self.graphRootItem.setExpanded(True)
@@ -235,24 +235,9 @@ class GraphDefinitionDialog(QDialog, Ui_Dialog):
             del self.data["nodes"][action_name][mp_id]["transitions"][transiton_name]
             self.update_model_info()
 
-    def fill_tree_widget(self, parent=None):
-        if parent is None:
-            self.collectionTreeWidget.clear()
-            self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-            self.rootItem.setExpanded(True)
-            # root collection has id 0
-            parent_id = 0
-            parent_item = self.rootItem
-            self.rootItem.setData(0, Qt.UserRole, parent_id)
-        else:
-            parent_id = parent[1]
-            parent_item = parent[0]
-
-        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
-        for col in collection_list:
-            colItem = QTreeWidgetItem(parent_item, [col[1], col[2]])
-            colItem.setData(0, Qt.UserRole, col[0])
-            self.fill_tree_widget((colItem, col[0]))
+    def fill_tree_widget(self):
+        collection_tree = get_collection_tree(self.db_url, 0)
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree)
 
     def get_collection(self):
         colItem = self.collectionTreeWidget.currentItem()
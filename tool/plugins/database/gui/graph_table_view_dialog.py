@@ -31,7 +31,7 @@ from tool.core.dialogs.utils import get_animation_controllers
 from .graph_definition_dialog import GraphDefinitionDialog, EnterNameDialog
 from tool.core.dialogs.confirmation_dialog import ConfirmationDialog
 from anim_utils.animation_data import SkeletonBuilder
-from motion_db_interface import call_rest_interface, get_skeletons_from_remote_db, get_skeleton_from_remote_db, get_skeleton_model_from_remote_db
+from motion_db_interface import get_skeletons_from_remote_db, get_skeleton_from_remote_db, get_skeleton_model_from_remote_db
 from vis_utils.io import load_json_file, save_json_file
 from tool.plugins.database.session_manager import SessionManager
 from tool.plugins.database.constants import DB_URL
@@ -45,7 +45,7 @@ except:
 
 def get_graph_list_from_db(url, skeleton):
     data = {"skeleton":skeleton}
-    result_str = call_rest_interface(url, "get_graph_list", data)
+    result_str = SessionManager.get_client().call_rest_interface(url, "get_graph_list", data)
     try:
         result_data = json.loads(result_str)
         print("graphs", result_data)
@@ -58,28 +58,28 @@ def create_new_graph_in_db(url, name, skeleton, graph_data, session=None):
     data = {"name": name, "skeleton": skeleton, "data": graph_data}
     if session is not None:
         data.update(session)
-    result_str = call_rest_interface(url, "upload_graph", data)
+    result_str = SessionManager.get_client().call_rest_interface(url, "upload_graph", data)
 
 
 def replace_graph_in_remote_db(url, graph_id, name, skeleton, graph_data, session=None):
     data = {"id":graph_id,"name": name, "skeleton": skeleton, "data": graph_data}
     if session is not None:
         data.update(session)
-    result_str = call_rest_interface(url, "replace_graph", data)
+    result_str = SessionManager.get_client().call_rest_interface(url, "replace_graph", data)
 
 
 def delete_graph_from_remote_db(url, graph_id, session=None):
     data = {"id": graph_id}
     if session is not None:
         data.update(session)
-    result_str = call_rest_interface(url, "remove_graph", data)
+    result_str = SessionManager.get_client().call_rest_interface(url, "remove_graph", data)
 
 
 def download_graph_from_remote_db(url, graph_id, session=None):
     data = {"id": graph_id}
     if session is not None:
         data.update(session)
-    result_str = call_rest_interface(url, "download_graph", data)
+    result_str = SessionManager.get_client().call_rest_interface(url, "download_graph", data)
     print("recieved", result_str)
     try:
         result_data = json.loads(result_str)
@@ -233,10 +233,22 @@ class Ui_Dialog(object):
         self.clip_tab.setObjectName(u"clip_tab")
         self.gridLayout = QGridLayout(self.clip_tab)
         self.gridLayout.setObjectName(u"gridLayout")
-        self.fileListWidget = QListWidget(self.clip_tab)
-        self.fileListWidget.setObjectName(u"fileListWidget")
+        self.verticalLayout_files = QVBoxLayout()
+        self.verticalLayout_files.setObjectName(u"verticalLayout_files")
+        self.fileFilterLineEdit = QLineEdit(self.clip_tab)
+        self.fileFilterLineEdit.setObjectName(u"fileFilterLineEdit")
 
-        self.gridLayout.addWidget(self.fileListWidget, 0, 0, 1, 1)
+        self.verticalLayout_files.addWidget(self.fileFilterLineEdit)
+
+        self.fileListView = QListView(self.clip_tab)
+        self.fileListView.setObjectName(u"fileListView")
+        self.fileListView.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.fileListView.setUniformItemSizes(True)
+
+        self.verticalLayout_files.addWidget(self.fileListView)
+
+
+        self.gridLayout.addLayout(self.verticalLayout_files, 0, 0, 1, 1)
 
         self.horizontalLayout_34 = QHBoxLayout()
         self.horizontalLayout_34.setObjectName(u"horizontalLayout_34")
@@ -306,7 +318,7 @@ class Ui_Dialog(object):
         self.gridLayout.addLayout(self.horizontalLayout_2, 1, 0, 1, 1)
 
         self.tabWidget.addTab(self.clip_tab, "")
-        self.fileListWidget.raise_()
+        self.fileListView.raise_()
         self.experiment_tab = QWidget()
         self.experiment_tab.setObjectName(u"experiment_tab")
         self.verticalLayout_2 = QVBoxLayout(self.experiment_tab)
@@ -366,6 +378,7 @@ class Ui_Dialog(object):
         Dialog.setWindowTitle(QCoreApplication.translate("Dialog", u"Motion Database Browser", None))
         self.label.setText(QCoreApplication.translate("Dialog", u"URL", None))
         self.statusLabel.setText(QCoreApplication.translate("Dialog", u"Status", None))
+        self.fileFilterLineEdit.setPlaceholderText(QCoreApplication.translate("Dialog", u"Filter by name", None))
         self.label_2.setText(QCoreApplication.translate("Dialog", u"Project", None))
         self.newProjectButton.setText(QCoreApplication.translate("Dialog", u"New", None))
         self.editProjectButton.setText(QCoreApplication.translate("Dialog", u"Edit", None))
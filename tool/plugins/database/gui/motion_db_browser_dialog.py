@@ -28,13 +28,10 @@ import math
 import json
 import bson
 import numpy as np
-import threading
 import asyncio
 from concurrent.futures import ProcessPoolExecutor
 from multiprocessing import cpu_count
-import matplotlib.pyplot as plt
-from PySide2 import QtWidgets
-from PySide2.QtWidgets import QDialog, QListWidgetItem, QFileDialog, QTreeWidgetItem
+from PySide2.QtWidgets import QDialog, QListWidgetItem, QFileDialog
 from PySide2.QtCore import Qt
 from tool.core.dialogs.confirmation_dialog import ConfirmationDialog
 from tool.core.dialogs.new_skeleton_dialog import NewSkeletonDialog
@@ -46,6 +43,9 @@ from .edit_collection_dialog import EditCollectionDialog
 from .motion_modelling_dialog import MotionModellingDialog
 from .graph_table_view_dialog import GraphTableViewDialog
 from .data_transform_dialog import DataTransformDialog
+from .download_progress_dialog import DownloadProgressDialog
+from .collection_tree_view import CollectionTreeView
+from .file_list_model import FileListModel, ListPageSource, BackgroundLoader
 from tool.core.dialogs.skeleton_editor_dialog import SkeletonEditorDialog
 from motion_db_interface import retarget_motion_in_db, start_cluster_job, MGModelDBSession
 from vis_utils.io import load_json_file, save_json_file
@@ -56,14 +56,10 @@ from tool.core.application_manager import ApplicationManager
 from .layout.motion_db_browser_dialog_ui import Ui_Dialog
 from tool.plugins.database.session_manager import SessionManager
 from tool.plugins.database import constants as db_constants
+from tool.plugins.database.db_cache import CachedDBSession, get_db_cache
+from tool.plugins.database.collection_tree import get_collection_tree, invalidate_collection_trees
 from anim_utils.animation_data import SkeletonBuilder
 from motion_db_interface.data_transform_interface import run_data_transform
-try:
-    from morphablegraphs.utilities.db_interface import create_motion_model_in_db, align_motions_in_db, get_standard_config, create_cluster_tree_from_model, load_cluster_tree_from_json
-    from morphablegraphs.utilities import convert_to_mgrd_skeleton
-    from morphablegraphs.motion_model.motion_primitive_wrapper import MotionPrimitiveModelWrapper
-except:
-    pass
 
 if (not os.environ.get('PYTHONHTTPSVERIFY', '') and
 getattr(ssl, '_create_unverified_context', None)):
@@ -175,6 +171,7 @@ def add_plot(ax, timesteps, rewards, lengths, label):
     ax[1].set_ylabel('lengths')
 
 def plot_experiment(runs):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(1,2)
     for label in runs:
         add_plot(ax, runs[label]["t"], runs[label]["r"], runs[label]["l"], label)
@@ -218,9 +215,15 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         self.deleteExperimentButton.clicked.connect(self.slot_delete_experiment)
         self.runDataTransformButton.clicked.connect(self.slot_run_data_transforms)
         self.rootItem = None
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
+        self.file_list_model = FileListModel(parent=self)
+        self.fileListView.setModel(self.file_list_model)
+        self.fileFilterLineEdit.textChanged.connect(self.file_list_model.set_filter)
+        self.experiment_loader = BackgroundLoader(self.fill_experiment_list, self)
         self.db_url = db_constants.DB_URL
         self.session = SessionManager.session
-        self.mdb_session = MGModelDBSession(self.db_url, self.session)
+        self.mdb_session = CachedDBSession(MGModelDBSession(self.db_url, self.session), get_db_cache(),
+                                           self.db_url, SessionManager.get_client())
         print("set session", self.session)
         if self.session is not None and "user" in self.session:
             self.statusLabel.setText("Status: Authenticated as "+self.session["user"])
@@ -235,7 +238,6 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         self.fill_combo_box_with_projects()
         self.fill_combo_box_with_skeletons()
         self.update_collection_tree()
-        self.fileListWidget.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.skeletonListComboBox.currentIndexChanged.connect(self.update_lists)
         self.projectListComboBox.currentIndexChanged.connect(self.update_collection_tree)
         self.tagComboBox.currentIndexChanged.connect(self.update_lists)
@@ -248,6 +250,8 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         self.show()
 
     def closeEvent(self, event):
+        self.file_list_model.shutdown()
+        self.experiment_loader.shutdown()
         parent = self.parent()
         if parent is not None:
             parent.motion_db_browser_dialog = None
@@ -270,18 +274,13 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         if self.project_info is None:
             print("Error: project could not be found", project_id)
             return
-        t = threading.Thread(target=self._update_collection_tree)
-        t.start()
-        
-    def _update_collection_tree(self):
+        # the tree is reloaded when the browser is opened or the project changes, so that the other dialogs see new collections
+        invalidate_collection_trees(self.db_url, self.project_info["collection"])
         self.fill_tree_widget()
-        self._update_lists()
+        self.update_lists()
 
     def update_lists(self):
-        t = threading.Thread(target=self._update_lists)
-        t.start()
-
-    def _update_lists(self):
+        """ the lists are requested in the background and filled in the GUI thread"""
         self._fill_file_list_from_db()
         self._fill_experiment_list_from_db()
 
@@ -306,20 +305,9 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
             self.projectListComboBox.addItem(p_name, p[0])
 
     def fill_tree_widget(self):
-        self.collectionTreeWidget.clear()
         collection = self.project_info["collection"]
-        self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-        self.rootItem.setData(0, Qt.UserRole, collection)
-        collection_tree = self.mdb_session.get_collections_tree(collection)
-        self._fill_tree_widget(collection_tree, self.rootItem)
-        self.rootItem.setExpanded(True)
-
-    def _fill_tree_widget(self, collection_tree, parent_item):
-        for key in collection_tree:
-            col = collection_tree[key]
-            col_item = QTreeWidgetItem(parent_item, [col["name"],col["type"]])
-            col_item.setData(0, Qt.UserRole, key)
-            self._fill_tree_widget(col["sub_tree"], col_item)
+        collection_tree = get_collection_tree(self.db_url, collection, self.mdb_session)
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree)
 
     def fill_combo_box_with_skeletons(self):
         self.skeletonListComboBox.clear()
@@ -347,37 +335,29 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         return int(parent.data(0, Qt.UserRole)),  str(parent.text(0)), str(parent.text(1))
 
     def _fill_file_list_from_db(self, idx=None):
-        self.fileListWidget.clear()
         col = self.get_collection()
         if col is None:
+            self.file_list_model.set_source(None)
             return
         c_id, c_name, c_type = col
-        print("update lists", c_id)
         skeleton = str(self.skeletonListComboBox.currentText())
         tags = [str(self.tagComboBox.currentText())]
-        motion_list = self.mdb_session.get_file_list(c_id, skeleton, tags=tags)
-        if motion_list is None:
-            return
-        print("loaded", len(motion_list), "clips")
-        for m in motion_list:
-            node_id = m[0]
-            name = m[1]
-            data_type = m[2]
-            print(m)
-            item = QListWidgetItem()
-            item.setText(name+"."+data_type)
-            item.setData(Qt.UserRole, node_id)
-            self.fileListWidget.addItem(item)
-        
+        load_func = lambda: self.mdb_session.get_file_list(c_id, skeleton, tags=tags)
+        self.file_list_model.set_source(ListPageSource(load_func))
+
     def _fill_experiment_list_from_db(self, idx=None):
         self.experimentListWidget.clear()
+        self.experiment_loader.reset()
         col = self.get_collection()
         if col is None:
             return
         c_id, c_name, c_type = col
         skeleton = str(self.skeletonListComboBox.currentText())
-        exp_list = self.mdb_session.get_experiment_list(c_id, skeleton)
-        print("experiment list", exp_list)
+        self.experiment_loader.start(self.mdb_session.get_experiment_list, c_id, skeleton)
+
+    def fill_experiment_list(self, exp_list, error):
+        if error is not None:
+            print("Error: could not load experiment list", error)
         if exp_list is None:
             return
         for node_id, name in exp_list:
@@ -386,50 +366,40 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
             item.setData(Qt.UserRole, node_id)
             self.experimentListWidget.addItem(item)
 
+    def get_selected_files(self):
+        """ returns a list of tuples of file id and name of the selected rows"""
+        rows = sorted(index.row() for index in self.fileListView.selectionModel().selectedIndexes())
+        return [self.file_list_model.get_file(row) for row in rows]
 
-    def slot_load_motions(self):
-        items = self.fileListWidget.selectedItems()
-        col = self.get_collection()
-        if col is None:
-            return
-        c_id, c_name, c_type = col
-        n_motions = len(items)
-        count = 1
-        for item in items:
-            motion_id = int(item.data(Qt.UserRole))
-            motion_name = str(item.text())
-            print("download motion", str(count)+"/"+str(n_motions), motion_name)
-            self.load_motion_from_db(motion_id, motion_name, c_id)
+    def get_current_file(self):
+        index = self.fileListView.currentIndex()
+        if not index.isValid():
+            return None
+        return self.file_list_model.get_file(index.row())
 
-            count+=1
+
+    def slot_load_motions(self):
+        self.slot_load_files()
 
     def slot_load_files(self):
+        """ downloads the selected files in the background and adds them to the scene as they arrive"""
         skeleton_name = str(self.skeletonListComboBox.currentText())
         skeleton_data = self.mdb_session.get_skeleton_data(skeleton_name) 
         if skeleton_data is None:
             print("Error: skeleton data is empty")
             return
-        items = self.fileListWidget.selectedItems()
-        for item in items:
-            file_id = int(item.data(Qt.UserRole))
-            name = str(item.text())
+        col = self.get_collection()
+        if col is None:
+            return
+        c_id, c_name, c_type = col
+        items = []
+        for file_id, name in self.get_selected_files():
             data_type = name.split(".")[-1]
-            data_type_info = self.mdb_session.get_data_loader_info(data_type, "vis_utils")
-            print(data_type_info)
-            if data_type_info is not None and "script" in data_type_info:
-                loader_script = data_type_info["script"]
-                loader_script = loader_script.replace("\r\n", "\n")
-                self.scene.object_builder.load_dynamic_module(data_type, loader_script)
-                data = self.mdb_session.download_file(file_id)
-                if data is None:
-                    return
-                self.scene.object_builder.create_object(data_type, name, skeleton_data, data)
-            else:
-                col = self.get_collection()
-                if col is None:
-                    return
-                c_id, c_name, c_type = col
-                self.load_motion_from_db(file_id, skeleton_data, name, c_id)
+            items.append((file_id, name, data_type, c_id))
+        if len(items) == 0:
+            return
+        progress_dialog = DownloadProgressDialog(self.scene, self.mdb_session, skeleton_data, items, parent=self)
+        progress_dialog.show()
 
     def load_motion_from_db(self, motion_id, skeleton_data, motion_name, collection):
         motion_data = self.mdb_session.get_motion_data(motion_id, False)
@@ -445,9 +415,7 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         dialog = ConfirmationDialog()
         dialog.exec_()
         if dialog.success:
-            items = self.fileListWidget.selectedItems()
-            for item in items:
-                selected_id = int(item.data(Qt.UserRole))
+            for selected_id, name in self.get_selected_files():
                 print("delete", selected_id)
                 self.mdb_session.delete_file(selected_id)
             self._fill_file_list_from_db()
@@ -589,6 +557,7 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         """ run alignment
             upload aligned data to db
         """
+        from morphablegraphs.utilities.db_interface import align_motions_in_db
         col = self.get_collection()
         if col is None:
             return
@@ -611,6 +580,7 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         """ run modeling of aligned data
             upload model to db
         """
+        from morphablegraphs.utilities.db_interface import create_motion_model_in_db, get_standard_config
         col = self.get_collection()
         if col is None:
             return
@@ -648,6 +618,7 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         #print("run on modelling on cluster")
 
     def slot_import_file(self):
+        from morphablegraphs.utilities.db_interface import get_standard_config
         filename = QFileDialog.getOpenFileName(self, 'Open File', '.')[0]
         filename = str(filename)
         if os.path.isfile(filename):
@@ -664,9 +635,10 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
 
         
     def slot_export_file(self):
-        item = self.fileListWidget.currentItem()
-        model_id = int(item.data(Qt.UserRole))
-        model_name = str(item.text())
+        current_file = self.get_current_file()
+        if current_file is None:
+            return
+        model_id, model_name = current_file
         model_data = self.mdb_session.download_model(model_id)
         if model_data is not None:
             filename = QFileDialog.getSaveFileName(self, 'Save To File', '.')[0]
@@ -674,8 +646,11 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
                 out_file.write(model_data)
 
     def slot_create_cluster_tree(self):
-        item = self.fileListWidget.currentItem()
-        model_id = int(item.data(Qt.UserRole))
+        from morphablegraphs.utilities.db_interface import create_cluster_tree_from_model
+        current_file = self.get_current_file()
+        if current_file is None:
+            return
+        model_id = current_file[0]
         model_data = self.mdb_session.download_motion_model(model_id)
         tree = create_cluster_tree_from_model(model_data, self.n_samples, self.n_subdivisions_per_level)
         tree_data = dict()
@@ -687,8 +662,10 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         self.mdb_session.upload_cluster_tree(model_id, tree_data)
 
     def slot_export_cluster_tree_json(self):
-        item = self.fileListWidget.currentItem()
-        model_id = int(item.data(Qt.UserRole))
+        current_file = self.get_current_file()
+        if current_file is None:
+            return
+        model_id = current_file[0]
         cluster_tree_data_str = self.mdb_session.download_cluster_tree(model_id)
         if cluster_tree_data_str is not None:
             filename = QFileDialog.getSaveFileName(self, 'Save To File', '.')[0]
@@ -696,8 +673,11 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
                 out_file.write(cluster_tree_data_str)
     
     def slot_export_cluster_tree_pickle(self):
-        item = self.fileListWidget.currentItem()
-        model_id = int(item.data(Qt.UserRole))
+        from morphablegraphs.utilities.db_interface import load_cluster_tree_from_json
+        current_file = self.get_current_file()
+        if current_file is None:
+            return
+        model_id = current_file[0]
         cluster_tree_data = self.mdb_session.download_cluster_tree(model_id)
         if cluster_tree_data is not None:
             cluster_tree = load_cluster_tree_from_json(cluster_tree_data)
@@ -721,14 +701,12 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
             src_scale = dialog.scale_factor
             place_on_ground = dialog.place_on_ground
             if is_aligned==0:
-                items = self.fileListWidget.selectedItems()
+                items = self.get_selected_files()
             else:
-                items = self.fileListWidget.selectedItems()
+                items = self.get_selected_files()
             n_motions = len(items)
             motions = []
-            for item in items:
-                motion_id = int(item.data(Qt.UserRole))
-                motion_name = str(item.text())
+            for motion_id, motion_name in items:
                 motions.append((motion_id, motion_name))
 
             src_skeleton = self.mdb_session.load_skeleton(src_skeleton_name)
@@ -768,13 +746,11 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
             #    job_desc["aws"]  = None
             #    start_cluster_job(self.db_url, self.k8s_imagename, job_name, job_desc, self.k8s_resources, self.session)
             #    print("run on retargeting on cluster")
-            items = self.fileListWidget.selectedItems()
+            items = self.get_selected_files()
             n_motions = len(items)
             
             motions = []
-            for item in items:
-                motion_id = int(item.data(Qt.UserRole))
-                motion_name = str(item.text())
+            for motion_id, motion_name in items:
                 motions.append((motion_id, motion_name))
             src_skeleton = self.mdb_session.load_skeleton(src_skeleton_name)
             target_skeleton = self.mdb_session.load_skeleton(target_skeleton_name)
@@ -799,12 +775,10 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
             collection = dialog.collection
             skeleton_name = str(self.skeletonListComboBox.currentText())
             skeleton = self.mdb_session.load_skeleton(skeleton_name)
-            items = self.fileListWidget.selectedItems()
+            items = self.get_selected_files()
             n_motions = len(items)
             count = 1
-            for item in items:
-                motion_id = int(item.data(Qt.UserRole))
-                motion_name = str(item.text())
+            for motion_id, motion_name in items:
                 motion_name+="_copy"
                 print("copy motion", str(count)+"/"+str(n_motions), motion_name)
                 self.mdb_session.copy_motion_in_db(motion_id, motion_name, collection, skeleton_name)
@@ -820,13 +794,11 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
                 return
             c_id, c_name, c_type = col
             skeleton_name = str(self.skeletonListComboBox.currentText())
-            items = self.fileListWidget.selectedItems()
+            items = self.get_selected_files()
             n_motions = len(items)
             skeleton = self.mdb_session.load_skeleton(skeleton_name)
             count = 1
-            for item in items:
-                motion_id = int(item.data(Qt.UserRole))
-                motion_name = str(item.text())
+            for motion_id, motion_name in items:
                 print("edit motion", str(count)+"/"+str(n_motions), motion_name)
                 self.edit_motion_in_db(skeleton, motion_id, motion_name, c_id, skeleton_name, instructions)
                 count += 1
@@ -854,12 +826,10 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
         filename = str(filename)
         if os.path.isfile(filename):
             temporal_data = load_json_file(filename)
-            items = self.fileListWidget.selectedItems()
+            items = self.get_selected_files()
             n_motions = len(items)
             count = 1
-            for item in items:
-                motion_id = int(item.data(Qt.UserRole))
-                motion_name = str(item.text())
+            for motion_id, motion_name in items:
                 if motion_name in temporal_data:
                     print("set time warping ", str(count)+"/"+str(n_motions), motion_name)
                     time_function = temporal_data[motion_name]
@@ -998,6 +968,8 @@ class MotionDBBrowserDialog(QDialog, Ui_Dialog):
                 self.generate_morphable_graph_directory(skeleton_name, graph_def, directory)
 
     def generate_morphable_graph_directory(self, skeleton_name, grapf_def, out_dir):
+        from morphablegraphs.utilities import convert_to_mgrd_skeleton
+        from morphablegraphs.motion_model.motion_primitive_wrapper import MotionPrimitiveModelWrapper
         skeleton_data = self.mdb_session.get_skeleton_data(skeleton_name)
         skeleton = SkeletonBuilder().load_from_custom_unity_format(skeleton_data)
         mgrd_skeleton = convert_to_mgrd_skeleton(skeleton)
@@ -20,11 +20,12 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
-import threading
-from PySide2.QtWidgets import QDialog, QTreeWidgetItem, QFileDialog
+from PySide2.QtWidgets import QDialog, QFileDialog
 from PySide2.QtCore import Qt
 from tool.core.layout.retarget_db_dialog_ui import Ui_Dialog
-from motion_db_interface import get_collections_by_parent_id_from_remote_db, get_skeletons_from_remote_db
+from tool.plugins.database.collection_tree import get_collection_tree
+from .collection_tree_view import CollectionTreeView
+from motion_db_interface import get_skeletons_from_remote_db
 
 class RetargetDBDialog(QDialog, Ui_Dialog):
     def __init__(self, db_url, parent=None):
@@ -37,8 +38,8 @@ class RetargetDBDialog(QDialog, Ui_Dialog):
         self.scale_factor = 1.0
         self.place_on_ground = False
         self.fill_combo_box_with_skeletons()
-        t = threading.Thread(target=self.fill_tree_widget)
-        t.start()
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
+        self.fill_tree_widget()
         self.src_model = None
         self.target_model = None
         self.collection = None
@@ -64,25 +65,9 @@ class RetargetDBDialog(QDialog, Ui_Dialog):
     def slot_reject(self):
         self.close()#
 
-    def fill_tree_widget(self, parent=None):
-        if parent is None:
-            self.collectionTreeWidget.clear()
-            self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-            self.rootItem.setExpanded(True)
-            # root collection has id 0
-            parent_id = 0
-            parent_item = self.rootItem
-            self.rootItem.setData(0, Qt.UserRole, parent_id)
-        else:
-            parent_id = parent[1]
-            parent_item = parent[0]
-
-        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
-        for col in collection_list:
-            colItem = QTreeWidgetItem(parent_item, [col[1], col[2]])
-            colItem.setData(0, Qt.UserRole, col[0])
-            self.fill_tree_widget((colItem, col[0]))
-
+    def fill_tree_widget(self):
+        collection_tree = get_collection_tree(self.db_url, 0)
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree)
 
     def get_collection(self):
         colItem = self.collectionTreeWidget.currentItem()
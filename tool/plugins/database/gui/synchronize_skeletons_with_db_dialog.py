@@ -22,7 +22,6 @@
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 import os
 import threading
-import glob
 import json
 from PySide2.QtWidgets import  QDialog, QTableWidgetItem, QFileDialog
 from PySide2.QtCore import Qt
@@ -31,7 +30,8 @@ from tool import constants
 from tool.plugins.database import constants as db_constants
 from motion_db_interface import get_skeletons_from_remote_db, get_skeleton_from_remote_db, get_skeleton_model_from_remote_db, replace_skeleton_in_remote_db, create_new_skeleton_in_db
 from tool.plugins.database.session_manager import SessionManager
-from vis_utils.io import load_json_file, save_json_file
+from tool.plugins.database.db_cache import invalidate_skeleton
+from tool.core.dialogs.utils import get_local_skeletons, load_local_skeleton, save_local_skeleton
 
 
 class SynchronizeSkeletonsWithDBDialog(QDialog, Ui_Dialog):
@@ -67,10 +67,7 @@ class SynchronizeSkeletonsWithDBDialog(QDialog, Ui_Dialog):
         self.skeletonLocalTableWidget.clear()
         self.local_skeletons = []
         
-        if not os.path.isdir(self.local_skeleton_dir):
-            return
-        for filename in glob.glob(self.local_skeleton_dir + os.sep + "*.json"):
-            name = filename.split(os.sep)[-1][:-5]
+        for name in get_local_skeletons(self.local_skeleton_dir):
             insertRow = self.skeletonLocalTableWidget.rowCount()
             self.skeletonLocalTableWidget.insertRow(insertRow)
             indexItem = QTableWidgetItem("")
@@ -120,26 +117,23 @@ class SynchronizeSkeletonsWithDBDialog(QDialog, Ui_Dialog):
         for skeleton_name in skeleton_list:
             skeleton = get_skeleton_from_remote_db(self.db_url, skeleton_name, self.session)
             skeleton_model = get_skeleton_model_from_remote_db(self.db_url, skeleton_name, self.session)
-            if not os.path.isdir(self.local_skeleton_dir):
-                os.makedirs(self.local_skeleton_dir)
-            filename = self.local_skeleton_dir +os.sep + skeleton_name + ".json"
             data =dict()
             data["name"] = skeleton_name
             data["skeleton"] = skeleton
             data["model"] = skeleton_model
-            save_json_file(data, filename)
+            save_local_skeleton(self.local_skeleton_dir, skeleton_name, data)
         self.close()
 
     def slot_upload(self):
         skeleton_list = self.get_selected_local_skeletons()
         for skeleton_name in skeleton_list:
-            filename = self.local_skeleton_dir +os.sep + skeleton_name + ".json"
-            data = load_json_file(filename)
+            data = load_local_skeleton(self.local_skeleton_dir, skeleton_name)
             skeleton_name = data["name"]
             skeleton = json.dumps(data["skeleton"])
             skeleton_model = json.dumps(data["model"])
             if skeleton_name in self.db_skeletons:
                 replace_skeleton_in_remote_db(self.db_url, skeleton_name, skeleton, skeleton_model, self.session)
+                invalidate_skeleton(self.db_url, skeleton_name)
             else:
                 create_new_skeleton_in_db(self.db_url, skeleton_name, skeleton, skeleton_model, self.session)
         self.close()    
@@ -20,16 +20,19 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
 import json
-import threading
-from PySide2.QtWidgets import  QDialog, QTreeWidgetItem, QFileDialog
+from PySide2.QtWidgets import  QDialog, QFileDialog
 from PySide2.QtCore import Qt
 from .layout.upload_motion_dialog_ui import Ui_Dialog
 from tool.core.dialogs.enter_name_dialog import EnterNameDialog
 from tool.core.dialogs.new_skeleton_dialog import NewSkeletonDialog
 from tool.core.dialogs.utils import get_animation_controllers, create_section_dict_from_annotation
+from tool.core.animation_directory_explorer import can_load_motion
+from tool.plugins.database.collection_tree import get_collection_tree
+from .collection_tree_view import CollectionTreeView
 from motion_db_interface import upload_motion_to_db, get_skeletons_from_remote_db, \
-                        create_new_skeleton_in_db, get_collections_by_parent_id_from_remote_db,\
+                        create_new_skeleton_in_db,\
                             get_project_list, get_project_info
 from vis_utils.io import load_json_file
 from anim_utils.animation_data.skeleton_models import SKELETON_MODELS
@@ -51,6 +54,7 @@ class UploadMotionDialog(QDialog, Ui_Dialog):
         self.urlLineEdit.setText(self.db_url)
         self.success = False
         self.project_info = None
+        self.collection_tree_view = CollectionTreeView(self.collectionTreeWidget)
         self.fill_combo_box_with_projects()
         self.fill_combo_box_with_skeletons()
         self.update_collection_tree()
@@ -68,24 +72,9 @@ class UploadMotionDialog(QDialog, Ui_Dialog):
             return
         self._fill_tree_widget()
 
-    def _fill_tree_widget(self, parent=None):
-        if parent is None:
-            self.collectionTreeWidget.clear()
-            self.rootItem = QTreeWidgetItem(self.collectionTreeWidget, ["root", "root"])
-            self.rootItem.setExpanded(True)
-            # root collection has id 0
-            parent_id = self.project_info["collection"]
-            parent_item = self.rootItem
-            self.rootItem.setData(0, Qt.UserRole, parent_id)
-        else:
-            parent_id = parent[1]
-            parent_item = parent[0]
-
-        collection_list = get_collections_by_parent_id_from_remote_db(self.db_url, parent_id)
-        for col in collection_list:
-            colItem = QTreeWidgetItem(parent_item, [col[1], col[2]])
-            colItem.setData(0, Qt.UserRole, col[0])
-            self._fill_tree_widget((colItem, col[0]))
+    def _fill_tree_widget(self):
+        collection_tree = get_collection_tree(self.db_url, self.project_info["collection"])
+        self.rootItem = self.collection_tree_view.set_tree(collection_tree)
 
     def get_collection(self):
         colItem = self.collectionTreeWidget.currentItem()
@@ -147,13 +136,15 @@ class UploadMotionDialog(QDialog, Ui_Dialog):
         upload_motion_to_db(self.db_url, name, motion_data, c_id, skeleton_name, meta_info_str, is_processed, session=self.session)
 
     def upload_directory(self, c, c_id, c_name, c_type, skeleton_name, is_processed):
-        for filename in c._animation_files:
+        for filename in c.get_animation_files():
+            if not can_load_motion(filename):
+                continue
             mv = c.load_file(filename)
             motion_data = mv.to_db_format()
             print("upload motion clip ", filename, "to ", c_id, c_name, c_type, skeleton_name)
             is_processed = False
             meta_info_str = ""
-            upload_motion_to_db(self.db_url, filename, motion_data, c_id, skeleton_name, meta_info_str, is_processed, session=self.session)
+            upload_motion_to_db(self.db_url, os.path.basename(filename), motion_data, c_id, skeleton_name, meta_info_str, is_processed, session=self.session)
 
     def slot_reject(self):
         self.close()
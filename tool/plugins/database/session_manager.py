@@ -23,12 +23,17 @@
 
 import os
 from vis_utils.io import save_json_file, load_json_file
+from tool.plugins.database import constants as db_constants
 from tool.plugins.database.constants import DB_URL, SESSION_FILE
+from tool.plugins.database.db_client import DBClient
 from motion_db_interface import authenticate
 
 class SessionManager(object):
+    """ stores the login token and owns the http client that is shared by all database calls """
     session = None
+    client = None
     def __init__(self):
+        SessionManager.get_client()
         if SessionManager.session is None:
             if os.path.isfile(SESSION_FILE):
                 try:
@@ -36,6 +41,14 @@ class SessionManager(object):
                 except:
                     pass
 
+    @classmethod
+    def get_client(cls):
+        if cls.client is None:
+            cls.client = DBClient(db_constants.DB_POOL_SIZE, db_constants.DB_CONNECT_TIMEOUT, db_constants.DB_READ_TIMEOUT,
+                                  db_constants.DB_RETRIES, db_constants.DB_BACKOFF_FACTOR, db_constants.DB_GZIP_REQUESTS)
+            cls.client.install()
+        return cls.client
+
     def login(self, user, password):
         result = authenticate(DB_URL, user, password)
         if "token" in result:
@@ -28,10 +28,13 @@ from vis_utils.animation.skeleton_visualization import SkeletonVisualization
 from vis_utils.scene.components import ComponentBase
 from vis_utils.animation.skeleton_animation_controller import LegacySkeletonAnimationController
 from vis_utils.scene.scene_object_builder import SceneObjectBuilder, SceneObject
-import operator
+from scipy.spatial import cKDTree
 from anim_utils.animation_data import MotionVector
-from anim_utils.animation_data.motion_blending import generate_frame_using_iterative_slerp
-import heapq
+from tool.core.lru_cache import LRUCache
+from tool.core.motion_features import quaternion_slerp_batch
+
+WEIGHT_CACHE_SIZE = 4096
+FRAME_CACHE_SIZE = 256 * 1024 * 1024  # bytes of blended clips kept per blend node
 
 
 def generate_frame_linear(skeleton, motions, frame_idx, weights):
@@ -48,28 +51,66 @@ def generate_frame_linear(skeleton, motions, frame_idx, weights):
     return frame
 
 
-def generate_blend_weights(positions, new_p, n_neighbors):
+def generate_blend_weights(tree, names, new_p, n_neighbors):
     """ Use inverse distance and K-Nearest-Neighbors Interpolation to estimate weights
         according to [Johansen 2009] Section 6.2.4
+        The neighbors are found using a KD-tree over the positions of the motions in names.
     """
-
-    distances = []
-    for n, p in positions.items():
-        distance = np.linalg.norm(new_p - p)
-        heapq.heappush(distances, (distance, n))
-    distances = distances[:n_neighbors]
-    weights = dict()
-    if distances[0][0] <= 0:
-        weights[distances[0][1]] = 1.0
-    else:
-        inv_k_distance = 1.0 / distances[-1][0]
-        inv_distances = [(1.0 / d) - inv_k_distance for d, n in distances]
+    n_neighbors = min(n_neighbors, len(names))
+    distances, indices = tree.query(new_p, k=n_neighbors)
+    distances = np.atleast_1d(distances)
+    indices = np.atleast_1d(indices)
+    weights = collections.OrderedDict()
+    if distances[0] <= 0:
+        weights[names[indices[0]]] = 1.0
+        return weights
+    inv_distances = 1.0 / distances - 1.0 / distances[-1]
+    if np.sum(inv_distances) > 0:
         new_weights = inv_distances / np.sum(inv_distances)
-        for idx, v in enumerate(distances):
-            weights[v[1]] = new_weights[idx]
+    else:
+        # all neighbors have the same distance
+        new_weights = np.ones(len(distances)) / len(distances)
+    for idx, weight in zip(indices, new_weights):
+        weights[names[idx]] = weight
     return weights
 
 
+def get_quaternion_indices(skeleton, n_params):
+    """ returns the parameter indices of the animated joint quaternions as an array of shape (n_joints, 4)"""
+    n_joints = min(len(skeleton.animated_joints), (n_params - 3) // 4)
+    return 3 + np.arange(n_joints * 4).reshape(n_joints, 4)
+
+
+def blend_clips(skeleton, frames, valid, weights):
+    """ blends whole clips using the iterative slerp of generate_frame_using_iterative_slerp for all frames at once
+        frames is a padded array of shape (n_motions, n_frames, n_params) and valid masks the padding.
+        Returns the blended frames and a mask of the frames that have at least one valid motion.
+    """
+    weights = np.asarray(weights, dtype=float)
+    if len(weights) == 0:
+        return np.zeros(frames.shape[1:]), np.zeros(frames.shape[1], dtype=bool)
+    valid = valid & (weights[:, None] > 0)
+    has_motion = np.any(valid, axis=0)
+    first = np.argmax(valid, axis=0)
+    n_frames = frames.shape[1]
+    result = frames[first, np.arange(n_frames)].copy()
+    q_indices = get_quaternion_indices(skeleton, frames.shape[2])
+    w_sum = np.zeros(n_frames)
+    for m in range(len(weights)):
+        w = np.where(valid[m], weights[m], 0.0)
+        new_w_sum = w_sum + w
+        mask = (w > 0) & (w_sum > 0)
+        if np.any(mask):
+            w_b = w[mask] / new_w_sum[mask]
+            frame_b = frames[m, mask]
+            result[mask, :3] = (1.0 - w_b)[:, None] * result[mask, :3] + w_b[:, None] * frame_b[:, :3]
+            q_a = result[mask][:, q_indices]
+            q_b = frame_b[:, q_indices]
+            result[np.ix_(mask, q_indices.ravel())] = quaternion_slerp_batch(q_a, q_b, w_b[:, None]).reshape(len(w_b), -1)
+        w_sum = new_w_sum
+    return result, has_motion
+
+
 class AnimationBlendNode(object):
     def __init__(self):
         self._motions = collections.OrderedDict()
@@ -83,6 +124,28 @@ class AnimationBlendNode(object):
         self.n_blend_space_params = 0
         self.frame_time = 1.0/30.0
         self.parameter_labels = [""]
+        self.weight_cache_resolution = 1e-3  # relative to the parameter range
+        self._init_weight_cache()
+
+    def _init_weight_cache(self):
+        self._tree = None
+        self._tree_names = []
+        self._weight_cache = LRUCache(WEIGHT_CACHE_SIZE)
+        self._frames = None
+        self._valid = None
+        self._frame_cache = LRUCache(FRAME_CACHE_SIZE, lambda v: v[0].nbytes)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["_tree", "_tree_names", "_weight_cache", "_frames", "_valid", "_frame_cache"]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "weight_cache_resolution" not in state:
+            self.weight_cache_resolution = 1e-3
+        self._init_weight_cache()
 
     def set_parameter_labels(self, labels):
         self.parameter_labels = labels
@@ -92,6 +155,10 @@ class AnimationBlendNode(object):
         n_frames = len(frames)
         self._motions[name] = frames
         self._positions[name] = position
+        self._tree = None
+        self._weight_cache.clear()
+        self._frames = None
+        self._frame_cache.clear()
         self.update_parameter_range()
         if n_frames > self.n_frames:
             self.n_frames = n_frames
@@ -113,22 +180,36 @@ class AnimationBlendNode(object):
         p = (self._min_pos + self._max_pos) / 2.0
         self.set_blend_parameter(p, len(self._positions))
 
-    def set_blend_parameter_new(self, new_p, n_neighbors):
-        self._weights = generate_blend_weights(self._positions, new_p, n_neighbors)
+    def get_spatial_index(self):
+        """ returns the KD-tree over the blend positions, it is rebuilt after motions were added"""
+        if self._tree is None:
+            self._tree_names = list(self._positions.keys())
+            positions = np.array(list(self._positions.values()), dtype=float)
+            self._tree = cKDTree(positions.reshape(len(self._tree_names), -1))
+        return self._tree
+
+    def quantize_parameter(self, new_p):
+        """ returns the parameter snapped to a grid relative to the parameter range and the grid cell as key"""
+        step = np.asarray(self._max_pos - self._min_pos, dtype=float) * self.weight_cache_resolution
+        step = np.where(step > 0, step, self.weight_cache_resolution)
+        cell = np.round(np.asarray(new_p, dtype=float) / step).astype(np.int64)
+        return cell * step, tuple(np.atleast_1d(cell).tolist())
+
+    def get_blend_weights(self, new_p, n_neighbors):
+        """ returns the k-nearest-neighbor weights for the parameter using an LRU cache of quantized parameters"""
+        new_p, cell = self.quantize_parameter(new_p)
+        key = (cell, n_neighbors)
+        weights = self._weight_cache.get(key)
+        if weights is None:
+            tree = self.get_spatial_index()
+            weights = generate_blend_weights(tree, self._tree_names, new_p, n_neighbors)
+            self._weight_cache.put(key, weights)
+        return weights
 
     def set_blend_parameter(self, new_p, n_neighbors):
-        distances = {(n, np.linalg.norm(new_p - p)) for n, p in self._positions.items()}
-        sorted_distances = sorted(distances, key=operator.itemgetter(1))
-        sorted_names = [name for name, v in sorted_distances[:n_neighbors]]
-        sorted_values = np.array([v for name, v in sorted_distances[:n_neighbors]])
-        if sorted_values[0] <= 0:
-            self._weights[sorted_names[0]] = 1.0
-        else:
-            inv_k_distance = 1.0 / sorted_values[-1]
-            inv_distances = 1.0 / sorted_values - inv_k_distance
-            new_weights = inv_distances / np.sum(inv_distances)
-            for idx, n in enumerate(sorted_names):
-                self._weights[n] = new_weights[idx]
+        if len(self._positions) == 0:
+            return
+        self._weights = collections.OrderedDict(self.get_blend_weights(new_p, n_neighbors))
 
     def set_blend_parameter_prev2(self, new_p, k):
         """ Use inverse distance to estimate weights according to [Johansen 2009]"""
@@ -159,19 +240,78 @@ class AnimationBlendNode(object):
             weights[name] /= w_sum
         return weights
 
+    def get_motion_array(self):
+        """ returns the motions as one padded array of shape (n_motions, n_frames, n_params) and a validity mask
+            the motion dict entries are replaced by views into the array so the frames are not stored twice
+        """
+        if self._frames is None:
+            names = list(self._motions.keys())
+            n_frames = max(len(self._motions[n]) for n in names)
+            frames = np.zeros((len(names), n_frames, self.n_params))
+            valid = np.zeros((len(names), n_frames), dtype=bool)
+            for idx, name in enumerate(names):
+                n = len(self._motions[name])
+                frames[idx, :n] = self._motions[name]
+                valid[idx, :n] = True
+                self._motions[name] = frames[idx, :n]
+            self._frames = frames
+            self._valid = valid
+        return self._frames, self._valid
+
+    def set_motion_array(self, names, frames, valid, positions):
+        """ replaces the motions by a padded array of shape (n_motions, n_frames, n_params) and a validity mask
+            the array can be memory-mapped because only the motions that are blended are read
+        """
+        self._motions = collections.OrderedDict()
+        self._positions = collections.OrderedDict()
+        for idx, name in enumerate(names):
+            n_frames = int(np.count_nonzero(valid[idx]))
+            self._motions[name] = frames[idx, :n_frames]
+            self._positions[name] = positions[idx]
+        self.n_frames = frames.shape[1]
+        self.n_params = frames.shape[2]
+        self._tree = None
+        self._weight_cache.clear()
+        self._frames = frames
+        self._valid = valid
+        self._frame_cache.clear()
+        self.update_parameter_range()
+
+    def get_weights(self):
+        return self._weights
+
+    def set_weights(self, weights):
+        self._weights = collections.OrderedDict(weights)
+
+    def get_blended_frames(self):
+        """ returns the frames of the whole clip blended with the current weights and a mask of the defined frames
+            the result is cached per set of weights so changing the frame does not blend again
+        """
+        key = tuple(self._weights.items())
+        result = self._frame_cache.get(key)
+        if result is None:
+            frames, valid = self.get_motion_array()
+            motion_indices = {name: idx for idx, name in enumerate(self._motions.keys())}
+            names = [name for name, w in self._weights.items() if name in motion_indices and w > 0]
+            motion_indices = [motion_indices[name] for name in names]
+            weights = [self._weights[name] for name in names]
+            result = blend_clips(self.skeleton, frames[motion_indices], valid[motion_indices], weights)
+            self._frame_cache.put(key, result)
+        return result
+
     def get_frame(self, frame_idx):
-        weights = self.get_valid_weights(frame_idx)
-        if len(weights) == 0:
+        if len(self._weights) == 0 or not 0 <= frame_idx < self.n_frames:
             return
-        return generate_frame_using_iterative_slerp(self.skeleton, self._motions, frame_idx, weights)
+        frames, has_motion = self.get_blended_frames()
+        if not has_motion[frame_idx]:
+            return
+        return np.array(frames[frame_idx])
 
     def to_motion_vector(self):
-        frames = []
-        for idx in range(self.n_frames):
-            frames.append(self.get_frame(idx))
+        frames, has_motion = self.get_blended_frames()
         mv = MotionVector()
-        mv.frames = self.skeleton.add_fixed_joint_parameters_to_motion(frames)
-        mv.n_frames = self.n_frames
+        mv.frames = self.skeleton.add_fixed_joint_parameters_to_motion(frames[has_motion])
+        mv.n_frames = len(mv.frames)
         return mv
 
 
@@ -257,8 +397,8 @@ class BlendAnimationController(LegacySkeletonAnimationController):
         return self.track.parameter_labels
 
     def save_to_file(self, filename):
-        with open(filename, "wb") as out_file:
-            pickle.dump(self.track, out_file)
+        from .blend_node_io import save_blend_node
+        save_blend_node(self.track, filename)
 
     def getFrameTime(self):
         return self.track.frame_time
@@ -312,17 +452,22 @@ def create_blend_controller(self, name, skeleton, motions, joint_name=None, cons
 
 
 def load_blend_controller(self, filename):
-    with open(filename, "rb") as in_file:
-        node = pickle.load(in_file)
-        scene_object = SceneObject()
-        name = filename.split("/")[-1]
-        scene_object.name = name
-        blend_animation_controller = BlendAnimationController(scene_object)
-        blend_animation_controller.set_track(node)
-        blend_animation_controller.set_skeleton(node.skeleton)
-        blend_animation_controller.updateTransformation(0)
-        scene_object.add_component("blend_controller", blend_animation_controller)
-        self._scene.addAnimationController(scene_object, "blend_controller")
+    from .blend_node_io import is_blend_node_file, load_blend_node
+    if is_blend_node_file(filename):
+        node = load_blend_node(filename)
+    else:
+        # files saved before the memory-mapped format
+        with open(filename, "rb") as in_file:
+            node = pickle.load(in_file)
+    scene_object = SceneObject()
+    name = filename.split("/")[-1]
+    scene_object.name = name
+    blend_animation_controller = BlendAnimationController(scene_object)
+    blend_animation_controller.set_track(node)
+    blend_animation_controller.set_skeleton(node.skeleton)
+    blend_animation_controller.updateTransformation(0)
+    scene_object.add_component("blend_controller", blend_animation_controller)
+    self._scene.addAnimationController(scene_object, "blend_controller")
 
     
 
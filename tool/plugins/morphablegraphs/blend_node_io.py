@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Compact on-disk format for blend nodes using the container of motion_graph_io.
+The header contains the skeleton, the parameter labels and the motion names and positions.
+The motion frames are stored as one padded array with a validity mask that is memory-mapped on loading,
+so only the frames of the motions that are blended are read from the file.
+"""
+import collections
+import numpy as np
+from anim_utils.animation_data import SkeletonBuilder
+from .motion_graph_io import write_container, read_header, map_arrays, has_magic
+from .blend_animation_controller import AnimationBlendNode
+
+MAGIC = b"BLENDNODE\0\0\0"
+
+
+def save_blend_node(node, filename):
+    frames, valid = node.get_motion_array()
+    arrays = collections.OrderedDict()
+    arrays["frames"] = frames
+    arrays["valid"] = valid
+    header = dict()
+    header["skeleton"] = node.skeleton.to_json()
+    header["frame_time"] = node.frame_time
+    header["parameter_labels"] = list(node.parameter_labels)
+    header["names"] = list(node.get_motions().keys())
+    header["positions"] = [np.asarray(p, dtype=float).tolist() for p in node.get_blend_positions().values()]
+    header["weights"] = [[name, float(w)] for name, w in node.get_weights().items()]
+    write_container(filename, MAGIC, header, arrays)
+
+
+def is_blend_node_file(filename):
+    return has_magic(filename, MAGIC)
+
+
+def load_blend_node(filename):
+    """ maps the motion frames of a blend node file into memory, the frames are only read when they are blended"""
+    header = read_header(filename, MAGIC)
+    arrays = map_arrays(filename, header)
+    node = AnimationBlendNode()
+    node.skeleton = SkeletonBuilder().load_from_json_data(header["skeleton"])
+    node.frame_time = header["frame_time"]
+    node.set_parameter_labels(header["parameter_labels"])
+    positions = [np.array(p) for p in header["positions"]]
+    node.set_motion_array(header["names"], arrays["frames"], np.array(arrays["valid"]), positions)
+    node.set_weights(header["weights"])
+    return node
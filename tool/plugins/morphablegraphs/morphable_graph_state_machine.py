@@ -31,7 +31,6 @@ from vis_utils.animation.state_machine_controller import StateMachineController
 from vis_utils.scene.scene_object_builder import SceneObjectBuilder, SceneObject
 from anim_utils.animation_data.motion_concatenation import align_joint
 from anim_utils.motion_editing import MotionGrounding
-from anim_utils.animation_data.bvh import BVHReader
 from anim_utils.animation_data.motion_vector import MotionVector
 from anim_utils.retargeting.analytical import Retargeting, generate_joint_map
 from anim_utils.utilities.log import set_log_mode, LOG_MODE_DEBUG
@@ -45,6 +44,7 @@ from morphablegraphs.constraints.constraint_builder import UnityFrameConstraint
 from morphablegraphs.motion_generator.mg_state_queue import StateQueueEntry
 from .simple_navigation_agent import SimpleNavigationAgent
 from vis_utils.scene.utils import get_random_color
+from tool.core.motion_cache import load_bvh_file
 from morphablegraphs.motion_model.motion_state_graph_loader import MotionStateGraphLoader
 
 def rotate_vector_deg(vec, a):
@@ -69,7 +69,7 @@ def load_clips(data_path):
     for filepath in glob.glob(data_path+os.sep+"*.bvh"):
         print("load", filepath)
         name = filepath.split(os.sep)[-1][:-4]
-        bvh = BVHReader(filepath)
+        bvh = load_bvh_file(filepath)
         mv = MotionVector()
         mv.from_bvh_reader(bvh, True)
         state = MotionState(mv)
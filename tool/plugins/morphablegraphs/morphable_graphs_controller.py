@@ -37,6 +37,8 @@ from morphablegraphs.motion_generator.graph_walk import GraphWalk
 from morphablegraphs import MotionGenerator, GraphWalkOptimizer, DEFAULT_ALGORITHM_CONFIG, AnnotatedMotionVector
 from morphablegraphs import constraints as mg_constraints
 from morphablegraphs import motion_generator
+from .motion_graph_controller import MotionGraphController
+from .motion_graph_io import load_motion_graph
 
 SERVICE_CONFIG = {
     "model_data": "E:\\projects\\INTERACT\\repository\\data\\3 - Motion primitives\\motion_primitives_quaternion_PCA95 m32-integration-1.5.1",
@@ -292,7 +294,7 @@ def load_morphable_graphs_file(builder, filename):
     return scene_object
 
 
-def load_motion_graph_controller(self, name, skeleton, motion_graph, frame_time):
+def create_motion_graph_controller(builder, name, skeleton, motion_graph, frame_time):
     scene_object = SceneObject()
     motion_graph_controller = MotionGraphController(scene_object, color=get_random_color(), mg=motion_graph)
     motion_graph_controller.name = name
@@ -301,9 +303,16 @@ def load_motion_graph_controller(self, name, skeleton, motion_graph, frame_time)
     motion_graph_controller.init_visualization()
     scene_object.name = motion_graph_controller.name
     scene_object.add_component("motion_graph_controller", motion_graph_controller)
-    self.addAnimationController(scene_object, "motion_graph_controller")
+    builder._scene.addAnimationController(scene_object, "motion_graph_controller")
     return scene_object
 
+
+def load_motion_graph_controller(builder, filename):
+    motion_graph = load_motion_graph(filename)
+    name = filename.split("/")[-1]
+    return create_motion_graph_controller(builder, name, motion_graph.skeleton, motion_graph,
+                                          motion_graph.skeleton.frame_time)
+
 def attach_mg_generator_from_db(builder, scene_object, db_url, skeleton_name, graph_id, use_all_joints=False, config=DEFAULT_CONFIG):
     color=get_random_color()
     loader = MotionStateGraphLoader()
@@ -332,6 +341,7 @@ def load_morphable_graphs_generator_from_db(builder, db_path, skeleton_name, gra
     return scene_object
 
 SceneObjectBuilder.register_file_handler("motion_graph", load_motion_graph_controller)
+SceneObjectBuilder.register_object("motion_graph_controller", create_motion_graph_controller)
 
 SceneObjectBuilder.register_object("mg_generator_from_db", load_morphable_graphs_generator_from_db)
 SceneObjectBuilder.register_component("morphablegraph_generator_from_db", attach_mg_generator_from_db)
@@ -341,7 +351,8 @@ try:
     from functools import partial
     from tool.core.editor_window import EditorWindow, open_file_dialog
 
-    mg_menu_actions = [{"text": "Load Morphable Graph", "function": partial(open_file_dialog, "zip")}]
+    mg_menu_actions = [{"text": "Load Morphable Graph", "function": partial(open_file_dialog, "zip")},
+                       {"text": "Load Motion Graph", "function": partial(open_file_dialog, "motion_graph")}]
     EditorWindow.add_actions_to_menu("File", mg_menu_actions)
 except:
     pass        
@@ -26,15 +26,20 @@ This file implements the similarity motion graphs
 Author: Xi Li
 """
 
-import random
+import math
+import collections.abc
 import numpy as np
-from transformations import quaternion_multiply, quaternion_inverse, quaternion_from_euler, quaternion_matrix
+from transformations import quaternion_multiply, quaternion_inverse, quaternion_from_euler
 from anim_utils.animation_data.motion_vector import MotionVector
 from anim_utils.animation_data.motion_distance import convert_quat_frame_to_point_cloud
 from anim_utils.utils import calculate_point_cloud_distance
 from tarjan import tarjan
+from tool.core.motion_features import MotionFeatures, quaternion_multiply_batch, compute_frame_differences, \
+    get_global_positions, get_foot_joints
+from .motion_graph_edges import get_joint_quaternions, create_edges, extend_edges, DEFAULT_BLOCK_SIZE
 
 DEBUG = 1
+LOCAL_MINIMUM_WINDOW = 10  # transitions jumping back less than this number of frames are avoided
 
 
 def get_quat_from_two_vectors(u, v):
@@ -46,6 +51,42 @@ def get_quat_from_two_vectors(u, v):
     return q
 
 
+def rotate_vector_batch(quats, vec):
+    """ rotates vec by each quaternion in quats, vectorized version of quat_rotate_vector"""
+    quats = quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+    w = quats[..., :1]
+    u = quats[..., 1:]
+    vec = np.asarray(vec, dtype=float)
+    uv = np.cross(u, vec)
+    return vec + 2.0 * w * uv + 2.0 * np.cross(u, uv)
+
+
+def get_transition_probabilities(offsets, targets):
+    """ Returns the probability of each edge in CSR form. The transitions are sampled uniformly but a target
+        less than LOCAL_MINIMUM_WINDOW frames before the source is redrawn once to prevent local minima.
+    """
+    counts = np.diff(offsets)
+    sources = np.repeat(np.arange(len(counts)), counts)
+    backward = targets - sources
+    is_local = (backward < 0) & (backward > -LOCAL_MINIMUM_WINDOW)
+    n_local = np.bincount(sources[is_local], minlength=len(counts))[sources].astype(float)
+    length = counts[sources].astype(float)
+    redraw_probability = n_local / (length * length)
+    return np.where(is_local, redraw_probability, 1.0 / length + redraw_probability)
+
+
+def get_row_cdf(offsets, weights):
+    """ returns the cumulative distribution of the weights within each CSR row"""
+    if len(weights) == 0:
+        return np.zeros(0)
+    counts = np.diff(offsets)
+    cumsum = np.cumsum(weights)
+    row_start = np.concatenate([[0.0], cumsum])[offsets[:-1]]
+    row_end = np.concatenate([[0.0], cumsum])[offsets[1:]]
+    cdf = cumsum - np.repeat(row_start, counts)
+    return cdf / np.repeat(row_end - row_start, counts)
+
+
 class MGNode(object):
     """node class for motion similarity graph"""
     def __init__(self, pose, velocity, bvh_id, contact, weights = None):
@@ -55,29 +96,140 @@ class MGNode(object):
         self.contact = contact
 
 
+class MGNodeArrays(collections.abc.Mapping):
+    """read-only mapping from node id to MGNode backed by one array per node attribute"""
+    def __init__(self, poses, velocities, clip_ids, contacts):
+        self.poses = poses
+        self.velocities = velocities
+        self.clip_ids = clip_ids
+        self.contacts = contacts
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        if isinstance(nodes, MGNodeArrays):
+            return nodes
+        nodes = [nodes[i] for i in sorted(nodes)]
+        poses = np.array([n.pose for n in nodes], dtype=float)
+        velocities = np.array([n.velocity for n in nodes], dtype=float)
+        clip_ids = np.array([n.frame_id for n in nodes], dtype=np.int32)
+        contacts = np.array([n.contact for n in nodes], dtype=float)
+        return cls(poses, velocities, clip_ids, contacts)
+
+    def concatenate(self, nodes):
+        nodes = MGNodeArrays.from_nodes(nodes)
+        return MGNodeArrays(np.concatenate([self.poses, nodes.poses]),
+                            np.concatenate([self.velocities, nodes.velocities]),
+                            np.concatenate([self.clip_ids, nodes.clip_ids]),
+                            np.concatenate([self.contacts, nodes.contacts]))
+
+    def __getitem__(self, node_id):
+        if not 0 <= node_id < len(self.poses):
+            raise KeyError(node_id)
+        return MGNode(self.poses[node_id], self.velocities[node_id], self.clip_ids[node_id], self.contacts[node_id])
+
+    def __iter__(self):
+        return iter(range(len(self.poses)))
+
+    def __len__(self):
+        return len(self.poses)
+
+
+class MGEdgeArrays(collections.abc.Mapping):
+    """read-only mapping from node id to the array of target node ids stored in CSR form
+       offsets has n_nodes + 1 entries, nodes that are not sources of the graph are marked in the mask
+    """
+    def __init__(self, offsets, targets, source_mask):
+        self.offsets = offsets
+        self.targets = targets
+        self.source_mask = source_mask
+
+    @classmethod
+    def from_edges(cls, edges, n_nodes):
+        if isinstance(edges, MGEdgeArrays):
+            return edges
+        source_mask = np.zeros(n_nodes, dtype=bool)
+        counts = np.zeros(n_nodes, dtype=np.int64)
+        for i, targets in edges.items():
+            source_mask[i] = True
+            counts[i] = len(targets)
+        offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        targets = np.zeros(offsets[-1], dtype=np.int32)
+        for i, t in edges.items():
+            targets[offsets[i]:offsets[i + 1]] = t
+        return cls(offsets, targets, source_mask)
+
+    def to_dict(self):
+        return {i: self[i].tolist() for i in self}
+
+    def __getitem__(self, node_id):
+        if not 0 <= node_id < len(self.source_mask) or not self.source_mask[node_id]:
+            raise KeyError(node_id)
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def __iter__(self):
+        return iter(np.flatnonzero(self.source_mask).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.source_mask))
+
+
 class MotionGraphBuilder(object):
     def __init__(self):
         self.measure_method = "motion_field"  # measure method for edges, option: motion_field, TODO
         self.distance_threshold = 0.05
         self.default_pos = [0.0, 100.0, 0.0]
+        self.block_size = DEFAULT_BLOCK_SIZE  # number of rows compared at once during the edge construction
+        self.use_spatial_index = True  # filter candidate pairs using a KD-tree before the exact comparison
+        self.n_workers = 1  # number of processes for the edge construction, None uses all cores
+        self.progress_callback = None  # called with the number of processed nodes and the total number of nodes
+        self.default_quat = None
+        self.foot_joints = None  # left and right foot joint used for the contact state, taken from the skeleton model by default
 
     def build(self, skeleton, motion_vectors):
         """create MG by motion vectors"""
         nodes = self.create_nodes_by_motion_vectors(skeleton, motion_vectors)
         edges = self.create_edges_by_nodes(skeleton, nodes)
+        return self.create_graph(skeleton, nodes, edges)
+
+    def extend(self, graph, motion_vectors):
+        """add motion vectors to an existing MG, only the edges involving the new nodes are computed"""
+        nodes = MGNodeArrays.from_nodes(graph.nodes)
+        n_prev_nodes = len(nodes)
+        n_clips = int(np.max(nodes.clip_ids)) + 1 if n_prev_nodes > 0 else 0
+        new_nodes = self.create_nodes_by_motion_vectors(graph.skeleton, motion_vectors, graph.default_quat, n_clips)
+        nodes = nodes.concatenate(new_nodes)
+        edges = MGEdgeArrays.from_edges(graph.raw_edges, n_prev_nodes).to_dict()
+        distance_threshold = graph.distance_threshold
+        if distance_threshold is None:
+            distance_threshold = self.distance_threshold
+        quats = get_joint_quaternions(graph.skeleton, nodes.poses)
+        edges = extend_edges(edges, n_prev_nodes, quats, nodes.velocities, nodes.contacts, nodes.clip_ids,
+                             distance_threshold, self.block_size, self.use_spatial_index,
+                             self.n_workers, self.progress_callback)
+        return self.create_graph(graph.skeleton, nodes, edges, graph.default_quat, distance_threshold)
+
+    def create_graph(self, skeleton, nodes, edges, default_quat=None, distance_threshold=None):
         if DEBUG:
-            print('original edges: ', edges)
+            print('original edges: ', len(edges))
         # implment strongest components by tarjan's algorithm
         strong_components = self.find_strongly_connected_components(edges)
         del strong_components[0]  # TODO: check if there is a bug in tc
         if DEBUG:
-            print('find scc: ', strong_components)
-        # prune edge so that only strong components preserved
-        edges = self.prune_edges(edges, strong_components)
+            print('find scc: ', len(strong_components))
+        # prune edge so that only strong components preserved, the original edges are kept for extending the graph
+        raw_edges = edges
+        edges = self.prune_edges(dict(edges), strong_components)
         if DEBUG:
-            print('pruned edges: ', edges)
-
-        return MotionGraph(skeleton, nodes, edges, strong_components)
+            print('pruned edges: ', len(edges))
+        if default_quat is None:
+            default_quat = self.default_quat
+        if distance_threshold is None:
+            distance_threshold = self.distance_threshold
+        graph = MotionGraph(skeleton, nodes, edges, strong_components, raw_edges)
+        graph.default_quat = default_quat
+        graph.distance_threshold = distance_threshold
+        return graph
 
     def transform_motion_to_point_cloud(self, skeleton, node, joints=None):
         return convert_quat_frame_to_point_cloud(skeleton, node)  # adapted from morphaple graph module
@@ -100,46 +252,56 @@ class MotionGraphBuilder(object):
 
     def compute_LR_foot_velocity(self, skeleton, pose, prev_node):
         """compute the left and right foot velocity, used for contact estimate"""
-        LeftIdx = 'Bip01_L_Toe0'
-        RightIdx = 'Bip01_R_Toe0'
-
-        leftFoot = skeleton.nodes[LeftIdx].get_global_position(pose)
-        leftFootPrev = skeleton.nodes[LeftIdx].get_global_position(prev_node)
-
-        rightFoot = skeleton.nodes[RightIdx].get_global_position(pose)
-        rightFootPrev = skeleton.nodes[RightIdx].get_global_position(prev_node)
-
-        axis = 1  # TODO: is this y axis?
-        leftVel = (leftFoot[axis] - leftFootPrev[axis] ) / skeleton.frame_time
-        rightVel = (rightFoot[axis] - rightFootPrev[axis] ) / skeleton.frame_time
-
-        return leftVel, rightVel, leftFoot[axis], rightFoot[axis]
-
-    def create_nodes_by_motion_vectors(self, skeleton, motion_vectors):
-        nodes = dict()
+        features = MotionFeatures(skeleton, [prev_node, pose], self.foot_joints)
+        foot_velocities = features.get_vertical_foot_velocities()[1]
+        foot_heights = features.foot_heights[1]
+        return foot_velocities[0], foot_velocities[1], foot_heights[0], foot_heights[1]
+
+    def create_nodes_by_motion_vectors(self, skeleton, motion_vectors, default_quat=None, start_bvh_id=0):
+        """ creates a node for each frame except the first frame of each motion vector
+            the features of each motion vector are computed for all frames at once
+            the velocity of node i is computed like in the original loop, which aligned the frames in place and
+            used frames[i - 2] as previous frame, so that the node features and edge costs stay the same:
+            for i = 1 it is the last frame and for i >= 3 it was already moved to the default root
+        """
+        if not any(len(mv.frames) >= 2 for mv in motion_vectors):
+            raise ValueError("Motion graph needs at least one motion with 2 frames")
         # set default root pos and orientation
-        default_pos = self.default_pos
-        default_quat = motion_vectors[0].frames[0][3:7]
-        bvh_id = 0
-        frame_id = 0
-        for mv in motion_vectors:
-            for idx, frame in enumerate(mv.frames[1:]):
-                node = frame
-                prev_node = mv.frames[idx -1]  # used for velocity
-                node_velocity = self.compute_velocity(skeleton, node, prev_node)
-                [leftVel, rightVel, leftFoot, rightFoot] = self.compute_LR_foot_velocity(skeleton, node, prev_node)
-                root_pos = node[:3] - prev_node[:3]
-                root_quat = quaternion_multiply(quaternion_inverse(prev_node[3:7]), node[3:7])
-                root_transform = quaternion_matrix(root_quat)
-                root_transform[:3,3] = root_pos
-
-                # align the pos and quat of all frames to default
-                node[:3] = default_pos
-                node[3:7] = default_quat
-                nodes[frame_id] = MGNode(node, node_velocity, bvh_id, [leftVel, rightVel, leftFoot, rightFoot])
-                frame_id += 1
-            bvh_id += 1
-        return nodes
+        if default_quat is None:
+            default_quat = np.array(motion_vectors[0].frames[0][3:7])
+        self.default_quat = default_quat
+        poses = []
+        velocities = []
+        clip_ids = []
+        contacts = []
+        foot_joints = self.foot_joints
+        if foot_joints is None:
+            foot_joints = get_foot_joints(skeleton)
+        for bvh_id, mv in enumerate(motion_vectors, start_bvh_id):
+            frames = np.array(mv.frames, dtype=float)
+            n_frames = len(frames)
+            if n_frames < 2:
+                continue
+            node_indices = np.arange(1, n_frames)
+            prev_indices = (node_indices - 2) % n_frames
+            prev_frames = frames[prev_indices]
+            is_aligned = (prev_indices >= 1) & (prev_indices < node_indices)
+            prev_frames[is_aligned, :3] = self.default_pos
+            prev_frames[is_aligned, 3:7] = default_quat
+            velocities.append(compute_frame_differences(skeleton, frames[1:], prev_frames))
+            # one forward kinematics pass for the nodes and their previous frames
+            foot_positions = get_global_positions(skeleton, np.concatenate([frames[1:], prev_frames]), foot_joints)
+            foot_heights = foot_positions[:n_frames - 1, :, 1]
+            foot_velocities = (foot_heights - foot_positions[n_frames - 1:, :, 1]) / skeleton.frame_time
+            contacts.append(np.column_stack([foot_velocities[:, :2], foot_heights[:, :2]]))
+            # align the pos and quat of all frames to default
+            frames = frames[1:]
+            frames[:, :3] = self.default_pos
+            frames[:, 3:7] = default_quat
+            poses.append(frames)
+            clip_ids.append(np.full(len(frames), bvh_id, dtype=np.int32))
+        return MGNodeArrays(np.concatenate(poses), np.concatenate(velocities),
+                            np.concatenate(clip_ids), np.concatenate(contacts))
 
     def get_contact_state(self, contact_info):
         # intermediate phase
@@ -212,30 +374,14 @@ class MotionGraphBuilder(object):
         return distance
 
     def create_edges_by_nodes(self, skeleton, nodes):
-        """create edges for each node, edge value is the similarity between nodes"""
-        edges = dict()
-        num_nodes = len(nodes) - 1
-        for i in range(num_nodes):
-            print('find edge for ', i, ' of ', num_nodes, ' nodes')
-            if nodes[i].frame_id == nodes[i + 1].frame_id:
-                edges[i] = [i + 1]
-            else:
-                edges[i] = []
-            for j in range(num_nodes):
-                if i == j or i + 1 == j:  # skip itself and its next
-                    continue
-                node1 = nodes[i]
-                node2 = nodes[j]
-                # we first estimate if the contact state of two nodes are same
-                contact_state = self.estimate_contact_state(node1, node2)
-                if contact_state:  # same contact state
-                    # then measure the similarity distance, smaller -> similar
-                    similarity = self.get_pose_similarity(skeleton, node1, node2)
-                    # if DEBUG:
-                    #    print "frame ", i, " frame ", j, " distance: ", similarity_distance
-                    if similarity < self.distance_threshold:
-                        edges[i].append(j)
-        return edges
+        """create edges for each node, edge value is the similarity between nodes
+           the comparison is vectorized in motion_graph_edges and is equivalent to
+           calling estimate_contact_state and get_pose_similarity for each pair of nodes
+        """
+        nodes = MGNodeArrays.from_nodes(nodes)
+        quats = get_joint_quaternions(skeleton, nodes.poses)
+        return create_edges(quats, nodes.velocities, nodes.contacts, nodes.clip_ids, self.distance_threshold,
+                            self.block_size, self.use_spatial_index, self.n_workers, self.progress_callback)
 
     def find_strongly_connected_components(self, edges):
         # This function implements Tarjan's find strongly connected components
@@ -254,6 +400,7 @@ class MotionGraphBuilder(object):
 
     def prune_edges(self, edges, node_filter):
         """prune the edge to preserve the strong components' node"""
+        node_filter = set(node_filter)
         for i in list(edges):
             if i not in node_filter:
                 # remove edges from this node
@@ -269,12 +416,60 @@ class MotionGraphBuilder(object):
         return edges
 
 
+TRANSITION_TABLE_NAMES = ["transition_weights", "transition_cdf", "root_velocity_norms", "root_rotations"]
+
+
 class MotionGraph(object):
-    def __init__(self, skeleton, nodes, edges, strong_components):
+    def __init__(self, skeleton, nodes, edges, strong_components, raw_edges=None, transition_tables=None):
         self.skeleton = skeleton
-        self.nodes = nodes
-        self.edges = edges
-        self.strong_components = strong_components
+        self.nodes = MGNodeArrays.from_nodes(nodes)
+        n_nodes = len(self.nodes)
+        self.edges = MGEdgeArrays.from_edges(edges, n_nodes)
+        self.strong_components = np.asarray(strong_components, dtype=np.int32)
+        if raw_edges is None:
+            raw_edges = self.edges
+        self.raw_edges = MGEdgeArrays.from_edges(raw_edges, n_nodes)  # edges before pruning used to extend the graph
+        self.default_quat = None
+        self.distance_threshold = None
+        self.update_transition_tables(transition_tables)
+
+    def update_transition_tables(self, transition_tables=None):
+        """ sets the transition probabilities of each node in CSR form and the root motion of each node
+            the tables are computed on first use unless they are given, e.g. as memory-mapped arrays of a graph file
+        """
+        self.transition_offsets = np.asarray(self.edges.offsets)
+        self.transition_targets = np.asarray(self.edges.targets)
+        self._transition_tables = transition_tables
+
+    def get_transition_tables(self):
+        if self._transition_tables is None:
+            tables = dict()
+            tables["transition_weights"] = get_transition_probabilities(self.transition_offsets, self.transition_targets)
+            tables["transition_cdf"] = get_row_cdf(self.transition_offsets, tables["transition_weights"])
+            tables["root_velocity_norms"] = np.linalg.norm(self.nodes.velocities[:, :3], axis=1)
+            tables["root_rotations"] = quaternion_multiply_batch(self.nodes.poses[:, 3:7], self.nodes.velocities[:, 3:7])
+            self._transition_tables = tables
+        return self._transition_tables
+
+    @property
+    def transition_weights(self):
+        return self.get_transition_tables()["transition_weights"]
+
+    @property
+    def transition_cdf(self):
+        return self.get_transition_tables()["transition_cdf"]
+
+    @property
+    def root_velocity_norms(self):
+        return self.get_transition_tables()["root_velocity_norms"]
+
+    @property
+    def root_rotations(self):
+        return self.get_transition_tables()["root_rotations"]
+
+    def save_to_file(self, filename):
+        from .motion_graph_io import save_motion_graph
+        save_motion_graph(self, filename)
 
     def get_pose_by_trajectory(self, node, last_pose, trj_type, trj_value, direction, orientation):
         pose = np.copy(node.pose)
@@ -287,19 +482,66 @@ class MotionGraph(object):
             pose[3:7] = quaternion_multiply(pose[3:7], quaternion_from_euler(orientation, 0, 0))
         return pose
 
-    def sample_next_node_id(self, node_id):
-        # here, we find the node based on lowest transition value
-        if len(self.edges[node_id]) <= 0:
+    def sample_next_node_id(self, node_id, u=None):
+        """ samples a transition using the precomputed transition table, returns -1 at a dead end
+            u is an optional uniform random number in [0, 1)
+        """
+        start = self.transition_offsets[node_id]
+        end = self.transition_offsets[node_id + 1]
+        if end <= start:
             return -1
-        length = len(self.edges[node_id])
-        random_index = random.randrange(0, length, 1)
-        #random_index = random.randrange(0, 3, 1) #greedy chose from three largest
-
-        # prevent local minimum
-        if node_id - self.edges[node_id][random_index] > 0 and node_id - self.edges[node_id][random_index] < 10:
-            return self.edges[node_id][random.randrange(0, length, 1)]
-
-        return self.edges[node_id][random_index]  #0 cause sliding
+        if u is None:
+            u = np.random.random_sample()
+        idx = start + np.searchsorted(self.transition_cdf[start:end], u, side="right")
+        return int(self.transition_targets[min(idx, end - 1)])
+
+    def sample_random_walk(self, start_node_id, n_steps):
+        """ returns the ids of up to n_steps nodes following start_node_id, the walk stops at a dead end"""
+        node_ids = np.zeros(n_steps, dtype=np.int64)
+        random_numbers = np.random.random_sample(n_steps)
+        node_id = start_node_id
+        for idx in range(n_steps):
+            node_id = self.sample_next_node_id(node_id, random_numbers[idx])
+            if node_id < 0:
+                return node_ids[:idx]
+            node_ids[idx] = node_id
+        return node_ids
+
+    def get_walk_poses(self, node_ids, root_pos, direction, angle=0.0):
+        """ creates the poses of a walk along the node ids starting at root_pos
+            the root moves along direction or along the node orientation rotated by angle around the up axis
+            Returns:
+                poses (np.array): n_frames x n_params
+                direction (np.array): walking direction of the last frame
+        """
+        poses = np.array(self.nodes.poses[node_ids], dtype=float)
+        speeds = self.root_velocity_norms[node_ids]
+        if math.isclose(angle, 0.0):
+            directions = np.tile(np.asarray(direction, dtype=float), (len(node_ids), 1))
+        else:
+            quats = quaternion_multiply_batch(self.root_rotations[node_ids], quaternion_from_euler(angle, 0, 0))
+            poses[:, 3:7] = quats
+            directions = rotate_vector_batch(quats, [0, 0, 1])
+            directions[:, 1] = 0  # prevent error accumulation in y axis
+        poses[:, :3] = np.asarray(root_pos, dtype=float) + np.cumsum(speeds[:, None] * directions, axis=0)
+        if len(directions) > 0:
+            direction = directions[-1]
+        return poses, direction
+
+    def generate_random_walk(self, n_frames, start_node_id=None, angle=0.0):
+        """ generates a motion vector with a random walk of up to n_frames in one batch"""
+        if start_node_id is None:
+            start_node_id = int(np.min(self.strong_components))
+        start_pose = self.nodes.poses[start_node_id]
+        direction = rotate_vector_batch(start_pose[3:7], [0, 0, 1])
+        direction[1] = 0
+        node_ids = self.sample_random_walk(start_node_id, n_frames)
+        poses, direction = self.get_walk_poses(node_ids, start_pose[:3], direction, angle)
+        out_mv = MotionVector()
+        out_mv.frames = poses
+        out_mv.n_frames = len(poses)
+        out_mv.frame_time = self.skeleton.frame_time
+        return out_mv
 
     def get_pose_by_node_id(self, id):
         return self.nodes[id]
@@ -22,7 +22,7 @@
 # USE OR OTHER DEALINGS IN THE SOFTWARE.
 import numpy as np
 from PySignal import Signal
-from transformations import quaternion_multiply, quaternion_from_euler, quaternion_conjugate
+from transformations import quaternion_multiply, quaternion_conjugate
 from vis_utils.animation.animation_controller import AnimationController
 from vis_utils.animation.skeleton_visualization import SkeletonVisualization
 from vis_utils.scene.components import ComponentBase
@@ -52,7 +52,8 @@ class MotionGraphController(ComponentBase, AnimationController):
         self._visualization = SkeletonVisualization(self.scene_object, color)
         self.name = ""
         strong_components = self._motion_graph.strong_components
-        self.current_node_id = min(strong_components)
+        self.start_node_id = min(strong_components)
+        self.current_node_id = self.start_node_id
         self.current_direction = []
         self.current_root_pos = []
         self.current_root_quat = []
@@ -91,26 +92,24 @@ class MotionGraphController(ComponentBase, AnimationController):
             self.animationSpeed = 1
         #for i in range(self.animationSpeed):
 
-        self.current_node_id = self._motion_graph.sample_next_node_id(self.current_node_id)
+        next_node_id = self._motion_graph.sample_next_node_id(self.current_node_id)
+        if next_node_id < 0:
+            # dead end, the walk is restarted from the start node at the current root position
+            print("Warning: node", self.current_node_id, "has no transition, restart walk at", self.start_node_id)
+            next_node_id = self.start_node_id
+            if self.current_node_id == self.start_node_id:
+                self.playAnimation = False
+                return
+        self.current_node_id = next_node_id
 
         self.scene_object.scene.global_vars["node_id"] = self.current_node_id
 
-        current_node = self._motion_graph.get_pose_by_node_id(self.current_node_id)
-
-
-        pose = np.copy(current_node.pose)
-        root_velocity = np.linalg.norm(current_node.velocity[:3])
-        if (math.isclose(self.angleX, 0.0)): #walking direction remains unchanged
-            self.current_root_pos = self.current_root_pos + root_velocity * self.current_direction
-            pose[:3] = self.current_root_pos
-        else:
-            pose[3:7] = quaternion_multiply(pose[3:7], current_node.velocity[3:7])
-            pose[3:7] = quaternion_multiply(pose[3:7], quaternion_from_euler(self.angleX, 0, 0))
+        poses, self.current_direction = self._motion_graph.get_walk_poses([self.current_node_id], self.current_root_pos,
+                                                                          self.current_direction, self.angleX)
+        pose = poses[0]
+        self.current_root_pos = pose[:3]
+        if not math.isclose(self.angleX, 0.0):
             self.current_root_quat = pose[3:7]
-            self.current_direction = quat_rotate_vector(pose[3:7], np.array([0, 0, 1]))
-            self.current_direction[1] = 0  # prevent error accumulation in y axis
-            self.current_root_pos = self.current_root_pos + root_velocity * self.current_direction
-            pose[:3] = self.current_root_pos
 
         self._visualization.updateTransformation(pose, self.scene_object.scale_matrix)
 
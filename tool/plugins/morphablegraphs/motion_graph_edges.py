@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Vectorized edge construction for the motion similarity graph.
+The poses, velocities and contact information of all nodes are stacked into arrays.
+Candidate pairs are found using a KD-tree over a pose feature vector and the exact
+motion field distance is only evaluated for the candidates, one block of rows at a time.
+The blocks can optionally be distributed over a process pool.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from scipy.spatial import cKDTree
+
+CONTACT_STATE_UNDEFINED = -1
+CONTACT_STATE_INTERMEDIATE = 0
+CONTACT_STATE_UP = 1
+CONTACT_STATE_DOWN = 2
+VELOCITY_WEIGHT = 0.5
+DEFAULT_BLOCK_SIZE = 256
+
+
+def get_quaternion_columns(skeleton):
+    """ returns a n_joints x 4 array with the indices of the animated joint quaternions in a frame"""
+    root_pos_offset = 3
+    offsets = [skeleton.nodes[joint].index * 4 + root_pos_offset for joint in skeleton.animated_joints]
+    return np.array(offsets, dtype=int)[:, None] + np.arange(4)[None, :]
+
+
+def normalize_quaternions(quats):
+    norms = np.linalg.norm(quats, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return quats / norms
+
+
+def get_joint_quaternions(skeleton, poses):
+    """ returns a n_nodes x n_joints x 4 array with the normalized quaternions of the animated joints"""
+    columns = get_quaternion_columns(skeleton)
+    return normalize_quaternions(np.asarray(poses, dtype=float)[:, columns])
+
+
+def get_contact_states(contacts):
+    """ vectorized version of MotionGraphBuilder.get_contact_state"""
+    states = np.full(len(contacts), CONTACT_STATE_UNDEFINED, dtype=np.int8)
+    states[contacts[:, 0] > 0] = CONTACT_STATE_UP
+    states[contacts[:, 0] < 0] = CONTACT_STATE_DOWN
+    states[contacts[:, 0] * contacts[:, 1] < 0] = CONTACT_STATE_INTERMEDIATE
+    return states
+
+
+def match_contact_states(states, heights, idx_a, idx_b):
+    """ vectorized version of MotionGraphBuilder.estimate_contact_state for the pairs (idx_a, idx_b)
+        idx_a and idx_b can be any pair of broadcastable index arrays
+    """
+    state_a = states[idx_a]
+    state_b = states[idx_b]
+    height_a = heights[idx_a]
+    height_b = heights[idx_b]
+    valid = (state_a == CONTACT_STATE_INTERMEDIATE) \
+        | ((state_a == CONTACT_STATE_UP) & (height_b > height_a)) \
+        | ((state_a == CONTACT_STATE_DOWN) & (height_b < height_a))
+    return valid & (state_a == state_b)
+
+
+def compute_pair_distances(quats, velocities, idx_a, idx_b):
+    """ motion field distance for the pairs (idx_a, idx_b), equivalent to MotionGraphBuilder.get_pose_similarity"""
+    cos_angles = np.einsum("njk,njk->nj", quats[idx_a], quats[idx_b])
+    angles = np.arccos(np.clip(cos_angles, -1.0, 1.0))
+    pose_distances = np.sum(angles * angles, axis=1)
+    velocity_distances = np.linalg.norm(velocities[idx_a] - velocities[idx_b], axis=1)
+    return pose_distances + VELOCITY_WEIGHT * velocity_distances
+
+
+def compute_block_distances(quats, velocities, rows, col_start, col_end):
+    """ dense motion field distances of the rows to the nodes col_start to col_end"""
+    pose_distances = np.zeros((len(rows), col_end - col_start))
+    for j in range(quats.shape[1]):
+        cos_angles = np.dot(quats[rows, j], quats[col_start:col_end, j].T)
+        angles = np.arccos(np.clip(cos_angles, -1.0, 1.0))
+        pose_distances += angles * angles
+    a = velocities[rows]
+    b = velocities[col_start:col_end]
+    sq_distances = np.sum(a * a, axis=1)[:, None] + np.sum(b * b, axis=1)[None, :] - 2 * np.dot(a, b.T)
+    velocity_distances = np.sqrt(np.maximum(sq_distances, 0))
+    return pose_distances + VELOCITY_WEIGHT * velocity_distances
+
+
+def create_pose_features(quats, velocities, distance_threshold):
+    """ Creates feature vectors for which the euclidean distance is a lower bound of the motion field distance.
+        For unit quaternions |qa-qb|^2 = 2-2cos(a) <= a^2, so the quaternion part is bounded by the pose distance.
+        Scaling the velocity by VELOCITY_WEIGHT/sqrt(threshold) keeps the squared feature distance of all pairs
+        with a motion field distance below the threshold below the threshold.
+    """
+    velocity_scale = VELOCITY_WEIGHT / np.sqrt(distance_threshold)
+    return np.hstack([quats.reshape(len(quats), -1), velocities * velocity_scale])
+
+
+def find_block_candidates(tree, features, rows, radius):
+    neighbors = tree.query_ball_point(features[rows], radius)
+    counts = np.array([len(n) for n in neighbors], dtype=int)
+    if np.sum(counts) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    idx_a = np.repeat(rows, counts)
+    idx_b = np.concatenate([np.asarray(n, dtype=int) for n in neighbors if len(n) > 0])
+    return idx_a, idx_b
+
+
+class EdgeSearch(object):
+    """ Finds the similarity edges of a block of source nodes to the target nodes starting at col_start.
+        The arrays can be memory-mapped so that worker processes share the node data.
+    """
+    def __init__(self, quats, velocities, contacts, distance_threshold, use_spatial_index=True, features=None, col_start=0):
+        self.quats = quats
+        self.velocities = velocities
+        self.states = get_contact_states(contacts)
+        self.heights = np.asarray(contacts[:, 2])
+        self.distance_threshold = distance_threshold
+        self.n_nodes = len(quats) - 1  # the last node is neither source nor target
+        self.col_start = col_start
+        self.use_spatial_index = use_spatial_index
+        self.tree = None
+        self.features = None
+        if use_spatial_index:
+            if features is None:
+                features = create_pose_features(quats, velocities, distance_threshold)
+            self.features = features
+            self.tree = cKDTree(features[col_start:self.n_nodes])
+            # small tolerance to not lose pairs on the boundary due to rounding
+            self.radius = np.sqrt(distance_threshold) * (1.0 + 1e-6) + 1e-9
+
+    def find_block_edges(self, start, end):
+        """ returns the source and target indices of the edges from the nodes start to end sorted by source and target"""
+        rows = np.arange(start, end)
+        if self.use_spatial_index:
+            idx_a, idx_b = find_block_candidates(self.tree, self.features, rows, self.radius)
+            idx_b += self.col_start
+            mask = (idx_b != idx_a) & (idx_b != idx_a + 1)
+            idx_a, idx_b = idx_a[mask], idx_b[mask]
+            mask = match_contact_states(self.states, self.heights, idx_a, idx_b)
+            idx_a, idx_b = idx_a[mask], idx_b[mask]
+            mask = compute_pair_distances(self.quats, self.velocities, idx_a, idx_b) < self.distance_threshold
+            idx_a, idx_b = idx_a[mask], idx_b[mask]
+        else:
+            cols = np.arange(self.col_start, self.n_nodes)
+            mask = compute_block_distances(self.quats, self.velocities, rows, self.col_start, self.n_nodes)
+            mask = mask < self.distance_threshold
+            mask &= match_contact_states(self.states, self.heights, rows[:, None], cols[None, :])
+            mask &= (cols[None, :] != rows[:, None]) & (cols[None, :] != rows[:, None] + 1)
+            idx_a, idx_b = np.nonzero(mask)
+            idx_a = rows[idx_a]
+            idx_b = cols[idx_b]
+        order = np.lexsort((idx_b, idx_a))
+        return idx_a[order], idx_b[order]
+
+
+_worker_edge_search = None
+
+
+def _init_edge_search_worker(data_dir, distance_threshold, use_spatial_index, col_start):
+    global _worker_edge_search
+    arrays = dict()
+    for name in ["quats", "velocities", "contacts", "features"]:
+        filename = os.path.join(data_dir, name + ".npy")
+        if os.path.isfile(filename):
+            arrays[name] = np.load(filename, mmap_mode="r")
+    _worker_edge_search = EdgeSearch(arrays["quats"], arrays["velocities"], arrays["contacts"],
+                                     distance_threshold, use_spatial_index, arrays.get("features"), col_start)
+
+
+def _find_block_edges_in_worker(start, end):
+    idx_a, idx_b = _worker_edge_search.find_block_edges(start, end)
+    return start, end, idx_a, idx_b
+
+
+def iterate_block_edges(quats, velocities, contacts, distance_threshold, block_size, use_spatial_index,
+                        row_start, row_end, col_start):
+    search = EdgeSearch(quats, velocities, contacts, distance_threshold, use_spatial_index, col_start=col_start)
+    for start in range(row_start, row_end, block_size):
+        end = min(start + block_size, row_end)
+        idx_a, idx_b = search.find_block_edges(start, end)
+        yield start, end, idx_a, idx_b
+
+
+def iterate_block_edges_in_processes(quats, velocities, contacts, distance_threshold, block_size,
+                                     use_spatial_index, row_start, row_end, col_start, n_workers):
+    """ Distributes the row blocks over a process pool. The node arrays are written once into
+        a temporary directory and memory-mapped by the workers. The blocks are yielded as they complete.
+    """
+    data_dir = tempfile.mkdtemp(prefix="motion_graph_")
+    try:
+        np.save(os.path.join(data_dir, "quats.npy"), quats)
+        np.save(os.path.join(data_dir, "velocities.npy"), velocities)
+        np.save(os.path.join(data_dir, "contacts.npy"), contacts)
+        if use_spatial_index:
+            features = create_pose_features(quats, velocities, distance_threshold)
+            np.save(os.path.join(data_dir, "features.npy"), features)
+            del features
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_edge_search_worker,
+                                 initargs=(data_dir, distance_threshold, use_spatial_index, col_start)) as executor:
+            futures = [executor.submit(_find_block_edges_in_worker, start, min(start + block_size, row_end))
+                       for start in range(row_start, row_end, block_size)]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def find_edges_in_range(edges, quats, velocities, contacts, distance_threshold, row_start, row_end, col_start,
+                        block_size, use_spatial_index, n_workers, progress_callback):
+    """ appends the similarity edges from the nodes row_start to row_end to the nodes starting at col_start"""
+    if row_end <= row_start or col_start >= len(quats) - 1 or distance_threshold <= 0:
+        return edges
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, int(np.ceil((row_end - row_start) / block_size)))
+    args = quats, velocities, contacts, distance_threshold, block_size, use_spatial_index, row_start, row_end, col_start
+    if n_workers > 1:
+        blocks = iterate_block_edges_in_processes(*args, n_workers)
+    else:
+        blocks = iterate_block_edges(*args)
+    n_processed = 0
+    for start, end, idx_a, idx_b in blocks:
+        # all edges of a source node are found in the same block so the target lists stay sorted
+        for i, j in zip(idx_a.tolist(), idx_b.tolist()):
+            edges[i].append(j)
+        n_processed += end - start
+        if progress_callback is not None:
+            progress_callback(n_processed, row_end - row_start)
+    return edges
+
+
+def create_successor_edges(clip_ids, start, end):
+    edges = dict()
+    for i in range(start, end):
+        if clip_ids[i] == clip_ids[i + 1]:
+            edges[i] = [i + 1]
+        else:
+            edges[i] = []
+    return edges
+
+
+def create_edges(quats, velocities, contacts, clip_ids, distance_threshold,
+                 block_size=DEFAULT_BLOCK_SIZE, use_spatial_index=True, n_workers=1, progress_callback=None):
+    """ Creates the edges of the motion similarity graph with the same semantics as the pairwise comparison:
+        each node is connected to its successor in the same clip and to all nodes with the same contact state
+        and a motion field distance below the distance threshold. The last node is neither source nor target.
+        Args:
+            n_workers (int): number of worker processes, 1 runs in the calling process and None uses all cores
+            progress_callback (function): called with the number of processed nodes and the total number of nodes
+        Returns:
+            edges (dict): node index to sorted list of target node indices
+    """
+    n_nodes = len(quats) - 1
+    edges = create_successor_edges(clip_ids, 0, n_nodes)
+    return find_edges_in_range(edges, quats, velocities, contacts, distance_threshold, 0, n_nodes, 0,
+                               block_size, use_spatial_index, n_workers, progress_callback)
+
+
+def extend_edges(edges, n_prev_nodes, quats, velocities, contacts, clip_ids, distance_threshold,
+                 block_size=DEFAULT_BLOCK_SIZE, use_spatial_index=True, n_workers=1, progress_callback=None):
+    """ Extends the edges of the first n_prev_nodes nodes to all nodes in the arrays.
+        Only pairs that involve the new nodes or the previous last node, which was excluded before, are compared.
+        The result is the same as calling create_edges on all nodes.
+        Args:
+            edges (dict): edges created by create_edges for the first n_prev_nodes nodes, is modified in place
+        Returns:
+            edges (dict): node index to sorted list of target node indices
+    """
+    n_nodes = len(quats) - 1
+    prev_last = n_prev_nodes - 1
+    edges.update(create_successor_edges(clip_ids, max(prev_last, 0), n_nodes))
+    # the new rows are compared to all nodes
+    find_edges_in_range(edges, quats, velocities, contacts, distance_threshold, max(prev_last, 0), n_nodes, 0,
+                        block_size, use_spatial_index, n_workers, progress_callback)
+    # the previous rows are compared only to the new nodes, their targets are larger than all existing ones
+    find_edges_in_range(edges, quats, velocities, contacts, distance_threshold, 0, prev_last, max(prev_last, 0),
+                        block_size, use_spatial_index, n_workers, None)
+    return edges
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 DFKI GmbH.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the
+# following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+# NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+# USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Compact on-disk format for the motion similarity graph.
+A file starts with a magic string and the length of a JSON header that contains the skeleton,
+the build settings and the dtype, shape and offset of each array. The arrays follow the header
+aligned to ALIGNMENT bytes so that they can be memory-mapped without reading the file.
+The container functions are also used by blend_node_io with a different magic string.
+"""
+import json
+import struct
+import collections
+import numpy as np
+from anim_utils.animation_data import SkeletonBuilder
+from .motion_graph import MotionGraph, MGNodeArrays, MGEdgeArrays, TRANSITION_TABLE_NAMES
+
+MAGIC = b"MOTIONGRAPH\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def get_graph_arrays(graph):
+    nodes = MGNodeArrays.from_nodes(graph.nodes)
+    n_nodes = len(nodes)
+    edges = MGEdgeArrays.from_edges(graph.edges, n_nodes)
+    raw_edges = MGEdgeArrays.from_edges(graph.raw_edges, n_nodes)
+    arrays = collections.OrderedDict()
+    arrays["poses"] = nodes.poses
+    arrays["velocities"] = nodes.velocities
+    arrays["clip_ids"] = nodes.clip_ids
+    arrays["contacts"] = nodes.contacts
+    arrays["edge_offsets"] = edges.offsets
+    arrays["edge_targets"] = edges.targets
+    arrays["edge_sources"] = edges.source_mask
+    arrays["raw_edge_offsets"] = raw_edges.offsets
+    arrays["raw_edge_targets"] = raw_edges.targets
+    arrays["raw_edge_sources"] = raw_edges.source_mask
+    arrays["strong_components"] = graph.strong_components
+    transition_tables = graph.get_transition_tables()
+    for name in TRANSITION_TABLE_NAMES:
+        arrays[name] = transition_tables[name]
+    return arrays
+
+
+def write_container(filename, magic, header, arrays):
+    """ writes the header as JSON followed by the arrays aligned to ALIGNMENT bytes
+        the dtype, shape and offset of each array are added to the header
+    """
+    array_info = collections.OrderedDict()
+    offset = 0
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        arrays[name] = a
+        array_info[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset = _align(offset + a.nbytes)
+    header["version"] = FORMAT_VERSION
+    header["arrays"] = array_info
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(magic) + 8 + len(header_bytes))
+    with open(filename, "wb") as out_file:
+        out_file.write(magic)
+        out_file.write(struct.pack("<Q", len(header_bytes)))
+        out_file.write(header_bytes)
+        for name, a in arrays.items():
+            out_file.write(b"\0" * (data_start + array_info[name]["offset"] - out_file.tell()))
+            out_file.write(a.tobytes())
+
+
+def save_motion_graph(graph, filename):
+    arrays = get_graph_arrays(graph)
+    header = dict()
+    header["skeleton"] = graph.skeleton.to_json()
+    header["frame_time"] = graph.skeleton.frame_time
+    if graph.default_quat is not None:
+        header["default_quat"] = [float(v) for v in graph.default_quat]
+    header["distance_threshold"] = graph.distance_threshold
+    write_container(filename, MAGIC, header, arrays)
+
+
+def has_magic(filename, magic=MAGIC):
+    with open(filename, "rb") as in_file:
+        return in_file.read(len(magic)) == magic
+
+
+def read_header(filename, magic=MAGIC):
+    with open(filename, "rb") as in_file:
+        if in_file.read(len(magic)) != magic:
+            raise ValueError("Unknown file format: " + filename)
+        header_length = struct.unpack("<Q", in_file.read(8))[0]
+        header = json.loads(in_file.read(header_length).decode("utf-8"))
+    if header["version"] > FORMAT_VERSION:
+        raise ValueError("Unsupported format version " + str(header["version"]))
+    header["data_start"] = _align(len(magic) + 8 + header_length)
+    return header
+
+
+def map_arrays(filename, header):
+    arrays = dict()
+    for name, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if np.prod(shape) == 0:
+            arrays[name] = np.zeros(shape, dtype=info["dtype"])
+        else:
+            arrays[name] = np.memmap(filename, dtype=info["dtype"], mode="r",
+                                     offset=header["data_start"] + info["offset"], shape=shape)
+    return arrays
+
+
+def load_motion_graph(filename):
+    """ maps the arrays of a motion graph file into memory, the node data is only read when it is accessed
+        files without the transition tables compute them on the first sample
+    """
+    header = read_header(filename)
+    arrays = map_arrays(filename, header)
+    skeleton = SkeletonBuilder().load_from_json_data(header["skeleton"])
+    skeleton.frame_time = header["frame_time"]
+    nodes = MGNodeArrays(arrays["poses"], arrays["velocities"], arrays["clip_ids"], arrays["contacts"])
+    edges = MGEdgeArrays(arrays["edge_offsets"], arrays["edge_targets"], arrays["edge_sources"])
+    raw_edges = MGEdgeArrays(arrays["raw_edge_offsets"], arrays["raw_edge_targets"], arrays["raw_edge_sources"])
+    transition_tables = None
+    if all(name in arrays for name in TRANSITION_TABLE_NAMES):
+        transition_tables = {name: arrays[name] for name in TRANSITION_TABLE_NAMES}
+    graph = MotionGraph(skeleton, nodes, edges, arrays["strong_components"], raw_edges, transition_tables)
+    if "default_quat" in header:
+        graph.default_quat = np.array(header["default_quat"])
+    graph.distance_threshold = header["distance_threshold"]
+    return graph